@@ -0,0 +1,13 @@
+"""
+Bounds on the paging parameters of the API, so one request cannot ask for an
+unbounded amount of work.
+"""
+
+# Rows per page of messages or conversations
+MAX_PAGE_SIZE = 100
+
+# Page numbers are served by reading every earlier page; go further with cursors
+MAX_PAGE = 100
+
+# Messages or conversations per sync
+MAX_SYNC_LIMIT = 1000
@@ -1,8 +1,12 @@
 from fastapi import APIRouter, Depends, Query, Path
+from typing import Optional
 
+from app.api.limits import MAX_PAGE, MAX_PAGE_SIZE, MAX_SYNC_LIMIT
 from app.controllers.conversation_controller import ConversationController
+from app.controllers.realtime_controller import SYNC_MAX_WAIT_SECONDS
 from app.schemas.conversation import (
     ConversationResponse,
+    ConversationSyncResponse,
     PaginatedConversationResponse
 )
 
@@ -11,8 +15,9 @@ router = APIRouter(prefix="/api/conversations", tags=["Conversations"])
 @router.get("/user/{user_id}", response_model=PaginatedConversationResponse)
 async def get_user_conversations(
     user_id: int = Path(..., description="ID of the user"),
-    page: int = Query(1, description="Page number"),
-    limit: int = Query(20, description="Number of conversations per page"),
+    page: int = Query(1, ge=1, le=MAX_PAGE, description="Page number"),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE, description="Number of conversations per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
     conversation_controller: ConversationController = Depends()
 ) -> PaginatedConversationResponse:
     """
@@ -21,7 +26,26 @@ async def get_user_conversations(
     return await conversation_controller.get_user_conversations(
         user_id=user_id,
         page=page,
-        limit=limit
+        limit=limit,
+        cursor=cursor
+    )
+
+@router.get("/user/{user_id}/sync", response_model=ConversationSyncResponse)
+async def sync_user_conversations(
+    user_id: int = Path(..., description="ID of the user"),
+    sync_token: Optional[str] = Query(None, description="sync_token of the previous sync or of the first page"),
+    limit: int = Query(100, ge=1, le=MAX_SYNC_LIMIT, description="Maximum number of conversations"),
+    wait: float = Query(0, ge=0, le=SYNC_MAX_WAIT_SECONDS, description="Seconds to wait for changes if there are none (long poll)"),
+    conversation_controller: ConversationController = Depends()
+) -> ConversationSyncResponse:
+    """
+    Get the conversations of a user updated since a sync token
+    """
+    return await conversation_controller.sync_user_conversations(
+        user_id=user_id,
+        sync_token=sync_token,
+        limit=limit,
+        wait=wait
     )
 
 @router.get("/{conversation_id}", response_model=ConversationResponse)
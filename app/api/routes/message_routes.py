@@ -1,11 +1,17 @@
 from fastapi import APIRouter, Depends, Query, Path, Body
-from typing import Optional
+from fastapi.responses import StreamingResponse
+from typing import Dict, List, Optional
 from datetime import datetime
 
-from app.controllers.message_controller import MessageController
+from app.api.limits import MAX_PAGE, MAX_PAGE_SIZE, MAX_SYNC_LIMIT
+from app.controllers.message_controller import MAX_CONVERSATIONS_PER_FETCH, MessageController
+from app.controllers.realtime_controller import SYNC_MAX_WAIT_SECONDS
 from app.schemas.message import (
+    MessageBatchCreate,
+    MessageBatchResponse,
     MessageCreate, 
     MessageResponse, 
+    MessageSyncResponse,
     PaginatedMessageResponse
 )
 
@@ -21,11 +27,36 @@ async def send_message(
     """
     return await message_controller.send_message(message)
 
+@router.post("/batch", response_model=MessageBatchResponse)
+async def send_messages(
+    batch: MessageBatchCreate = Body(...),
+    message_controller: MessageController = Depends()
+) -> MessageBatchResponse:
+    """
+    Send a batch of messages; failures are reported per item
+    """
+    return await message_controller.send_messages(batch)
+
+@router.get("/conversations", response_model=Dict[int, PaginatedMessageResponse])
+async def get_multiple_conversation_messages(
+    ids: List[int] = Query(..., min_length=1, max_length=MAX_CONVERSATIONS_PER_FETCH, description="Conversation IDs (repeat the parameter for each)"),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE, description="Number of messages per conversation"),
+    message_controller: MessageController = Depends()
+) -> Dict[int, PaginatedMessageResponse]:
+    """
+    Get the first page of messages of several conversations at once
+    """
+    return await message_controller.get_multiple_conversation_messages(
+        conversation_ids=ids,
+        limit=limit
+    )
+
 @router.get("/conversation/{conversation_id}", response_model=PaginatedMessageResponse)
 async def get_conversation_messages(
     conversation_id: int = Path(..., description="ID of the conversation"),
-    page: int = Query(1, description="Page number"),
-    limit: int = Query(20, description="Number of messages per page"),
+    page: int = Query(1, ge=1, le=MAX_PAGE, description="Page number"),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE, description="Number of messages per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
     message_controller: MessageController = Depends()
 ) -> PaginatedMessageResponse:
     """
@@ -34,15 +65,18 @@ async def get_conversation_messages(
     return await message_controller.get_conversation_messages(
         conversation_id=conversation_id,
         page=page,
-        limit=limit
+        limit=limit,
+        cursor=cursor
     )
 
 @router.get("/conversation/{conversation_id}/before", response_model=PaginatedMessageResponse)
 async def get_messages_before_timestamp(
     conversation_id: int = Path(..., description="ID of the conversation"),
     before_timestamp: datetime = Query(..., description="Get messages before this timestamp"),
-    page: int = Query(1, description="Page number"),
-    limit: int = Query(20, description="Number of messages per page"),
+    page: int = Query(1, ge=1, le=MAX_PAGE, description="Page number"),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE, description="Number of messages per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    exact_total: bool = Query(True, description="Count matching messages; if false, total is null and only has_more is set"),
     message_controller: MessageController = Depends()
 ) -> PaginatedMessageResponse:
     """
@@ -52,5 +86,43 @@ async def get_messages_before_timestamp(
         conversation_id=conversation_id,
         before_timestamp=before_timestamp,
         page=page,
-        limit=limit
-    ) 
\ No newline at end of file
+        limit=limit,
+        cursor=cursor,
+        exact_total=exact_total
+    ) 
+
+@router.get("/conversation/{conversation_id}/sync", response_model=MessageSyncResponse)
+async def sync_conversation_messages(
+    conversation_id: int = Path(..., description="ID of the conversation"),
+    sync_token: Optional[str] = Query(None, description="sync_token of the previous sync or of the first page"),
+    limit: int = Query(100, ge=1, le=MAX_SYNC_LIMIT, description="Maximum number of messages"),
+    wait: float = Query(0, ge=0, le=SYNC_MAX_WAIT_SECONDS, description="Seconds to wait for new messages if there are none (long poll)"),
+    message_controller: MessageController = Depends()
+) -> MessageSyncResponse:
+    """
+    Get the messages of a conversation newer than a sync token, oldest first
+    """
+    return await message_controller.sync_conversation_messages(
+        conversation_id=conversation_id,
+        sync_token=sync_token,
+        limit=limit,
+        wait=wait
+    )
+
+@router.get("/conversation/{conversation_id}/export", response_class=StreamingResponse)
+async def export_conversation_messages(
+    conversation_id: int = Path(..., description="ID of the conversation"),
+    since: Optional[datetime] = Query(None, description="Only messages at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only messages before this time"),
+    cursor: Optional[str] = Query(None, description="cursor of the last exported message, to resume"),
+    message_controller: MessageController = Depends()
+) -> StreamingResponse:
+    """
+    Export a conversation as NDJSON, newest message first
+    """
+    return await message_controller.export_conversation_messages(
+        conversation_id=conversation_id,
+        since=since,
+        until=until,
+        cursor=cursor
+    )
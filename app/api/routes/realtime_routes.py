@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends, Query, WebSocket
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+
+from app.controllers.realtime_controller import RealtimeController
+
+router = APIRouter(prefix="/api/realtime", tags=["Realtime"])
+
+@router.websocket("/ws")
+async def subscribe_websocket(
+    websocket: WebSocket,
+    conversation_ids: List[int] = Query([], description="Conversations to receive new messages of (repeat the parameter for each)"),
+    user_id: Optional[int] = Query(None, description="User to receive inbox updates of"),
+    realtime_controller: RealtimeController = Depends()
+) -> None:
+    """
+    Receive new messages as JSON frames over a WebSocket
+    """
+    await realtime_controller.websocket_session(websocket, conversation_ids, user_id)
+
+@router.get("/events")
+async def subscribe_events(
+    conversation_ids: List[int] = Query([], description="Conversations to receive new messages of (repeat the parameter for each)"),
+    user_id: Optional[int] = Query(None, description="User to receive inbox updates of"),
+    realtime_controller: RealtimeController = Depends()
+) -> StreamingResponse:
+    """
+    Receive new messages as Server-Sent Events (fallback for clients without WebSockets)
+    """
+    return await realtime_controller.event_stream(conversation_ids, user_id)
@@ -0,0 +1,4 @@
+from app.cache.lru import LRUCache, cache_stats, register_cache
+from app.cache.recent_messages import RecentMessagesCache
+from app.cache.disk import DiskCache
+from app.cache.single_flight import SingleFlight, single_flight, single_flight_stats
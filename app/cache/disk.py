@@ -0,0 +1,128 @@
+"""
+On-disk L2 cache shared by the API workers of one host.
+"""
+import json
+import time
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Prune a namespace back to max_entries every this many puts
+PRUNE_INTERVAL = 1000
+
+
+class DiskCache:
+    """
+    SQLite-backed store of versioned JSON values, grouped by namespace.
+
+    A put only replaces an entry with an equal or newer version, so workers
+    racing to store the same key converge on the newest value. Values are
+    JSON with datetimes preserved. Calls block on SQLite; run them with
+    asyncio.to_thread from the event loop.
+    """
+
+    def __init__(self, path: str, max_entries: int = 100000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._puts = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        # WAL lets several worker processes read while one writes; losing the
+        # last writes on a crash only costs a cache miss
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                value TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_by_age ON entries (namespace, updated_at)")
+        logger.info(f"L2 cache at {path}")
+
+    def get(self, namespace: str, key: Hashable) -> Optional[Tuple[int, Any]]:
+        """Return (version, value) for a key, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT version, value FROM entries WHERE namespace = ? AND key = ?",
+                (namespace, _encode_key(key))
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1], object_hook=_decode_datetime)
+
+    def put(self, namespace: str, key: Hashable, version: int, value: Any) -> None:
+        """Store a value unless a newer version is already stored."""
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO entries (namespace, key, version, value, updated_at) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (namespace, key) DO UPDATE
+                SET version = excluded.version, value = excluded.value, updated_at = excluded.updated_at
+                WHERE excluded.version >= entries.version
+                """,
+                (namespace, _encode_key(key), version, json.dumps(value, default=_encode_datetime), time.time())
+            )
+            self._puts += 1
+            if self._puts % PRUNE_INTERVAL == 0:
+                self._prune(namespace)
+
+    def recent(self, namespace: str, limit: int) -> List[Tuple[Any, int, Any, float]]:
+        """
+        The most recently stored (key, version, value, stored_at) entries of a
+        namespace, newest first; stored_at is the time.time() of the put.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT key, version, value, updated_at FROM entries WHERE namespace = ?
+                ORDER BY updated_at DESC LIMIT ?
+                """,
+                (namespace, limit)
+            ).fetchall()
+        return [(_decode_key(key), version, json.loads(value, object_hook=_decode_datetime), updated_at)
+                for key, version, value, updated_at in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _prune(self, namespace: str) -> None:
+        self._conn.execute(
+            """
+            DELETE FROM entries WHERE namespace = ? AND updated_at < (
+                SELECT updated_at FROM entries WHERE namespace = ?
+                ORDER BY updated_at DESC LIMIT 1 OFFSET ?
+            )
+            """,
+            (namespace, namespace, self.max_entries - 1)
+        )
+
+
+def _encode_key(key: Hashable) -> str:
+    return json.dumps(key)
+
+
+def _decode_key(key: str) -> Any:
+    value = json.loads(key)
+    return tuple(value) if isinstance(value, list) else value
+
+
+def _encode_datetime(value):
+    if isinstance(value, datetime):
+        return {"$datetime": value.isoformat()}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _decode_datetime(obj):
+    if len(obj) == 1 and "$datetime" in obj:
+        return datetime.fromisoformat(obj["$datetime"])
+    return obj
@@ -0,0 +1,90 @@
+"""
+Process-local LRU cache.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+# Named caches, reported by cache_stats()
+_caches: Dict[str, "LRUCache"] = {}
+
+
+def register_cache(name: str, cache) -> None:
+    """Report a cache (anything with a stats() method) under `name` in cache_stats()."""
+    _caches[name] = cache
+
+
+def cache_stats() -> Dict[str, Dict[str, int]]:
+    """stats() of every named cache in this process."""
+    return {name: cache.stats() for name, cache in _caches.items()}
+
+
+class LRUCache:
+    """
+    A size-bounded mapping that evicts the least recently used entry.
+
+    With a ttl (seconds), entries also expire that long after they were put;
+    an expired entry counts as a miss. Hit, miss and eviction counts are kept
+    for stats(); caches created with a name are also reported by cache_stats().
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: Optional[float] = None, name: Optional[str] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # key -> (expiry on the monotonic clock or None, value)
+        self._data: "OrderedDict[Hashable, Tuple[Optional[float], Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        if name:
+            register_cache(name, self)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value; ttl (seconds) overrides the cache's TTL for this entry."""
+        ttl = ttl if ttl is not None else self.ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Optional[Any]:
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Counters since the cache was created, plus its current size."""
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
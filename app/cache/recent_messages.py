@@ -0,0 +1,158 @@
+"""
+Process-local ring buffers of the newest messages of hot conversations.
+"""
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.cache.lru import register_cache
+
+# Rough per-message overhead (dict, ints, datetime) added to the content length
+MESSAGE_OVERHEAD_BYTES = 400
+
+
+class _Buffer:
+    __slots__ = ("messages", "complete", "total", "expires_at", "size")
+
+    def __init__(self, messages: List[Dict[str, Any]], complete: bool, total: Optional[int], expires_at: Optional[float]):
+        self.messages = messages  # newest first
+        self.complete = complete  # True if messages holds the whole conversation
+        self.total = total
+        self.expires_at = expires_at
+        self.size = sum(_message_size(m) for m in messages)
+
+
+class RecentMessagesCache:
+    """
+    The newest `per_conversation` messages of each cached conversation, in
+    the MessageResponse shape, newest first.
+
+    Buffers are filled from a first-page read and kept current by this
+    process's writes; whole conversations are evicted least recently used
+    first once the estimated size passes max_bytes. With a ttl (seconds), a
+    buffer is dropped that long after it was filled from Cassandra, which
+    bounds how long writes made by other processes go unseen.
+    """
+
+    def __init__(self, per_conversation: int = 50, max_bytes: int = 64 * 1024 * 1024,
+                 ttl: Optional[float] = None, name: Optional[str] = None):
+        self.per_conversation = per_conversation
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._buffers: "OrderedDict[int, _Buffer]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        if name:
+            register_cache(name, self)
+
+    @property
+    def enabled(self) -> bool:
+        return self.per_conversation > 0 and self.max_bytes > 0
+
+    def get_page(self, conversation_id: int, limit: int) -> Optional[Tuple[List[Dict[str, Any]], Optional[int], bool]]:
+        """
+        Return (newest `limit` messages, total, has_more), or None if the
+        buffer cannot answer the page.
+        """
+        buffer = self._buffers.get(conversation_id)
+        if buffer is not None and buffer.expires_at is not None and buffer.expires_at <= time.monotonic():
+            self._remove(conversation_id)
+            self.expirations += 1
+            buffer = None
+        if buffer is None or (len(buffer.messages) < limit and not buffer.complete):
+            self.misses += 1
+            return None
+        self._buffers.move_to_end(conversation_id)
+        self.hits += 1
+        has_more = len(buffer.messages) > limit or not buffer.complete
+        return buffer.messages[:limit], buffer.total, has_more
+
+    def fill(self, conversation_id: int, messages: List[Dict[str, Any]], complete: bool, total: Optional[int]) -> None:
+        """Store the newest messages of a conversation, as read from Cassandra."""
+        existing = self._buffers.get(conversation_id)
+        if existing is not None:
+            # Keep messages written while the read was in flight
+            known = {m["id"] for m in messages}
+            messages = messages + [m for m in existing.messages if m["id"] not in known]
+        messages = sorted(messages, key=_newest_first)
+        if len(messages) > self.per_conversation:
+            messages, complete = messages[:self.per_conversation], False
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        self._store(conversation_id, _Buffer(messages, complete, total, expires_at))
+
+    def append(self, conversation_id: int, message: Dict[str, Any]) -> None:
+        """Add a message written by this process to the conversation's buffer, if it has one."""
+        buffer = self._buffers.get(conversation_id)
+        if buffer is None:
+            return
+
+        messages = buffer.messages
+        if any(m["id"] == message["id"] for m in messages):
+            # A read refilled the buffer while the write was in flight, and
+            # its rows and total already include this message
+            return
+        messages.insert(0, message)
+        if len(messages) > 1 and _newest_first(messages[0]) > _newest_first(messages[1]):
+            # Concurrent sends can finish out of order
+            messages.sort(key=_newest_first)
+        buffer.size += _message_size(message)
+        self._bytes += _message_size(message)
+        if buffer.total is not None:
+            buffer.total += 1
+        while len(messages) > self.per_conversation:
+            dropped = messages.pop()
+            buffer.size -= _message_size(dropped)
+            self._bytes -= _message_size(dropped)
+            buffer.complete = False
+        self._buffers.move_to_end(conversation_id)
+        self._evict()
+
+    def invalidate(self, conversation_id: int) -> None:
+        self._remove(conversation_id)
+
+    def clear(self) -> None:
+        self._buffers.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._buffers),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def _store(self, conversation_id: int, buffer: _Buffer) -> None:
+        self._remove(conversation_id)
+        self._buffers[conversation_id] = buffer
+        self._bytes += buffer.size
+        self._evict()
+
+    def _remove(self, conversation_id: int) -> None:
+        buffer = self._buffers.pop(conversation_id, None)
+        if buffer is not None:
+            self._bytes -= buffer.size
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and self._buffers:
+            _, buffer = self._buffers.popitem(last=False)
+            self._bytes -= buffer.size
+            self.evictions += 1
+
+
+def _newest_first(message: Dict[str, Any]):
+    # Clustering order of the messages table: timestamp DESC, message_id ASC
+    return (datetime.max - message["created_at"], message["id"])
+
+
+def _message_size(message: Dict[str, Any]) -> int:
+    return MESSAGE_OVERHEAD_BYTES + len(message["content"] or "")
@@ -0,0 +1,93 @@
+"""
+Single-flight coalescing of identical concurrent reads.
+"""
+import asyncio
+import inspect
+import functools
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+# Named groups, reported by single_flight_stats()
+_groups: Dict[str, "SingleFlight"] = {}
+
+
+def single_flight_stats() -> Dict[str, Dict[str, Any]]:
+    """stats() of every named single-flight group in this process."""
+    return {name: group.stats() for name, group in _groups.items()}
+
+
+class SingleFlight:
+    """
+    Runs one call per key at a time; callers that arrive while it is in
+    flight wait for, and share, its result or exception.
+
+    Keys are grouped by a scope (e.g. a conversation ID) so that forget(scope)
+    can send every caller arriving after a write to a fresh call. The shared
+    call is not cancelled when the caller that started it goes away.
+    """
+
+    def __init__(self, name: Optional[str] = None):
+        # scope -> key -> in-flight task
+        self._calls: Dict[Hashable, Dict[Hashable, asyncio.Future]] = {}
+        self.calls = 0
+        self.executions = 0
+        self.deduplicated = 0
+        if name:
+            _groups[name] = self
+
+    async def do(self, scope: Hashable, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.calls += 1
+        calls = self._calls.setdefault(scope, {})
+        future = calls.get(key)
+        if future is not None:
+            self.deduplicated += 1
+        else:
+            self.executions += 1
+            future = asyncio.ensure_future(fn())
+            calls[key] = future
+            future.add_done_callback(functools.partial(self._done, scope, key))
+        return await asyncio.shield(future)
+
+    def forget(self, scope: Hashable) -> None:
+        """Let calls in `scope` that start from now on run afresh instead of joining one in flight."""
+        self._calls.pop(scope, None)
+
+    def _done(self, scope: Hashable, key: Hashable, future: asyncio.Future) -> None:
+        calls = self._calls.get(scope)
+        if calls is not None and calls.get(key) is future:
+            del calls[key]
+            if not calls:
+                del self._calls[scope]
+        if not future.cancelled():
+            # Mark the exception retrieved even if every caller was cancelled
+            future.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters since the group was created, plus the calls in flight."""
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "deduplicated": self.deduplicated,
+            "dedup_ratio": self.deduplicated / self.calls if self.calls else 0.0,
+            "in_flight": sum(len(calls) for calls in self._calls.values()),
+        }
+
+
+def single_flight(group: SingleFlight, scope: str):
+    """
+    Coalesce concurrent calls of an async function made with the same
+    arguments; `scope` names the argument passed to group.forget().
+    """
+    def decorate(fn):
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            # Positional and keyword spellings of the same call share a key
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = (fn.__qualname__, *bound.arguments.items())
+            return await group.do(bound.arguments[scope], key, lambda: fn(*args, **kwargs))
+
+        return wrapper
+
+    return decorate
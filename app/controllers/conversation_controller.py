@@ -1,6 +1,11 @@
+from typing import Dict, List, Optional
 from fastapi import HTTPException, status
+from app.controllers.realtime_controller import long_poll
 from app.models.cassandra_models import ConversationModel
-from app.schemas.conversation import ConversationResponse, PaginatedConversationResponse
+from app.models.cursors import PAGING_STATE_ERRORS, encode_position_cursor
+from app.realtime import inbox_channel
+from app.schemas.conversation import ConversationResponse, ConversationSyncResponse, PaginatedConversationResponse
+from app.schemas.serialization import build_response, render_response
 import logging
 
 logger = logging.getLogger(__name__)   
@@ -13,7 +18,8 @@ class ConversationController:
         self, 
         user_id: int, 
         page: int = 1, 
-        limit: int = 20
+        limit: int = 20,
+        cursor: Optional[str] = None
     ) -> PaginatedConversationResponse:
         """
         Get all conversations for a user with pagination
@@ -22,6 +28,7 @@ class ConversationController:
             user_id: ID of the user
             page: Page number
             limit: Number of conversations per page
+            cursor: Cursor returned as next_cursor by the previous page
             
         Returns:
             Paginated list of conversations
@@ -31,21 +38,85 @@ class ConversationController:
         """
         try:
             # Fetch conversations and total count from the model
-            conversations, total = await ConversationModel.get_user_conversations(user_id, page, limit)
+            conversations, total, next_cursor = await ConversationModel.get_user_conversations(
+                user_id, page, limit, cursor
+            )
             
             # Construct the paginated response
-            return PaginatedConversationResponse(
+            return render_response(build_response(
+                PaginatedConversationResponse,
                 total=total,
                 page=page,
                 limit=limit,
-                data=[ConversationResponse(**conv) for conv in conversations]
+                data=conversations,
+                next_cursor=next_cursor,
+                sync_token=_sync_token(conversations) if cursor is None and page == 1 else None
+            ))
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
             )
         except Exception as e:
+            if cursor and isinstance(e, PAGING_STATE_ERRORS):
+                # Cassandra rejected the paging state carried by the cursor
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Invalid cursor: {cursor}"
+                )
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Failed to fetch user conversations: {str(e)}"
             )
     
+    async def sync_user_conversations(
+        self,
+        user_id: int,
+        sync_token: Optional[str] = None,
+        limit: int = 100,
+        wait: float = 0
+    ) -> ConversationSyncResponse:
+        """
+        Get the conversations of a user updated since a sync token
+        
+        With `wait`, an empty result is held back until a message to or from
+        the user arrives or the wait times out (long poll).
+        
+        Args:
+            user_id: ID of the user
+            sync_token: sync_token of the previous sync or of the first page
+            limit: Maximum number of conversations
+            wait: Seconds to wait for changes when there are none
+            
+        Returns:
+            Updated conversations, least recently updated first, and the token to sync from next
+            
+        Raises:
+            HTTPException: If the token is malformed
+        """
+        try:
+            conversations, next_token, has_more = await long_poll(
+                {inbox_channel(user_id)},
+                lambda: ConversationModel.get_inbox_changes(user_id, sync_token, limit),
+                wait
+            )
+            return render_response(build_response(
+                ConversationSyncResponse,
+                data=conversations,
+                sync_token=next_token,
+                has_more=has_more
+            ))
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to sync user conversations: {str(e)}"
+            )
+    
     async def get_conversation(self, conversation_id: int) -> ConversationResponse:
         """
         Get a specific conversation by ID
@@ -73,14 +144,15 @@ class ConversationController:
             
             # Return conversation response
 
-            message = ConversationResponse(
+            message = build_response(
+                ConversationResponse,
                 id = conversation["conversation_id"],
                 user1_id = conversation["sender_id"],
                 user2_id = conversation["receiver_id"],
                 last_message_at = conversation["last_message_at"],
                 last_message_content = conversation["last_message_content"]
             )
-            return message
+            return render_response(message)
             
         except HTTPException:
             # Re-raise HTTP exceptions
@@ -91,3 +163,11 @@ class ConversationController:
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Failed to fetch conversation: {str(e)}"
             )
+
+
+def _sync_token(conversations: List[Dict]) -> Optional[str]:
+    """Sync token of a first page: the position of its most recently updated conversation."""
+    if not conversations:
+        return None
+    newest = max(conversations, key=lambda conversation: (conversation["last_message_at"], conversation["id"]))
+    return encode_position_cursor(newest["last_message_at"], newest["id"])
@@ -1,12 +1,35 @@
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+import asyncio
+import json
 import logging
+import os
 
-from app.models.cassandra_models import MessageModel, ConversationModel
-from app.schemas.message import MessageCreate, MessageResponse, PaginatedMessageResponse
+from app.controllers.realtime_controller import long_poll, publish_messages
+from app.models.cassandra_models import MessageModel, ConversationModel, conversation_pair
+from app.models.cursors import PAGING_STATE_ERRORS, encode_position_cursor
+from app.realtime import conversation_channel
+from app.schemas.serialization import build_response, render_response
+from app.schemas.message import (
+    MessageBatchCreate,
+    MessageBatchItemResult,
+    MessageBatchResponse,
+    MessageCreate,
+    MessageResponse,
+    MessageSyncResponse,
+    PaginatedMessageResponse
+)
 logger = logging.getLogger(__name__)
 
+# Conversations a batch send writes to at the same time
+MESSAGE_BATCH_CONCURRENCY = int(os.getenv("MESSAGE_BATCH_CONCURRENCY", "16"))
+
+# Conversations a multi-conversation fetch reads at the same time, and how many it accepts
+CONVERSATION_FETCH_CONCURRENCY = int(os.getenv("CONVERSATION_FETCH_CONCURRENCY", "16"))
+MAX_CONVERSATIONS_PER_FETCH = 100
+
 class MessageController:
     """
     Controller for handling message operations
@@ -38,7 +61,8 @@ class MessageController:
                 conversation_id=conversation['conversation_id'],
                 sender_id=message_data.sender_id,
                 receiver_id=message_data.receiver_id,
-                content=message_data.content
+                content=message_data.content,
+                previous_timestamp=conversation.get('last_message_at')
             )
 
             logger.info(f"Message created: {message}")
@@ -53,19 +77,82 @@ class MessageController:
                 conversation_id=conversation['conversation_id']
             )
             
-            return message_response
-            
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Failed to send message: {str(e)}"
             )
+
+        # Push to connected clients only once the message is stored
+        await publish_messages([message_response])
+        return message_response
+    
+    async def send_messages(self, batch: MessageBatchCreate) -> MessageBatchResponse:
+        """
+        Send a batch of messages
+        
+        Items are grouped by conversation: each conversation is resolved once
+        and its messages are written together, in request order. Conversations
+        are written concurrently, at most MESSAGE_BATCH_CONCURRENCY at a time.
+        A failure only fails the items of its conversation.
+        
+        Args:
+            batch: The messages to send
+            
+        Returns:
+            Per-item results in request order
+        """
+        groups: Dict[Tuple[int, int], List[Tuple[int, MessageCreate]]] = {}
+        for index, item in enumerate(batch.messages):
+            groups.setdefault(conversation_pair(item.sender_id, item.receiver_id), []).append((index, item))
+
+        results: List[Optional[MessageBatchItemResult]] = [None] * len(batch.messages)
+        semaphore = asyncio.Semaphore(MESSAGE_BATCH_CONCURRENCY)
+
+        async def send_group(items: List[Tuple[int, MessageCreate]]):
+            async with semaphore:
+                try:
+                    first = items[0][1]
+                    conversation = await ConversationModel.create_or_get_conversation(
+                        first.sender_id,
+                        first.receiver_id
+                    )
+                    messages = await MessageModel.create_messages(
+                        conversation['conversation_id'],
+                        [(item.sender_id, item.receiver_id, item.content) for _, item in items],
+                        previous_timestamp=conversation.get('last_message_at')
+                    )
+                except Exception as e:
+                    logger.error(f"Batch send to {conversation_pair(first.sender_id, first.receiver_id)} failed: {str(e)}")
+                    for index, _ in items:
+                        results[index] = MessageBatchItemResult(index=index, error=f"Failed to send message: {str(e)}")
+                    return
+                for (index, _), message in zip(items, messages):
+                    results[index] = MessageBatchItemResult(index=index, message=MessageResponse(
+                        id=message['message_id'],
+                        sender_id=message['sender_id'],
+                        receiver_id=message['receiver_id'],
+                        content=message['content'],
+                        created_at=message['timestamp'],
+                        conversation_id=message['conversation_id']
+                    ))
+
+        await asyncio.gather(*(send_group(items) for items in groups.values()))
+        await publish_messages(result.message for result in results if result.message is not None)
+
+        failed = sum(1 for result in results if result.error is not None)
+        return MessageBatchResponse(
+            succeeded=len(results) - failed,
+            failed=failed,
+            results=results
+        )
     
     async def get_conversation_messages(
         self, 
         conversation_id: int, 
         page: int = 1, 
-        limit: int = 20
+        limit: int = 20,
+        cursor: Optional[str] = None
     ) -> PaginatedMessageResponse:
         """
         Get all messages in a conversation with pagination
@@ -74,6 +161,7 @@ class MessageController:
             conversation_id: ID of the conversation
             page: Page number
             limit: Number of messages per page
+            cursor: Cursor returned as next_cursor by the previous page
             
         Returns:
             Paginated list of messages
@@ -94,36 +182,236 @@ class MessageController:
                 )
             
             # Fetch messages and total count from the model
-            messages, total = await MessageModel.get_conversation_messages(
+            messages, total, next_cursor = await MessageModel.get_conversation_messages(
                 conversation_id=conversation_id,
                 page=page,
-                limit=limit
+                limit=limit,
+                cursor=cursor
             )
             logger.info(f"Messages fetched: {messages}")
             # Construct the paginated response
-            return PaginatedMessageResponse(
+            return render_response(build_response(
+                PaginatedMessageResponse,
                 total=total,
                 page=page,
                 limit=limit,
-                data=[MessageResponse(**msg) for msg in messages]
-            )
+                data=messages,
+                next_cursor=next_cursor,
+                has_more=next_cursor is not None,
+                sync_token=_sync_token(messages) if cursor is None and page == 1 else None
+            ))
             
         except HTTPException:
             # Re-raise HTTP exceptions
             raise
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
         except Exception as e:
+            if cursor and isinstance(e, PAGING_STATE_ERRORS):
+                # Cassandra rejected the paging state carried by the cursor
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Invalid cursor: {cursor}"
+                )
             # Handle other exceptions
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Failed to fetch conversation messages: {str(e)}"
             )
     
+    async def get_multiple_conversation_messages(
+        self,
+        conversation_ids: List[int],
+        limit: int = 20
+    ) -> Dict[int, PaginatedMessageResponse]:
+        """
+        Get the first page of messages of several conversations
+        
+        The conversations are read concurrently, at most
+        CONVERSATION_FETCH_CONCURRENCY at a time.
+        
+        Args:
+            conversation_ids: IDs of the conversations
+            limit: Number of messages per conversation
+            
+        Returns:
+            Map of conversation ID to its first page; conversations that do
+            not exist are left out
+            
+        Raises:
+            HTTPException: If too many conversations are requested or a read fails
+        """
+        conversation_ids = list(dict.fromkeys(conversation_ids))
+        if len(conversation_ids) > MAX_CONVERSATIONS_PER_FETCH:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"At most {MAX_CONVERSATIONS_PER_FETCH} conversations can be fetched at once"
+            )
+        semaphore = asyncio.Semaphore(CONVERSATION_FETCH_CONCURRENCY)
+
+        async def fetch(conversation_id: int) -> Optional[PaginatedMessageResponse]:
+            async with semaphore:
+                conversation = await ConversationModel.get_conversation(conversation_id)
+                if not conversation:
+                    return None
+                messages, total, next_cursor = await MessageModel.get_conversation_messages(
+                    conversation_id=conversation_id,
+                    page=1,
+                    limit=limit
+                )
+            return build_response(
+                PaginatedMessageResponse,
+                total=total,
+                page=1,
+                limit=limit,
+                data=messages,
+                next_cursor=next_cursor,
+                has_more=next_cursor is not None,
+                sync_token=_sync_token(messages)
+            )
+
+        try:
+            pages = await asyncio.gather(*(fetch(conversation_id) for conversation_id in conversation_ids))
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to fetch conversation messages: {str(e)}"
+            )
+        return render_response({
+            conversation_id: page
+            for conversation_id, page in zip(conversation_ids, pages)
+            if page is not None
+        })
+    
+    async def sync_conversation_messages(
+        self,
+        conversation_id: int,
+        sync_token: Optional[str] = None,
+        limit: int = 100,
+        wait: float = 0
+    ) -> MessageSyncResponse:
+        """
+        Get the messages of a conversation newer than a sync token
+        
+        With `wait`, an empty result is held back until a new message arrives
+        or the wait times out (long poll).
+        
+        Args:
+            conversation_id: ID of the conversation
+            sync_token: sync_token of the previous sync or of the first page
+            limit: Maximum number of messages
+            wait: Seconds to wait for new messages when there are none
+            
+        Returns:
+            New messages, oldest first, and the token to sync from next
+            
+        Raises:
+            HTTPException: If conversation not found or the token is malformed
+        """
+        try:
+            conversation = await ConversationModel.get_conversation(conversation_id)
+            if not conversation:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Conversation with ID {conversation_id} not found"
+                )
+
+            messages, next_token, has_more = await long_poll(
+                {conversation_channel(conversation_id)},
+                lambda: MessageModel.get_messages_after(conversation_id, sync_token, limit),
+                wait
+            )
+            return render_response(build_response(
+                MessageSyncResponse,
+                data=messages,
+                sync_token=next_token,
+                has_more=has_more
+            ))
+        except HTTPException:
+            raise
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to sync conversation messages: {str(e)}"
+            )
+    
+    async def export_conversation_messages(
+        self,
+        conversation_id: int,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        cursor: Optional[str] = None
+    ) -> StreamingResponse:
+        """
+        Stream every message of a conversation as NDJSON, newest first
+        
+        Each line is a message with a "cursor" field; pass the cursor of the
+        last line received to resume an interrupted export.
+        
+        Args:
+            conversation_id: ID of the conversation
+            since: Only messages at or after this time
+            until: Only messages before this time
+            cursor: Cursor of the last message already exported
+            
+        Returns:
+            Streaming NDJSON response
+            
+        Raises:
+            HTTPException: If conversation not found or the cursor is malformed
+        """
+        try:
+            conversation = await ConversationModel.get_conversation(conversation_id)
+            if not conversation:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Conversation with ID {conversation_id} not found"
+                )
+            rows = MessageModel.export_messages(conversation_id, since, until, cursor)
+        except HTTPException:
+            raise
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to export conversation messages: {str(e)}"
+            )
+
+        async def lines():
+            try:
+                async for message, message_cursor in rows:
+                    yield json.dumps({
+                        **message,
+                        "created_at": message["created_at"].isoformat(),
+                        "cursor": message_cursor
+                    }) + "\n"
+            except Exception as e:
+                # Headers are already sent; the client resumes from its last cursor
+                logger.error(f"Export of conversation {conversation_id} failed: {str(e)}")
+                raise
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+    
     async def get_messages_before_timestamp(
         self, 
         conversation_id: int, 
         before_timestamp: datetime,
         page: int = 1, 
-        limit: int = 20
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        exact_total: bool = True
     ) -> PaginatedMessageResponse:
         """
         Get messages in a conversation before a specific timestamp with pagination
@@ -133,6 +421,8 @@ class MessageController:
             before_timestamp: Get messages before this timestamp
             page: Page number
             limit: Number of messages per page
+            cursor: Cursor returned as next_cursor by the previous page
+            exact_total: Count matching messages; if False, only has_more is reported
             
         Returns:
             Paginated list of messages
@@ -153,27 +443,52 @@ class MessageController:
                 )
             
             # Fetch messages before the timestamp and total count from the model
-            messages, total = await MessageModel.get_messages_before_timestamp(
+            messages, total, next_cursor = await MessageModel.get_messages_before_timestamp(
                 conversation_id=conversation_id,
                 before_timestamp=before_timestamp,
                 page=page,
-                limit=limit
+                limit=limit,
+                cursor=cursor,
+                exact_total=exact_total
             )
             
             # Construct the paginated response
-            return PaginatedMessageResponse(
+            return render_response(build_response(
+                PaginatedMessageResponse,
                 total=total,
                 page=page,
                 limit=limit,
-                data=[MessageResponse(**msg) for msg in messages]
-            )
+                data=messages,
+                next_cursor=next_cursor,
+                has_more=next_cursor is not None
+            ))
             
         except HTTPException:
             # Re-raise HTTP exceptions
             raise
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
         except Exception as e:
+            if cursor and isinstance(e, PAGING_STATE_ERRORS):
+                # Cassandra rejected the paging state carried by the cursor
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Invalid cursor: {cursor}"
+                )
             # Handle other exceptions
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Failed to fetch messages before timestamp: {str(e)}"
             )
+
+
+def _sync_token(messages: List[Dict]) -> Optional[str]:
+    """Sync token of a first page: the position of its newest message."""
+    if not messages:
+        return None
+    # Messages sharing the newest timestamp are listed by ascending ID; the sync position is the highest
+    newest = max(messages, key=lambda message: (message["created_at"], message["id"]))
+    return encode_position_cursor(newest["created_at"], newest["id"])
@@ -0,0 +1,199 @@
+from typing import Any, Awaitable, Callable, Iterable, List, Optional, Set, Tuple
+from fastapi import HTTPException, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+import asyncio
+import json
+import logging
+import os
+
+from app.realtime import broker, conversation_channel, inbox_channel
+from app.schemas.message import MessageResponse
+
+logger = logging.getLogger(__name__)
+
+# Seconds between keep-alive comments on an idle event stream
+REALTIME_HEARTBEAT_SECONDS = float(os.getenv("REALTIME_HEARTBEAT_SECONDS", "15"))
+MAX_CONVERSATIONS_PER_SUBSCRIPTION = 100
+
+# Longest a sync request may wait for new data
+SYNC_MAX_WAIT_SECONDS = float(os.getenv("SYNC_MAX_WAIT_SECONDS", "30"))
+
+
+async def publish_messages(messages: Iterable[MessageResponse]) -> None:
+    """
+    Fan committed messages out to the subscribers of their conversation and
+    of both participants' inboxes
+
+    Delivery is best effort: a failure is logged, never raised to the sender.
+    """
+    try:
+        for message in messages:
+            # One event_id across the channels, so clients subscribed to several get it once
+            event = {
+                "type": "message",
+                "event_id": f"message:{message.id}",
+                "message": message.model_dump(mode="json"),
+            }
+            await broker.publish(conversation_channel(message.conversation_id), event)
+            await broker.publish(inbox_channel(message.sender_id), event)
+            if message.receiver_id != message.sender_id:
+                await broker.publish(inbox_channel(message.receiver_id), event)
+    except Exception as e:
+        logger.error(f"Failed to publish messages: {str(e)}")
+
+
+async def long_poll(
+    channels: Set[str],
+    read: Callable[[], Awaitable[Tuple[List[Any], ...]]],
+    wait: float
+) -> Tuple[List[Any], ...]:
+    """
+    Run read(); if it finds nothing, wait up to `wait` seconds (at most
+    SYNC_MAX_WAIT_SECONDS) for an event on any of the channels and read again
+
+    The subscription is opened before the first read, so an event published
+    in between is not missed. Writes made on other workers only wake the wait
+    with a cross-worker bus; otherwise the read after the timeout finds them.
+
+    Args:
+        channels: Channels whose events mean there may be new data
+        read: Returns a tuple whose first element is the list of new items
+        wait: Seconds to wait when there is nothing new; 0 to return at once
+
+    Returns:
+        The result of the last read
+    """
+    wait = min(wait, SYNC_MAX_WAIT_SECONDS)
+    if wait <= 0:
+        return await read()
+    subscription = broker.subscribe(channels)
+    try:
+        result = await read()
+        if not result[0]:
+            await subscription.get(timeout=wait)
+            result = await read()
+        return result
+    finally:
+        subscription.close()
+
+
+class RealtimeController:
+    """
+    Controller for pushing new messages to connected clients
+    """
+
+    def _channels(self, conversation_ids: List[int], user_id: Optional[int]) -> Set[str]:
+        """
+        Channels of a subscription request
+
+        Raises:
+            ValueError: If nothing or too much is subscribed to
+        """
+        conversation_ids = list(dict.fromkeys(conversation_ids))
+        if len(conversation_ids) > MAX_CONVERSATIONS_PER_SUBSCRIPTION:
+            raise ValueError(f"At most {MAX_CONVERSATIONS_PER_SUBSCRIPTION} conversations can be subscribed to at once")
+        channels = {conversation_channel(conversation_id) for conversation_id in conversation_ids}
+        if user_id is not None:
+            channels.add(inbox_channel(user_id))
+        if not channels:
+            raise ValueError("Subscribe to at least one conversation or to a user's inbox")
+        return channels
+
+    async def websocket_session(
+        self,
+        websocket: WebSocket,
+        conversation_ids: List[int],
+        user_id: Optional[int] = None
+    ) -> None:
+        """
+        Send every event of the subscribed channels as a JSON text frame until
+        the client disconnects
+
+        Args:
+            websocket: The connection, not yet accepted
+            conversation_ids: Conversations to receive new messages of
+            user_id: User to receive inbox updates of
+        """
+        try:
+            channels = self._channels(conversation_ids, user_id)
+        except ValueError as e:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=str(e))
+            return
+
+        await websocket.accept()
+        subscription = broker.subscribe(channels)
+        disconnected = False
+
+        async def receive():
+            # Client frames are ignored; reading them is how a disconnect is noticed
+            nonlocal disconnected
+            try:
+                while True:
+                    await websocket.receive_text()
+            except WebSocketDisconnect:
+                disconnected = True
+            finally:
+                subscription.close()
+
+        receiver = asyncio.create_task(receive())
+        try:
+            while True:
+                event = await subscription.get()
+                if event is None:
+                    break
+                await websocket.send_json(event)
+        except WebSocketDisconnect:
+            disconnected = True
+        finally:
+            subscription.close()
+            receiver.cancel()
+        if not disconnected:
+            # Closed by the server, e.g. after a resync event: end the connection
+            await websocket.close()
+
+    async def event_stream(
+        self,
+        conversation_ids: List[int],
+        user_id: Optional[int] = None
+    ) -> StreamingResponse:
+        """
+        Stream every event of the subscribed channels as Server-Sent Events
+
+        Args:
+            conversation_ids: Conversations to receive new messages of
+            user_id: User to receive inbox updates of
+
+        Returns:
+            Streaming text/event-stream response
+
+        Raises:
+            HTTPException: If nothing or too much is subscribed to
+        """
+        try:
+            channels = self._channels(conversation_ids, user_id)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        subscription = broker.subscribe(channels)
+
+        async def events():
+            try:
+                while True:
+                    event = await subscription.get(timeout=REALTIME_HEARTBEAT_SECONDS)
+                    if event is None:
+                        if subscription.closed:
+                            break
+                        # Keeps proxies from closing an idle connection
+                        yield ": keep-alive\n\n"
+                        continue
+                    yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+            finally:
+                subscription.close()
+
+        return StreamingResponse(
+            events(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
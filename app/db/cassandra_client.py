@@ -2,18 +2,78 @@
 Cassandra client for the Messenger application.
 This provides a connection to the Cassandra database.
 """
+import asyncio
 import os
+import time
 import uuid
-from typing import List, Dict, Any, Optional
+from typing import Iterable, List, Dict, Any, Optional, Tuple
 from datetime import datetime
 import logging
 
-from cassandra.cluster import Cluster, Session
+from cassandra import InvalidRequest
+from cassandra.cluster import EXEC_PROFILE_DEFAULT, Cluster, Session
+from cassandra.policies import HostDistance
 from cassandra.auth import PlainTextAuthProvider
-from cassandra.query import SimpleStatement, dict_factory
+from cassandra.query import BatchStatement, BatchType, SimpleStatement
+
+from app.db.profiles import HedgePlan, execution_profiles
+from app.db.rows import row_factory
+from app.metrics import SIZE_BUCKETS, LabeledCounter, LabeledHistogram
 
 logger = logging.getLogger(__name__)
 
+# InvalidRequest messages of a statement prepared against a table or column
+# that has since been dropped or recreated
+SCHEMA_CHANGE_MESSAGES = ("unconfigured table", "Undefined column name", "Unknown identifier")
+
+# Per-statement metrics, labelled by registered statement key, "batch:<key of
+# the first statement>" for batches and "cql" for unregistered CQL text
+QUERY_LATENCY = LabeledHistogram(
+    "cassandra_query_duration_seconds",
+    "Time from executing a statement to having its rows (or its error).",
+    ("statement",),
+)
+QUERY_ROWS = LabeledHistogram(
+    "cassandra_query_rows", "Rows returned per statement execution.", ("statement",), SIZE_BUCKETS
+)
+QUERY_REQUEST_BYTES = LabeledCounter(
+    "cassandra_query_request_bytes_total",
+    "Encoded size of the requests sent to Cassandra, one per page fetched.",
+    ("statement",),
+)
+QUERY_ERRORS = LabeledCounter(
+    "cassandra_query_errors_total", "Statement executions that raised an error.", ("statement",)
+)
+
+
+class AsyncResultSet(list):
+    """Rows returned by CassandraClient.execute, plus the paging state of the next page."""
+
+    def __init__(self, rows=(), paging_state: Optional[bytes] = None):
+        super().__init__(rows)
+        self.paging_state = paging_state
+
+    @property
+    def current_rows(self) -> list:
+        return self
+
+    def one(self):
+        """Return the first row, or None if there are no rows."""
+        return self[0] if self else None
+
+
+class StatementMetrics:
+    """The metric children of one statement label, looked up once and then reused."""
+
+    __slots__ = ("latency", "rows", "request_bytes", "errors")
+
+    def __init__(self, label: str):
+        self.latency = QUERY_LATENCY.labels(label)
+        self.rows = QUERY_ROWS.labels(label)
+        self.request_bytes = QUERY_REQUEST_BYTES.labels(label)
+        self.errors = QUERY_ERRORS.labels(label)
+
+
 class CassandraClient:
     """Singleton Cassandra client for the application."""
     
@@ -30,12 +90,26 @@ class CassandraClient:
         if self._initialized:
             return
         
+        # Comma-separated contact points
         self.host = os.getenv("CASSANDRA_HOST", "localhost")
         self.port = int(os.getenv("CASSANDRA_PORT", "9042"))
         self.keyspace = os.getenv("CASSANDRA_KEYSPACE", "messenger")
+        # "driver" talks to a real cluster; "memory" uses the in-process backend
+        # (app/db/memory_backend.py) for offline benchmarks and load tests
+        self.backend = os.getenv("CASSANDRA_BACKEND", "driver")
         
         self.cluster = None
         self.session = None
+        # Prepared-statement registry: key (statement name or CQL text) -> CQL,
+        # and key -> PreparedStatement once prepared
+        self._statements: Dict[str, str] = {}
+        self._prepared: Dict[str, Any] = {}
+        # Keys of the statements that may safely run more than once
+        self._idempotent = set()
+        # Statement key -> hedging counters, see hedge_stats()
+        self._hedges: Dict[str, Dict[str, int]] = {}
+        # Statement label -> StatementMetrics
+        self._metrics: Dict[str, StatementMetrics] = {}
         self.connect()
         
         self._initialized = True
@@ -43,39 +117,254 @@ class CassandraClient:
     def connect(self) -> None:
         """Connect to the Cassandra cluster."""
         try:
-            self.cluster = Cluster([self.host], port=self.port)
-            self.session = self.cluster.connect(self.keyspace) # Change here self.keyspace
-            self.session.row_factory = dict_factory
+            if self.backend == "memory":
+                from app.db.memory_backend import MemoryCluster, parse_latency
+                self.cluster = MemoryCluster(parse_latency(os.getenv("CASSANDRA_MEMORY_LATENCY_MS", "")))
+                self.session = self.cluster.connect(self.keyspace)
+                self.session.row_factory = row_factory
+                return
+            if self.backend != "driver":
+                raise ValueError(f"Unknown CASSANDRA_BACKEND: {self.backend}")
+            cluster_options = {}
+            if os.getenv("CASSANDRA_PROTOCOL_VERSION"):
+                cluster_options["protocol_version"] = int(os.getenv("CASSANDRA_PROTOCOL_VERSION"))
+            # The driver re-prepares statements on nodes that restart or join.
+            # Execution profiles (app/db/profiles.py) carry the token- and
+            # DC-aware routing policy and the row factory
+            self.cluster = Cluster(
+                [host.strip() for host in self.host.split(",")],
+                port=self.port,
+                prepare_on_all_hosts=True,
+                reprepare_on_up=True,
+                execution_profiles=execution_profiles(row_factory),
+                **cluster_options
+            )
+            self._size_pools(os.getenv("CASSANDRA_CONNECTIONS_PER_HOST"))
+            self.session = self.cluster.connect(self.keyspace)
             logger.info(f"Connected to Cassandra at {self.host}:{self.port}, keyspace: {self.keyspace}")
         except Exception as e:
             logger.error(f"Failed to connect to Cassandra: {str(e)}")
             raise
     
+    def _size_pools(self, connections_per_host: Optional[str]) -> None:
+        """
+        Open CASSANDRA_CONNECTIONS_PER_HOST connections to each local node.
+
+        Only protocol v1 and v2 pool several connections per host, so this
+        needs CASSANDRA_PROTOCOL_VERSION set to 1 or 2; from v3 on the driver
+        multiplexes up to 32768 requests over a single connection per host
+        and the setting is ignored.
+        """
+        if not connections_per_host:
+            return
+        if self.cluster.protocol_version is None or self.cluster.protocol_version >= 3:
+            logger.warning(
+                "CASSANDRA_CONNECTIONS_PER_HOST ignored: protocol v3+ uses one connection per host"
+            )
+            return
+        connections = int(connections_per_host)
+        self.cluster.set_max_connections_per_host(HostDistance.LOCAL, max(connections, 1))
+        self.cluster.set_core_connections_per_host(HostDistance.LOCAL, connections)
+
     def close(self) -> None:
         """Close the Cassandra connection."""
         if self.cluster:
             self.cluster.shutdown()
             logger.info("Cassandra connection closed")
     
-    async def execute(self, query: str, params: tuple = None):
-        if not self.session:
-            self.connect()
-    
+    def register_statement(self, cql: str, name: Optional[str] = None, idempotent: bool = False) -> str:
+        """
+        Register a CQL statement to be prepared and executed by key.
+
+        Args:
+            cql: The CQL statement, using ? placeholders
+            name: Key to register it under (defaults to the CQL text itself)
+            idempotent: Whether running it more than once has the same effect
+                as running it once. Only idempotent statements are hedged by
+                speculative execution or retried after a timeout; counter
+                updates and lightweight transactions never are.
+
+        Returns:
+            The key the statement was registered under
+        """
+        key = name or cql
+        if self._statements.get(key) != cql:
+            self._statements[key] = cql
+            self._prepared.pop(key, None)
+        if idempotent:
+            self._idempotent.add(key)
+        else:
+            self._idempotent.discard(key)
+        if key in self._prepared:
+            self._prepared[key].is_idempotent = idempotent
+        return key
+
+    def register_statements(self, statements: Dict[str, str], idempotent: Iterable[str] = ()) -> None:
+        """Register a mapping of statement name -> CQL, marking the names in `idempotent` as such."""
+        idempotent = set(idempotent)
+        for name, cql in statements.items():
+            self.register_statement(cql, name, name in idempotent)
+
+    async def prepare_all(self) -> None:
+        """Prepare every registered statement (called once at startup)."""
+        for key in list(self._statements):
+            await self._get_prepared(key)
+        logger.info(f"Prepared {len(self._prepared)} CQL statements")
+
+    async def _get_prepared(self, key: str, refresh: bool = False):
+        """Return the prepared handle for a registered statement, preparing it if needed."""
+        prepared = None if refresh else self._prepared.get(key)
+        if prepared is None:
+            if not self.session:
+                self.connect()
+            # Session.prepare blocks on a round-trip, so keep it off the event loop
+            prepared = await asyncio.to_thread(self.session.prepare, self._statements[key])
+            # Bound statements inherit the flag the driver's speculative execution checks
+            prepared.is_idempotent = key in self._idempotent
+            self._prepared[key] = prepared
+        return prepared
+
+    async def execute(
+        self,
+        query: str,
+        params: tuple = None,
+        fetch_size: Optional[int] = None,
+        paging_state: Optional[bytes] = None,
+        profile: Optional[str] = None
+    ) -> AsyncResultSet:
+        """
+        Execute a CQL query without blocking the event loop.
+
+        Registered statement keys are executed as prepared statements; any
+        other string is sent as plain CQL. The driver's ResponseFuture is
+        bridged onto an asyncio future, so the calling coroutine yields to the
+        loop while the query is in flight.
+
+        Args:
+            query: A registered statement key, or a CQL query string
+            params: The parameters for the query
+            fetch_size: If given, fetch a single page of at most this many rows
+                instead of every page
+            paging_state: Paging state of the page to fetch (from a previous
+                result's paging_state)
+            profile: Name of the execution profile to run it under
+                (app/db/profiles.py; the default profile if None)
+
+        Returns:
+            AsyncResultSet with the rows of the query
+        """
+        registered = query in self._statements
+        metrics = self._statement_metrics(query if registered else "cql")
+        start = time.perf_counter()
         try:
-            # Use the synchronous execute method - this is fine in FastAPI
-            # as long as the database operations aren't too slow
-            return self.session.execute(query, params or ())
+            if registered:
+                result = await self._execute_prepared(query, params, fetch_size, paging_state, profile, metrics)
+            else:
+                response_future = self.execute_async(query, params, fetch_size, paging_state, profile)
+                result = await self._wrap_response_future(
+                    response_future, fetch_all=fetch_size is None, metrics=metrics
+                )
         except Exception as e:
+            metrics.latency.observe(time.perf_counter() - start)
+            metrics.errors.inc()
             logger.error(f"Query execution failed: {str(e)}")
             raise
-        
-    def execute_async(self, query: str, params: dict = None):
+        metrics.latency.observe(time.perf_counter() - start)
+        metrics.rows.observe(len(result))
+        return result
+
+    async def _execute_prepared(
+        self,
+        key: str,
+        params: tuple = None,
+        fetch_size: Optional[int] = None,
+        paging_state: Optional[bytes] = None,
+        profile: Optional[str] = None,
+        metrics: Optional[StatementMetrics] = None
+    ) -> AsyncResultSet:
+        prepared = await self._get_prepared(key)
+        try:
+            return await self._send_prepared(key, prepared, params, fetch_size, paging_state, profile, metrics)
+        except InvalidRequest as e:
+            # The driver re-prepares handles a node no longer knows by itself.
+            # Only a schema change leaves a handle whose columns no longer
+            # exist; any other rejection is about the request, not the handle
+            if not any(message in str(e) for message in SCHEMA_CHANGE_MESSAGES):
+                raise
+            logger.warning(f"Re-preparing statement '{key}' after a schema change: {str(e)}")
+            prepared = await self._get_prepared(key, refresh=True)
+            return await self._send_prepared(key, prepared, params, fetch_size, paging_state, profile, metrics)
+
+    async def _send_prepared(
+        self, key, prepared, params, fetch_size, paging_state, profile, metrics=None
+    ) -> AsyncResultSet:
+        bound = prepared.bind(params or ())
+        if fetch_size is not None:
+            bound.fetch_size = fetch_size
+        response_future = self.session.execute_async(
+            bound, paging_state=paging_state, execution_profile=profile or EXEC_PROFILE_DEFAULT
+        )
+        # Set by HedgingPolicy when the statement runs under a hedging profile
+        hedge_plan = getattr(bound, "hedge_plan", None)
+        return await self._wrap_response_future(
+            response_future, fetch_all=fetch_size is None, key=key, metrics=metrics, hedge_plan=hedge_plan
+        )
+
+    async def execute_batch(
+        self,
+        statements: List[Tuple[str, tuple]],
+        logged: bool = False,
+        profile: Optional[str] = None
+    ) -> AsyncResultSet:
+        """
+        Execute registered statements as one batch.
+
+        Unlogged by default: use it to group writes to a single partition into
+        one round-trip, not for atomicity across partitions.
+
+        Args:
+            statements: (statement key, params) pairs
+            logged: Use a LOGGED batch instead of UNLOGGED
+            profile: Name of the execution profile to run it under
+
+        Returns:
+            AsyncResultSet with the rows of the batch result
+        """
+        metrics = self._statement_metrics(f"batch:{statements[0][0]}" if statements else "batch")
+        start = time.perf_counter()
+        try:
+            batch_class = getattr(self.session, "batch_statement_class", BatchStatement)
+            batch = batch_class(batch_type=BatchType.LOGGED if logged else BatchType.UNLOGGED)
+            for key, params in statements:
+                batch.add(await self._get_prepared(key), params or ())
+            response_future = self.session.execute_async(batch, execution_profile=profile or EXEC_PROFILE_DEFAULT)
+            result = await self._wrap_response_future(response_future, metrics=metrics)
+        except Exception as e:
+            metrics.latency.observe(time.perf_counter() - start)
+            metrics.errors.inc()
+            logger.error(f"Batch execution failed: {str(e)}")
+            raise
+        metrics.latency.observe(time.perf_counter() - start)
+        metrics.rows.observe(len(result))
+        return result
+
+    def execute_async(
+        self,
+        query: str,
+        params=None,
+        fetch_size: Optional[int] = None,
+        paging_state: Optional[bytes] = None,
+        profile: Optional[str] = None
+    ):
         """
         Execute a CQL query asynchronously.
         
         Args:
             query: The CQL query string
             params: The parameters for the query
+            fetch_size: Number of rows per page (driver default if None)
+            paging_state: Paging state of the page to fetch
+            profile: Name of the execution profile to run it under
             
         Returns:
             Async result object
@@ -84,11 +373,106 @@ class CassandraClient:
             self.connect()
         
         try:
-            statement = SimpleStatement(query)
-            return self.session.execute_async(statement, params or {})
+            statement = SimpleStatement(query, fetch_size=fetch_size)
+            return self.session.execute_async(
+                statement, params or (), paging_state=paging_state,
+                execution_profile=profile or EXEC_PROFILE_DEFAULT
+            )
         except Exception as e:
             logger.error(f"Async query execution failed: {str(e)}")
             raise
+
+    def _wrap_response_future(
+        self,
+        response_future,
+        fetch_all: bool = True,
+        key: Optional[str] = None,
+        metrics: Optional[StatementMetrics] = None,
+        hedge_plan: Optional[HedgePlan] = None
+    ) -> asyncio.Future:
+        """
+        Wrap a driver ResponseFuture in an awaitable asyncio future.
+
+        Driver callbacks run on the driver's IO thread, so results are handed
+        back to the event loop with call_soon_threadsafe. With fetch_all, every
+        page is fetched; otherwise only the first page is, and the result
+        carries the paging state of the next one. The hedges `hedge_plan`
+        records for a registered statement's first page (the driver only
+        speculates on the first) are counted under its key, and the size of
+        every page request is added to `metrics`.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        rows = []
+        request_bytes = 0
+        if key is None:
+            hedge_plan = None
+
+        def set_result(result, sent_bytes):
+            if metrics is not None:
+                metrics.request_bytes.inc(sent_bytes)
+            if not future.done():
+                future.set_result(result)
+
+        def set_exception(exc):
+            if not future.done():
+                future.set_exception(exc)
+
+        def on_page(page):
+            nonlocal hedge_plan, request_bytes
+            # Driver futures carry the size of the last request sent; the memory backend sends none
+            request_bytes += getattr(response_future, "request_encoded_size", None) or 0
+            if hedge_plan is not None:
+                # Hosts a speculative execution was sent to; retries also move
+                # the request to other replicas, but are not hedges
+                attempted = response_future.attempted_hosts
+                hedge_hosts = {host for host in hedge_plan.hedge_hosts if host in attempted[1:]}
+                won = response_future.coordinator_host in hedge_hosts
+                loop.call_soon_threadsafe(self._record_hedges, key, len(hedge_hosts), won)
+                hedge_plan = None
+            if page:
+                rows.extend(page)
+            if fetch_all and response_future.has_more_pages:
+                # Callbacks stay registered, so on_page fires again for the next page
+                response_future.start_fetching_next_page()
+                return
+            # The page's result is already set, so result() returns without blocking
+            next_paging_state = None if fetch_all else response_future.result().paging_state
+            loop.call_soon_threadsafe(set_result, AsyncResultSet(rows, next_paging_state), request_bytes)
+
+        def on_error(exc):
+            loop.call_soon_threadsafe(set_exception, exc)
+
+        response_future.add_callbacks(on_page, on_error)
+        return future
+
+    def _statement_metrics(self, label: str) -> StatementMetrics:
+        metrics = self._metrics.get(label)
+        if metrics is None:
+            metrics = self._metrics[label] = StatementMetrics(label)
+        return metrics
+
+    def _record_hedges(self, key: str, hedges: int, won: bool) -> None:
+        counters = self._hedges.get(key)
+        if counters is None:
+            counters = self._hedges[key] = {"executions": 0, "hedged": 0, "hedges": 0, "hedge_wins": 0}
+        counters["executions"] += 1
+        if hedges:
+            counters["hedged"] += 1
+            counters["hedges"] += hedges
+        if won:
+            counters["hedge_wins"] += 1
+
+    def hedge_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Speculative execution counters per statement: hedgeable executions,
+        executions that sent at least one hedge, hedges sent, and executions
+        answered by a hedge rather than the first replica tried.
+        """
+        return {
+            key: {**counters, "win_ratio": counters["hedge_wins"] / counters["hedged"] if counters["hedged"] else 0.0}
+            for key, counters in sorted(self._hedges.items())
+        }
     
     def get_session(self) -> Session:
         """Get the Cassandra session."""
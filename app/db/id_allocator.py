@@ -0,0 +1,247 @@
+"""
+ID generation for the Messenger application.
+
+Two modes are available, selected with the ID_ALLOCATOR_MODE environment variable:
+
+- "block" (default): each process leases a range of sequential IDs
+  (ID_BLOCK_SIZE, default 1000) by advancing a per-name high-water mark in
+  the id_allocations table with a lightweight transaction. IDs inside a
+  leased block are handed out from memory, so most calls need no round-trip.
+- "snowflake": time-ordered 64-bit IDs (41 bits of milliseconds, 10 bits of
+  worker ID, 12 bits of sequence) generated entirely in process. Set
+  ID_WORKER_ID to a value unique to each process.
+"""
+import os
+import time
+import socket
+import asyncio
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from app.db.cassandra_client import cassandra_client
+from app.db.profiles import WRITE_DURABLE
+
+logger = logging.getLogger(__name__)
+
+SELECT_HIGH_WATER = "SELECT high_water FROM id_allocations WHERE name = ?"
+INSERT_HIGH_WATER = "INSERT INTO id_allocations (name, high_water) VALUES (?, ?) IF NOT EXISTS"
+UPDATE_HIGH_WATER = "UPDATE id_allocations SET high_water = ? WHERE name = ? IF high_water = ?"
+# The legacy counters table seeds the high-water mark so new IDs never collide with existing rows
+SELECT_LEGACY_COUNTER = "SELECT counter_value FROM counters WHERE counter_name = ?"
+
+cassandra_client.register_statements({
+    "select_id_high_water": SELECT_HIGH_WATER,
+    "insert_id_high_water": INSERT_HIGH_WATER,
+    "update_id_high_water": UPDATE_HIGH_WATER,
+    "select_legacy_id_counter": SELECT_LEGACY_COUNTER,
+}, idempotent=("select_id_high_water", "select_legacy_id_counter"))
+
+
+class BlockIdAllocator:
+    """
+    Hands out sequential IDs from blocks leased with an LWT-guarded high-water mark.
+    """
+
+    def __init__(self, name: str, block_size: int = 1000):
+        self.name = name
+        self.block_size = block_size
+        self._next = 1
+        self._end = 0
+        self._lock = asyncio.Lock()
+
+    async def next_id(self) -> int:
+        """Return the next ID, leasing a new block first if the current one is used up."""
+        return (await self.next_ids(1))[0]
+
+    async def next_ids(self, count: int) -> List[int]:
+        """Return `count` IDs, leasing as many blocks as needed."""
+        ids = []
+        while len(ids) < count:
+            if self._next > self._end:
+                async with self._lock:
+                    # Another coroutine may have leased a block while we waited
+                    if self._next > self._end:
+                        self._next, self._end = await self._lease()
+            take = min(count - len(ids), self._end - self._next + 1)
+            ids.extend(range(self._next, self._next + take))
+            self._next += take
+        return ids
+
+    def next_id_sync(self, session) -> int:
+        """Blocking variant of next_id for scripts that use a plain driver session."""
+        if self._next > self._end:
+            self._next, self._end = self._lease_sync(session)
+        next_id = self._next
+        self._next += 1
+        return next_id
+
+    async def _lease(self) -> Tuple[int, int]:
+        """Advance the high-water mark by one block and return the leased (first, last) range."""
+        rows = await cassandra_client.execute("select_id_high_water", (self.name,), profile=WRITE_DURABLE)
+        high_water = rows[0]["high_water"] if rows else None
+        while True:
+            if high_water is None:
+                seed_rows = await cassandra_client.execute(
+                    "select_legacy_id_counter", (self.name,),
+                    profile=WRITE_DURABLE
+                )
+                seed = seed_rows[0]["counter_value"] if seed_rows else 0
+                result = await cassandra_client.execute(
+                    "insert_id_high_water", (self.name, seed + self.block_size),
+                    profile=WRITE_DURABLE
+                )
+                current = seed
+            else:
+                result = await cassandra_client.execute(
+                    "update_id_high_water", (high_water + self.block_size, self.name, high_water),
+                    profile=WRITE_DURABLE
+                )
+                current = high_water
+
+            leased, high_water = self._lease_outcome(result[0], current)
+            if leased:
+                return leased
+
+    def _lease_sync(self, session) -> Tuple[int, int]:
+        rows = session.execute(SELECT_HIGH_WATER.replace("?", "%s"), (self.name,))
+        row = rows.one()
+        high_water = _column(row, "high_water") if row else None
+        while True:
+            if high_water is None:
+                seed_row = session.execute(SELECT_LEGACY_COUNTER.replace("?", "%s"), (self.name,)).one()
+                seed = _column(seed_row, "counter_value") if seed_row else 0
+                result = session.execute(
+                    INSERT_HIGH_WATER.replace("?", "%s"), (self.name, seed + self.block_size)
+                )
+                current = seed
+            else:
+                result = session.execute(
+                    UPDATE_HIGH_WATER.replace("?", "%s"), (high_water + self.block_size, self.name, high_water)
+                )
+                current = high_water
+
+            leased, high_water = self._lease_outcome(result.one(), current)
+            if leased:
+                return leased
+
+    def _lease_outcome(self, row, current: int) -> Tuple[Optional[Tuple[int, int]], Optional[int]]:
+        """
+        Interpret an LWT result row.
+
+        Returns the leased range if the transaction applied, otherwise None and
+        the high-water mark another process has already moved it to.
+        """
+        if _column(row, "[applied]"):
+            logger.info(f"Leased IDs {current + 1}-{current + self.block_size} for '{self.name}'")
+            return (current + 1, current + self.block_size), None
+        return None, _column(row, "high_water")
+
+
+class SnowflakeIdGenerator:
+    """
+    Time-ordered 64-bit IDs: 41 bits of milliseconds since EPOCH_MS,
+    10 bits of worker ID and a 12-bit per-millisecond sequence.
+    """
+
+    EPOCH_MS = 1704067200000  # 2024-01-01T00:00:00Z
+    WORKER_BITS = 10
+    SEQUENCE_BITS = 12
+    MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+    MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+    def __init__(self, worker_id: int):
+        if not 0 <= worker_id <= self.MAX_WORKER_ID:
+            raise ValueError(f"worker_id must be between 0 and {self.MAX_WORKER_ID}")
+        self.worker_id = worker_id
+        self._last_ms = -1
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def next_id(self) -> int:
+        with self._lock:
+            now_ms = self._now_ms()
+            if now_ms < self._last_ms:
+                # Clock moved backwards; never reuse a timestamp we already issued from
+                now_ms = self._wait_until(self._last_ms)
+            if now_ms == self._last_ms:
+                self._sequence = (self._sequence + 1) & self.MAX_SEQUENCE
+                if self._sequence == 0:
+                    now_ms = self._wait_until(self._last_ms + 1)
+            else:
+                self._sequence = 0
+            self._last_ms = now_ms
+            return (
+                ((now_ms - self.EPOCH_MS) << (self.WORKER_BITS + self.SEQUENCE_BITS))
+                | (self.worker_id << self.SEQUENCE_BITS)
+                | self._sequence
+            )
+
+    def _now_ms(self) -> int:
+        return time.time_ns() // 1_000_000
+
+    def _wait_until(self, target_ms: int) -> int:
+        now_ms = self._now_ms()
+        while now_ms < target_ms:
+            time.sleep((target_ms - now_ms) / 1000)
+            now_ms = self._now_ms()
+        return now_ms
+
+
+class IdGenerator:
+    """Named ID sequences ("message_id", "conversation_id") backed by the configured mode."""
+
+    def __init__(self, mode: str = "block", block_size: int = 1000, worker_id: Optional[int] = None):
+        if mode not in ("block", "snowflake"):
+            raise ValueError(f"Unknown ID allocator mode: {mode}")
+        self.mode = mode
+        self.block_size = block_size
+        self._allocators: Dict[str, BlockIdAllocator] = {}
+        self._snowflake = None
+        if mode == "snowflake":
+            if worker_id is None:
+                worker_id = hash((socket.gethostname(), os.getpid())) & SnowflakeIdGenerator.MAX_WORKER_ID
+                logger.warning(f"ID_WORKER_ID not set; using derived worker ID {worker_id}")
+            self._snowflake = SnowflakeIdGenerator(worker_id)
+
+    @classmethod
+    def from_env(cls) -> "IdGenerator":
+        worker_id = os.getenv("ID_WORKER_ID")
+        return cls(
+            mode=os.getenv("ID_ALLOCATOR_MODE", "block"),
+            block_size=int(os.getenv("ID_BLOCK_SIZE", "1000")),
+            worker_id=int(worker_id) if worker_id is not None else None,
+        )
+
+    def allocator(self, name: str) -> BlockIdAllocator:
+        if name not in self._allocators:
+            self._allocators[name] = BlockIdAllocator(name, self.block_size)
+        return self._allocators[name]
+
+    async def next_id(self, name: str) -> int:
+        if self._snowflake:
+            return self._snowflake.next_id()
+        return await self.allocator(name).next_id()
+
+    async def next_ids(self, name: str, count: int) -> List[int]:
+        if self._snowflake:
+            return [self._snowflake.next_id() for _ in range(count)]
+        return await self.allocator(name).next_ids(count)
+
+    def next_id_sync(self, name: str, session) -> int:
+        if self._snowflake:
+            return self._snowflake.next_id()
+        return self.allocator(name).next_id_sync(session)
+
+
+def _column(row, name: str):
+    """Read a column from a dict row, an app.db.rows Row or a named-tuple row."""
+    if isinstance(row, dict):
+        return row[name]
+    if name == "[applied]":
+        return row[0]
+    return getattr(row, name)
+
+
+# Create a global instance
+id_generator = IdGenerator.from_env()
@@ -0,0 +1,743 @@
+"""
+In-memory stand-in for a Cassandra cluster.
+
+Implements the parts of the driver's Cluster / Session / ResponseFuture API
+that CassandraClient uses, backed by an in-process store that understands the
+CQL subset the models issue: CREATE TABLE, INSERT (with IF NOT EXISTS),
+UPDATE (with USING TIMESTAMP, counters and IF conditions), DELETE, and
+single-partition or full-scan SELECT with clustering-column restrictions (=, ranges, IN),
+ORDER BY, LIMIT, COUNT(*) and paging.
+
+Select it with CASSANDRA_BACKEND=memory. Latency can be injected per
+statement with CASSANDRA_MEMORY_LATENCY_MS, a comma-separated list of
+"<key>=<milliseconds>" where the key is "<VERB> <table>" (e.g.
+"SELECT messages"), "<VERB> *", "BATCH" or "*" for every statement.
+"""
+import re
+import json
+import time
+import asyncio
+import logging
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from cassandra import InvalidRequest
+from cassandra.query import SimpleStatement, dict_factory
+
+from app.db.schema import TABLES
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FETCH_SIZE = 5000
+
+_PARAM = re.compile(r"%s")
+_INSERT = re.compile(
+    r"^INSERT INTO (?P<table>[\w.]+) \((?P<columns>[^)]*)\) VALUES \((?P<values>[^)]*)\)"
+    r"(?P<if_not_exists> IF NOT EXISTS)?(?: USING TIMESTAMP (?P<timestamp>\S+))?$",
+    re.IGNORECASE,
+)
+_UPDATE = re.compile(
+    r"^UPDATE (?P<table>[\w.]+)(?: USING TIMESTAMP (?P<timestamp>\S+))? SET (?P<assignments>.+?)"
+    r" WHERE (?P<where>.+?)(?: IF (?P<conditions>.+))?$",
+    re.IGNORECASE,
+)
+_DELETE = re.compile(r"^DELETE FROM (?P<table>[\w.]+) WHERE (?P<where>.+?)(?: IF EXISTS)?$", re.IGNORECASE)
+_SELECT = re.compile(
+    r"^SELECT (?P<columns>.+?) FROM (?P<table>[\w.]+)(?: WHERE (?P<where>.+?))?"
+    r"(?: ORDER BY (?P<order>.+?))?(?: LIMIT (?P<limit>\S+))?(?: ALLOW FILTERING)?$",
+    re.IGNORECASE,
+)
+_CREATE_TABLE = re.compile(
+    r"^CREATE TABLE (?:IF NOT EXISTS )?(?P<table>[\w.]+) \((?P<body>.+?)\)"
+    r"(?: WITH CLUSTERING ORDER BY \((?P<order>[^)]*)\))?$",
+    re.IGNORECASE,
+)
+_IGNORED = re.compile(r"^(DROP TABLE|CREATE KEYSPACE|USE|TRUNCATE) ", re.IGNORECASE)
+_CONDITION = re.compile(r"^(?P<column>\w+) ?(?P<op><=|>=|=|<|>|IN\b) ?(?P<term>.+)$", re.IGNORECASE)
+_COUNTER_ASSIGNMENT = re.compile(r"^(?P<column>\w+) = (?P=column) ?(?P<sign>[+-]) ?(?P<term>.+)$")
+_SELECTOR = re.compile(r"^(?P<expr>COUNT\(\*\)|\w+)(?: AS (?P<alias>\w+))?$", re.IGNORECASE)
+
+
+class _Param:
+    """Placeholder for the n-th bound value of a statement."""
+
+    __slots__ = ("index",)
+
+    def __init__(self, index: int):
+        self.index = index
+
+
+class _Desc:
+    """Sort-key wrapper that reverses the order of a DESC clustering column."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+class _Table:
+    """Schema and data of one table: partition key -> sorted clustering keys -> row."""
+
+    def __init__(self, name: str, columns: List[str], partition_key: List[str],
+                 clustering: List[Tuple[str, bool]], counters: set):
+        self.name = name
+        self.columns = columns
+        self.partition_key = partition_key
+        self.clustering = clustering  # [(column, descending)]
+        self.counters = counters
+        # partition key -> (sorted list of sort keys, {clustering key: (values, write times)})
+        self.partitions: Dict[tuple, Tuple[list, Dict[tuple, Tuple[dict, dict]]]] = {}
+
+    def sort_key(self, clustering_key: tuple) -> tuple:
+        return tuple(_Desc(v) if desc else v for v, (_, desc) in zip(clustering_key, self.clustering))
+
+    def get(self, partition_key: tuple, clustering_key: tuple):
+        partition = self.partitions.get(partition_key)
+        return partition[1].get(clustering_key) if partition else None
+
+    def upsert(self, partition_key: tuple, clustering_key: tuple):
+        order, rows = self.partitions.setdefault(partition_key, ([], {}))
+        row = rows.get(clustering_key)
+        if row is None:
+            values = dict(zip(self.partition_key, partition_key))
+            values.update(zip((c for c, _ in self.clustering), clustering_key))
+            row = rows[clustering_key] = (values, {})
+            order.insert(bisect_right(order, self.sort_key(clustering_key)), self.sort_key(clustering_key))
+        return row
+
+    def delete(self, partition_key: tuple, clustering_key: Optional[tuple]):
+        partition = self.partitions.get(partition_key)
+        if partition is None:
+            return
+        if clustering_key is None or not self.clustering:
+            del self.partitions[partition_key]
+            return
+        order, rows = partition
+        if rows.pop(clustering_key, None) is not None:
+            sort_key = self.sort_key(clustering_key)
+            del order[bisect_left(order, sort_key)]
+        if not rows:
+            del self.partitions[partition_key]
+
+
+class MemoryPreparedStatement:
+    """Prepared statement handle returned by MemorySession.prepare."""
+
+    def __init__(self, query_string: str, parsed):
+        self.query_string = query_string
+        self.parsed = parsed
+        self.fetch_size = None
+        self.is_idempotent = False
+
+    def bind(self, values) -> "MemoryBoundStatement":
+        return MemoryBoundStatement(self, tuple(values or ()))
+
+
+class MemoryBoundStatement:
+    def __init__(self, prepared: MemoryPreparedStatement, values: tuple):
+        self.prepared_statement = prepared
+        self.values = values
+        self.fetch_size = prepared.fetch_size
+        self.is_idempotent = prepared.is_idempotent
+
+
+class MemoryBatchStatement:
+    """Stand-in for cassandra.query.BatchStatement; statements are applied in order."""
+
+    def __init__(self, batch_type=None, **kwargs):
+        self.batch_type = batch_type
+        self.statements: List[Tuple[Any, tuple]] = []
+        self.is_idempotent = False
+
+    def add(self, statement, parameters=None):
+        self.statements.append((statement, tuple(parameters or ())))
+        return self
+
+
+class MemoryResultSet(list):
+    """The rows of one page, with the paging attributes of the driver's ResultSet."""
+
+    def __init__(self, rows: list, paging_state: Optional[bytes]):
+        super().__init__(rows)
+        self.paging_state = paging_state
+
+    @property
+    def has_more_pages(self) -> bool:
+        return self.paging_state is not None
+
+
+class MemoryResponseFuture:
+    """
+    Mimics the driver's ResponseFuture: callbacks fire once per page and stay
+    registered, so start_fetching_next_page triggers them again.
+    """
+
+    def __init__(self, fetch_page: Callable[[Optional[bytes]], Tuple[list, Optional[bytes]]],
+                 delay: float, paging_state: Optional[bytes] = None, blocking: bool = False):
+        self._fetch_page = fetch_page
+        self._delay = delay
+        self._callbacks = []
+        self._errbacks = []
+        self._lock = threading.Lock()
+        self._final_result = None
+        self._final_exception = None
+        self._done = threading.Event()
+        self._paging_state = None
+        self._blocking = blocking
+        self._schedule(paging_state)
+
+    @property
+    def has_more_pages(self) -> bool:
+        return self._paging_state is not None
+
+    def _schedule(self, paging_state: Optional[bytes]):
+        self._done.clear()
+        try:
+            loop = None if self._blocking else asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is None:
+            # Blocking use (session.execute, or no event loop): complete now, after the injected latency
+            if self._delay:
+                time.sleep(self._delay)
+            self._complete(paging_state)
+        elif self._delay:
+            loop.call_later(self._delay, self._complete, paging_state)
+        else:
+            loop.call_soon(self._complete, paging_state)
+
+    def _complete(self, paging_state: Optional[bytes]):
+        try:
+            rows, self._paging_state = self._fetch_page(paging_state)
+        except Exception as exc:
+            with self._lock:
+                self._final_exception = exc
+                errbacks = list(self._errbacks)
+            self._done.set()
+            for fn, args, kwargs in errbacks:
+                fn(exc, *args, **kwargs)
+            return
+        with self._lock:
+            self._final_result = rows
+            self._final_exception = None
+            callbacks = list(self._callbacks)
+        self._done.set()
+        for fn, args, kwargs in callbacks:
+            fn(rows, *args, **kwargs)
+
+    def start_fetching_next_page(self):
+        if self._paging_state is None:
+            raise RuntimeError("No more pages")
+        self._schedule(self._paging_state)
+
+    def add_callback(self, fn, *args, **kwargs):
+        with self._lock:
+            self._callbacks.append((fn, args, kwargs))
+            run_now = self._done.is_set() and self._final_exception is None
+        if run_now:
+            fn(self._final_result, *args, **kwargs)
+        return self
+
+    def add_errback(self, fn, *args, **kwargs):
+        with self._lock:
+            self._errbacks.append((fn, args, kwargs))
+            run_now = self._done.is_set() and self._final_exception is not None
+        if run_now:
+            fn(self._final_exception, *args, **kwargs)
+        return self
+
+    def add_callbacks(self, callback, errback, callback_args=(), callback_kwargs=None,
+                      errback_args=(), errback_kwargs=None):
+        self.add_callback(callback, *callback_args, **(callback_kwargs or {}))
+        self.add_errback(errback, *errback_args, **(errback_kwargs or {}))
+
+    def result(self):
+        self._done.wait()
+        if self._final_exception is not None:
+            raise self._final_exception
+        return MemoryResultSet(self._final_result, self._paging_state)
+
+
+class MemorySession:
+    """In-process session; see the module docstring for the supported CQL."""
+
+    batch_statement_class = MemoryBatchStatement
+
+    def __init__(self, store: Dict[str, _Table], latency: Dict[str, float]):
+        self._store = store
+        self._latency = latency
+        self._parsed: Dict[str, Any] = {}
+        self.row_factory = dict_factory
+        self.keyspace = None
+
+    # Driver API
+
+    def set_keyspace(self, keyspace: str):
+        self.keyspace = keyspace
+
+    def prepare(self, query: str, *args, **kwargs) -> MemoryPreparedStatement:
+        return MemoryPreparedStatement(query, self._parse(query))
+
+    def execute(self, query, parameters=None, *args, **kwargs):
+        return self._start(query, parameters, kwargs.get("paging_state"), blocking=True).result()
+
+    def execute_async(self, query, parameters=None, trace=False, custom_payload=None,
+                      timeout=None, execution_profile=None, paging_state=None, **kwargs):
+        return self._start(query, parameters, paging_state)
+
+    def _start(self, query, parameters, paging_state, blocking=False) -> MemoryResponseFuture:
+        try:
+            run, fetch_size, key = self._plan(query, parameters)
+        except Exception as exc:
+            return MemoryResponseFuture(_raise(exc), 0, blocking=blocking)
+        return MemoryResponseFuture(
+            lambda state: run(state, fetch_size or DEFAULT_FETCH_SIZE),
+            self._delay_for(key),
+            paging_state,
+            blocking,
+        )
+
+    def shutdown(self):
+        pass
+
+    # Statement handling
+
+    def _plan(self, query, parameters):
+        """Resolve a statement into (run(paging_state, fetch_size), fetch_size, latency key)."""
+        if isinstance(query, MemoryBatchStatement):
+            plans = [self._plan(statement, params)[0] for statement, params in query.statements]
+
+            def run_batch(_state, _fetch_size):
+                for plan in plans:
+                    plan(None, DEFAULT_FETCH_SIZE)
+                return [], None
+            return run_batch, None, "BATCH"
+
+        fetch_size = getattr(query, "fetch_size", None)
+        if isinstance(query, MemoryBoundStatement):
+            parsed, values = query.prepared_statement.parsed, query.values
+        elif isinstance(query, MemoryPreparedStatement):
+            parsed, values = query.parsed, tuple(parameters or ())
+        else:
+            text = query.query_string if isinstance(query, SimpleStatement) else query
+            parsed, values = self._parse(text), tuple(parameters or ())
+
+        kind = parsed[0]
+        if kind == "ignored":
+            return (lambda _state, _fetch_size: ([], None)), fetch_size, "*"
+        if kind == "create":
+            return (lambda _state, _fetch_size: self._create(parsed)), fetch_size, "*"
+        table = self._table(parsed[1])
+        handler = {"insert": self._insert, "update": self._update,
+                   "delete": self._delete, "select": self._select}[kind]
+        return (lambda state, size: handler(table, parsed, values, state, size)), fetch_size, f"{kind.upper()} {table.name}"
+
+    def _delay_for(self, key: str) -> float:
+        latency = self._latency
+        if not latency:
+            return 0.0
+        verb = key.split(" ", 1)[0]
+        for candidate in (key, f"{verb} *", "*"):
+            if candidate in latency:
+                return latency[candidate]
+        return 0.0
+
+    def _table(self, name: str) -> _Table:
+        table = self._store.get(name.split(".")[-1])
+        if table is None:
+            raise InvalidRequest(f"unconfigured table {name}")
+        return table
+
+    def _rows(self, colnames: List[str], rows: List[tuple]):
+        return self.row_factory(colnames, rows)
+
+    # Parsing
+
+    def _parse(self, query: str):
+        parsed = self._parsed.get(query)
+        if parsed is None:
+            parsed = self._parsed[query] = _parse_statement(query)
+        return parsed
+
+    def _create(self, parsed):
+        _, name, columns, partition_key, clustering, counters = parsed
+        if name not in self._store:
+            self._store[name] = _Table(name, columns, partition_key, clustering, counters)
+        return [], None
+
+    # Execution
+
+    def _insert(self, table: _Table, parsed, values, _state, _fetch_size):
+        _, _, columns, terms, if_not_exists, timestamp = parsed
+        row_values = {column: _normalize(_resolve(term, values)) for column, term in zip(columns, terms)}
+        partition_key, clustering_key = _key(table, row_values)
+        if if_not_exists:
+            existing = table.get(partition_key, clustering_key)
+            if existing is not None:
+                current = existing[0]
+                return self._rows(["[applied]"] + table.columns,
+                                  [(False,) + tuple(current.get(c) for c in table.columns)]), None
+        row = table.upsert(partition_key, clustering_key)
+        _write_cells(row, row_values, _write_time(timestamp, values))
+        if if_not_exists:
+            return self._rows(["[applied]"], [(True,)]), None
+        return [], None
+
+    def _update(self, table: _Table, parsed, values, _state, _fetch_size):
+        _, _, assignments, where, conditions, timestamp = parsed
+        key_values = {c.column: _normalize(_resolve(c.term, values)) for c in where}
+        partition_key, clustering_key = _key(table, key_values)
+        if conditions:
+            existing = table.get(partition_key, clustering_key)
+            current = existing[0] if existing else None
+            if current is None or any(
+                current.get(c.column) != _normalize(_resolve(c.term, values)) for c in conditions
+            ):
+                if current is None:
+                    return self._rows(["[applied]"], [(False,)]), None
+                names = [c.column for c in conditions]
+                return self._rows(["[applied]"] + names, [(False,) + tuple(current.get(n) for n in names)]), None
+
+        row = table.upsert(partition_key, clustering_key)
+        cells = {}
+        for column, sign, term in assignments:
+            value = _normalize(_resolve(term, values))
+            if sign:
+                delta = value if sign == "+" else -value
+                cells[column] = (row[0].get(column) or 0) + delta
+            else:
+                cells[column] = value
+        _write_cells(row, cells, _write_time(timestamp, values))
+        if conditions:
+            return self._rows(["[applied]"], [(True,)]), None
+        return [], None
+
+    def _delete(self, table: _Table, parsed, values, _state, _fetch_size):
+        _, _, where = parsed
+        key_values = {c.column: _normalize(_resolve(c.term, values)) for c in where}
+        partition_key = tuple(key_values[c] for c in table.partition_key)
+        if all(c in key_values for c, _ in table.clustering):
+            table.delete(partition_key, tuple(key_values[c] for c, _ in table.clustering))
+        else:
+            table.delete(partition_key, None)
+        return [], None
+
+    def _select(self, table: _Table, parsed, values, paging_state, fetch_size):
+        _, _, selectors, where, order, limit = parsed
+        limit = _resolve(limit, values) if limit is not None else None
+        restrictions = [(c.column, c.op, _normalize(_resolve(c.term, values))) for c in where]
+        partition_restrictions = {col: v for col, op, v in restrictions if col in table.partition_key and op == "="}
+        row_restrictions = [r for r in restrictions if r[0] not in partition_restrictions]
+        reverse = bool(order) and bool(table.clustering) and (
+            order[0][1] != table.clustering[0][1]
+        )
+
+        if len(partition_restrictions) == len(table.partition_key):
+            partition_key = tuple(partition_restrictions[c] for c in table.partition_key)
+            partitions = [(partition_key, table.partitions.get(partition_key))]
+        else:
+            partitions = list(table.partitions.items())
+            paging_state = None  # full scans are returned in one page
+
+        resume = _decode_paging_state(paging_state)
+        returned = resume["n"] if resume else 0
+
+        def matching_rows():
+            for partition_key, partition in partitions:
+                if partition is None:
+                    continue
+                order_keys, rows = partition
+                if resume is not None:
+                    position = table.sort_key(tuple(resume["c"]))
+                    if reverse:
+                        indexes = range(bisect_left(order_keys, position) - 1, -1, -1)
+                    else:
+                        indexes = range(bisect_right(order_keys, position), len(order_keys))
+                else:
+                    indexes = range(len(order_keys) - 1, -1, -1) if reverse else range(len(order_keys))
+                for index in indexes:
+                    clustering_key = tuple(getattr(v, "value", v) for v in order_keys[index])
+                    row_values = rows[clustering_key][0]
+                    if all(_compare(row_values.get(col), op, v) for col, op, v in row_restrictions):
+                        yield clustering_key, row_values
+
+        if selectors[0][0] == "count":
+            count = sum(1 for _ in matching_rows())
+            if limit is not None:
+                count = min(count, limit)
+            return self._rows([selectors[0][1]], [(count,)]), None
+
+        if selectors[0][0] == "*":
+            selectors = [(c, c) for c in table.columns]
+        colnames = [alias for _, alias in selectors]
+        page_size = fetch_size if limit is None else min(fetch_size, limit - returned)
+
+        page = []
+        last_key = None
+        next_state = None
+        for clustering_key, row_values in matching_rows():
+            if len(page) >= page_size:
+                if limit is None or returned + len(page) < limit:
+                    next_state = _encode_paging_state(last_key, returned + len(page))
+                break
+            page.append(tuple(row_values.get(column) for column, _ in selectors))
+            last_key = clustering_key
+        return self._rows(colnames, page), next_state
+
+
+class MemoryCluster:
+    """Stand-in for cassandra.cluster.Cluster holding the in-process store."""
+
+    def __init__(self, latency: Optional[Dict[str, float]] = None):
+        self.latency = latency or {}
+        self._store: Dict[str, _Table] = {}
+        self.metadata = None
+
+    def connect(self, keyspace: Optional[str] = None) -> MemorySession:
+        session = MemorySession(self._store, self.latency)
+        session.set_keyspace(keyspace)
+        for _, ddl in TABLES:
+            session.execute(ddl)
+        logger.info(f"Using in-memory Cassandra backend with {len(self._store)} tables")
+        return session
+
+    def register_listener(self, listener):
+        pass
+
+    def shutdown(self):
+        self._store.clear()
+
+
+def parse_latency(spec: str) -> Dict[str, float]:
+    """Parse "SELECT messages=2,*=0.5" (milliseconds) into {key: seconds}."""
+    latency = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        key, _, millis = item.rpartition("=")
+        latency[key.strip()] = float(millis) / 1000
+    return latency
+
+
+# Parsing helpers
+
+class _Restriction:
+    __slots__ = ("column", "op", "term")
+
+    def __init__(self, column, op, term):
+        self.column, self.op, self.term = column, op, term
+
+
+def _parse_statement(query: str):
+    text = " ".join(_PARAM.sub("?", query).split()).rstrip(";").strip()
+    counter = iter(range(10 ** 6))
+
+    def term(raw: str):
+        raw = raw.strip()
+        if raw == "?":
+            return _Param(next(counter))
+        if raw.startswith("'") and raw.endswith("'"):
+            return raw[1:-1].replace("''", "'")
+        if raw.lower() in ("true", "false"):
+            return raw.lower() == "true"
+        if raw.lower() == "null":
+            return None
+        try:
+            return int(raw)
+        except ValueError:
+            return float(raw)
+
+    def restrictions(clause: Optional[str]) -> List[_Restriction]:
+        if not clause:
+            return []
+        result = []
+        for part in re.split(r" AND ", clause, flags=re.IGNORECASE):
+            match = _CONDITION.match(part.strip())
+            if not match:
+                raise InvalidRequest(f"Unsupported restriction: {part}")
+            result.append(_Restriction(match["column"], match["op"].upper(), term(match["term"])))
+        return result
+
+    if _IGNORED.match(text):
+        return ("ignored",)
+
+    match = _CREATE_TABLE.match(text)
+    if match:
+        return _parse_create_table(match)
+
+    match = _INSERT.match(text)
+    if match:
+        columns = [c.strip() for c in match["columns"].split(",")]
+        terms = [term(v) for v in match["values"].split(",")]
+        timestamp = term(match["timestamp"]) if match["timestamp"] else None
+        return ("insert", match["table"], columns, terms, bool(match["if_not_exists"]), timestamp)
+
+    match = _UPDATE.match(text)
+    if match:
+        timestamp = term(match["timestamp"]) if match["timestamp"] else None
+        assignments = []
+        for part in match["assignments"].split(","):
+            part = part.strip()
+            counter_match = _COUNTER_ASSIGNMENT.match(part)
+            if counter_match:
+                assignments.append((counter_match["column"], counter_match["sign"], term(counter_match["term"])))
+            else:
+                column, _, value = part.partition("=")
+                assignments.append((column.strip(), None, term(value)))
+        where = restrictions(match["where"])
+        return ("update", match["table"], assignments, where, restrictions(match["conditions"]), timestamp)
+
+    match = _DELETE.match(text)
+    if match:
+        return ("delete", match["table"], restrictions(match["where"]))
+
+    match = _SELECT.match(text)
+    if match:
+        selectors = []
+        for raw in match["columns"].split(","):
+            selector = _SELECTOR.match(raw.strip())
+            if raw.strip() == "*":
+                selectors.append(("*", "*"))
+            elif selector and selector["expr"].upper() == "COUNT(*)":
+                selectors.append(("count", selector["alias"] or "count"))
+            elif selector:
+                selectors.append((selector["expr"], selector["alias"] or selector["expr"]))
+            else:
+                raise InvalidRequest(f"Unsupported selector: {raw}")
+        where = restrictions(match["where"])
+        order = []
+        if match["order"]:
+            for part in match["order"].split(","):
+                column, _, direction = part.strip().partition(" ")
+                order.append((column, direction.strip().upper() == "DESC"))
+        limit = term(match["limit"]) if match["limit"] else None
+        return ("select", match["table"], selectors, where, order, limit)
+
+    raise InvalidRequest(f"Statement not supported by the in-memory backend: {text}")
+
+
+def _parse_create_table(match):
+    name = match["table"].split(".")[-1]
+    body = match["body"]
+    primary = re.search(r"PRIMARY KEY \((.*)\)\s*$", body, re.IGNORECASE)
+    definitions = body[:primary.start()] if primary else body
+    columns, counters, inline_key = [], set(), None
+    for definition in filter(None, (d.strip() for d in definitions.split(","))):
+        parts = definition.split()
+        columns.append(parts[0])
+        if parts[1].upper() == "COUNTER":
+            counters.add(parts[0])
+        if "PRIMARY KEY" in definition.upper():
+            inline_key = parts[0]
+
+    if primary:
+        key = primary.group(1).strip()
+        if key.startswith("("):
+            partition, _, rest = key[1:].partition(")")
+            partition_key = [c.strip() for c in partition.split(",")]
+            clustering_columns = [c.strip() for c in rest.split(",") if c.strip()]
+        else:
+            parts = [c.strip() for c in key.split(",")]
+            partition_key, clustering_columns = parts[:1], parts[1:]
+    else:
+        partition_key, clustering_columns = [inline_key], []
+
+    descending = {}
+    if match["order"]:
+        for part in match["order"].split(","):
+            column, _, direction = part.strip().partition(" ")
+            descending[column] = direction.strip().upper() == "DESC"
+    clustering = [(c, descending.get(c, False)) for c in clustering_columns]
+    return ("create", name, columns, partition_key, clustering, counters)
+
+
+# Execution helpers
+
+def _raise(exc: Exception):
+    def fetch(_state):
+        raise exc
+    return fetch
+
+
+def _resolve(term, values: tuple):
+    if isinstance(term, _Param):
+        try:
+            return values[term.index]
+        except IndexError:
+            raise InvalidRequest("Not enough bound values")
+    return term
+
+
+def _normalize(value):
+    """Store timestamps as Cassandra does: naive UTC, millisecond precision."""
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.replace(microsecond=value.microsecond // 1000 * 1000)
+    return value
+
+
+def _key(table: _Table, row_values: dict) -> Tuple[tuple, tuple]:
+    try:
+        partition_key = tuple(row_values[c] for c in table.partition_key)
+        clustering_key = tuple(row_values[c] for c, _ in table.clustering)
+    except KeyError as e:
+        raise InvalidRequest(f"Missing primary key column {e} for table {table.name}")
+    return partition_key, clustering_key
+
+
+def _write_time(timestamp, values) -> int:
+    if timestamp is not None:
+        return int(_resolve(timestamp, values))
+    return time.time_ns() // 1000
+
+
+def _write_cells(row, cells: dict, write_time: int):
+    """Last-write-wins per cell, by write time."""
+    row_values, write_times = row
+    for column, value in cells.items():
+        if write_times.get(column, -1) > write_time:
+            continue
+        row_values[column] = value
+        write_times[column] = write_time
+
+
+def _compare(left, op: str, right) -> bool:
+    if left is None:
+        return False
+    if op == "=":
+        return left == right
+    if op == "IN":
+        return left in right
+    if op == "<":
+        return left < right
+    if op == "<=":
+        return left <= right
+    if op == ">":
+        return left > right
+    return left >= right
+
+
+def _encode_paging_state(clustering_key: tuple, returned: int) -> bytes:
+    encoded = [{"t": v.isoformat()} if isinstance(v, datetime) else v for v in clustering_key]
+    return json.dumps({"c": encoded, "n": returned}).encode()
+
+
+def _decode_paging_state(paging_state: Optional[bytes]):
+    if not paging_state:
+        return None
+    try:
+        state = json.loads(paging_state)
+        state["c"] = [datetime.fromisoformat(v["t"]) if isinstance(v, dict) else v for v in state["c"]]
+        return state
+    except (ValueError, KeyError, TypeError):
+        raise InvalidRequest("Invalid paging state")
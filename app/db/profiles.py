@@ -0,0 +1,132 @@
+"""
+Named execution profiles for the Cassandra driver.
+
+Each model method names the profile its statements run under: reads that
+can tolerate a lagging replica use READ_FAST, writes use WRITE_DURABLE and
+the NDJSON export uses EXPORT. A profile's consistency level and request
+timeout are read from CASSANDRA_PROFILE_<NAME>_CONSISTENCY and
+CASSANDRA_PROFILE_<NAME>_TIMEOUT (seconds), e.g.
+CASSANDRA_PROFILE_READ_FAST_CONSISTENCY=LOCAL_QUORUM.
+
+Idempotent statements run under a profile with speculative attempts are
+hedged: if no response arrives within CASSANDRA_PROFILE_<NAME>_SPECULATIVE_DELAY_MS,
+the same request is also sent to the next replica, up to
+CASSANDRA_PROFILE_<NAME>_SPECULATIVE_ATTEMPTS extra times, and the first
+response wins.
+"""
+import os
+from typing import Dict, Optional
+
+from cassandra import ConsistencyLevel
+from cassandra.cluster import EXEC_PROFILE_DEFAULT, ExecutionProfile
+from cassandra.policies import (
+    DCAwareRoundRobinPolicy, SpeculativeExecutionPlan, SpeculativeExecutionPolicy, TokenAwarePolicy,
+)
+
+READ_FAST = "read_fast"
+WRITE_DURABLE = "write_durable"
+EXPORT = "export"
+
+# name -> (consistency level, serial consistency level, request timeout in
+# seconds, speculative delay in milliseconds, speculative attempts)
+PROFILE_DEFAULTS = {
+    # A replica stalled by GC or compaction must not set the p99 of page reads
+    READ_FAST: ("LOCAL_ONE", None, 2.0, 50.0, 2),
+    # Lightweight transactions (conversation creation, ID leases) run their
+    # Paxos round in the local DC
+    WRITE_DURABLE: ("LOCAL_QUORUM", "LOCAL_SERIAL", 10.0, 0.0, 0),
+    # Full-conversation exports page through large partitions; hedging them
+    # would double the load of the heaviest reads
+    EXPORT: ("LOCAL_ONE", None, 120.0, 0.0, 0),
+}
+
+
+def _consistency(name: str) -> int:
+    try:
+        return getattr(ConsistencyLevel, name.upper())
+    except AttributeError:
+        raise ValueError(f"Unknown consistency level: {name}") from None
+
+
+class HedgePlan(SpeculativeExecutionPlan):
+    """
+    Speculative execution plan of one request that records where its hedges went.
+
+    The driver asks for the next delay when the request is created, and
+    again right after each speculative execution fires, passing the host the
+    request was last sent to. Retries to other hosts do not ask, so every
+    host passed after the first call received a hedge, unless the hedge found
+    no host to go to; readers check hedge_hosts against the request's
+    attempted_hosts.
+    """
+
+    def __init__(self, delay: float, max_attempts: int):
+        self.delay = delay
+        self.remaining = max_attempts
+        self.hedge_hosts = []
+        self._created = False
+
+    def next_execution(self, host) -> float:
+        if self._created:
+            self.hedge_hosts.append(host)
+        self._created = True
+        if self.remaining > 0:
+            self.remaining -= 1
+            return self.delay
+        return -1
+
+
+class HedgingPolicy(SpeculativeExecutionPolicy):
+    """
+    ConstantSpeculativeExecutionPolicy whose plans report the hedges they sent.
+
+    Each plan is also set as the `hedge_plan` attribute of the statement it
+    was made for, so the code that sent the statement can read it.
+    """
+
+    def __init__(self, delay: float, max_attempts: int):
+        self.delay = delay
+        self.max_attempts = max_attempts
+
+    def new_plan(self, keyspace, statement) -> HedgePlan:
+        plan = HedgePlan(self.delay, self.max_attempts)
+        statement.hedge_plan = plan
+        return plan
+
+
+def load_balancing_policy() -> TokenAwarePolicy:
+    """
+    Token-aware routing over the nodes of the local data center.
+
+    CASSANDRA_LOCAL_DC names the local DC (the DC of the first contact point
+    if unset); CASSANDRA_REMOTE_HOSTS_PER_DC remote nodes per other DC are
+    kept as a fallback (default 0).
+    """
+    return TokenAwarePolicy(DCAwareRoundRobinPolicy(
+        local_dc=os.getenv("CASSANDRA_LOCAL_DC") or None,
+        used_hosts_per_remote_dc=int(os.getenv("CASSANDRA_REMOTE_HOSTS_PER_DC", "0")),
+    ))
+
+
+def execution_profiles(row_factory) -> Dict[object, ExecutionProfile]:
+    """The default profile plus every named profile, configured from the environment."""
+    profiles = {
+        EXEC_PROFILE_DEFAULT: ExecutionProfile(
+            load_balancing_policy=load_balancing_policy(),
+            row_factory=row_factory,
+        )
+    }
+    for name, (consistency, serial_consistency, timeout, delay_ms, attempts) in PROFILE_DEFAULTS.items():
+        prefix = f"CASSANDRA_PROFILE_{name.upper()}"
+        serial: Optional[int] = _consistency(serial_consistency) if serial_consistency else None
+        delay_ms = float(os.getenv(f"{prefix}_SPECULATIVE_DELAY_MS", str(delay_ms)))
+        attempts = int(os.getenv(f"{prefix}_SPECULATIVE_ATTEMPTS", str(attempts)))
+        profiles[name] = ExecutionProfile(
+            load_balancing_policy=load_balancing_policy(),
+            consistency_level=_consistency(os.getenv(f"{prefix}_CONSISTENCY", consistency)),
+            serial_consistency_level=serial,
+            request_timeout=float(os.getenv(f"{prefix}_TIMEOUT", str(timeout))),
+            row_factory=row_factory,
+            speculative_execution_policy=HedgingPolicy(delay_ms / 1000, attempts) if attempts > 0 else None,
+        )
+    return profiles
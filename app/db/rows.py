@@ -0,0 +1,54 @@
+"""
+Compact result rows.
+
+row_factory turns each result row into an instance of a slotted dataclass,
+generated once per column list: no per-row dict, attribute access for the
+model layer, and orjson encodes the rows natively. Rows also support
+row["column"], row.get() and keys(), so they stand in wherever a dict row
+was expected. Results whose column names are not identifiers (such as
+"[applied]" of a lightweight transaction) fall back to dict rows.
+"""
+import keyword
+import functools
+import dataclasses
+from typing import Any, List, Sequence, Tuple
+
+
+class Row:
+    """Base of the generated row classes."""
+
+    __slots__ = ()
+    _fields: Tuple[str, ...] = ()
+
+    def __getitem__(self, name: str) -> Any:
+        try:
+            return getattr(self, name)
+        except AttributeError:
+            raise KeyError(name) from None
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._fields
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return getattr(self, name, default)
+
+    def keys(self) -> Tuple[str, ...]:
+        return self._fields
+
+
+@functools.lru_cache(maxsize=None)
+def row_class(colnames: Tuple[str, ...]):
+    """The row class for a column list, or None if a name cannot be an attribute."""
+    if not all(name.isidentifier() and not keyword.iskeyword(name) for name in colnames):
+        return None
+    return dataclasses.make_dataclass(
+        "Row", colnames, bases=(Row,), slots=True, namespace={"_fields": colnames}
+    )
+
+
+def row_factory(colnames: Sequence[str], rows: List[Sequence[Any]]) -> list:
+    """Driver row factory producing Row instances (dicts for non-identifier columns)."""
+    cls = row_class(tuple(colnames))
+    if cls is None:
+        return [dict(zip(colnames, row)) for row in rows]
+    return [cls(*row) for row in rows]
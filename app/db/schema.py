@@ -0,0 +1,181 @@
+"""
+Cassandra schema for the Messenger application.
+
+Table definitions shared by scripts/setup_db.py and the in-memory backend.
+"""
+
+# Tables dropped and recreated by scripts/setup_db.py; the others are only
+# created if missing, so their data survives a re-run. Tables derived from the
+# messages (counts, time bounds, inboxes, pair lookups, buckets) are reset with
+# them, or a re-run would leave counts and lookups for conversations that are gone.
+RESET_TABLES = [
+    "user_conversations",
+    "messages",
+    "messages_by_bucket",
+    "conversation_buckets",
+    "conversation_stats",
+    "conversation_time_bounds",
+    "conversations",
+    "conversation_by_pair",
+    "user_inbox",
+    "user_inbox_latest",
+    "user_inbox_stats",
+    "counters",
+]
+
+# (table name, CREATE TABLE statement), in creation order
+TABLES = [
+    # User conversations table - latest message of each conversation
+    ("user_conversations", """
+    CREATE TABLE IF NOT EXISTS user_conversations (
+        sender_id INT,
+        receiver_id INT,
+        conversation_id BIGINT,
+        last_timestamp TIMESTAMP,
+        last_message TEXT,
+        PRIMARY KEY (conversation_id)
+    );
+    """),
+
+    # Messages table - stores all messages with conversation_id as partition key
+    # This allows efficient retrieval of all messages in a conversation
+    # Clustering by timestamp DESC allows fetching recent messages first and pagination
+    ("messages", """
+    CREATE TABLE IF NOT EXISTS messages (
+        conversation_id BIGINT,
+        timestamp TIMESTAMP,
+        message_id BIGINT,
+        content TEXT,
+        sender_id INT,
+        receiver_id INT,
+        PRIMARY KEY (conversation_id, timestamp, message_id)
+    ) WITH CLUSTERING ORDER BY (timestamp DESC, message_id ASC);
+    """),
+
+    # Bucketed messages table (MESSAGE_LAYOUT=bucketed) - partitioned by
+    # (conversation_id, bucket) so a long-lived conversation is spread over
+    # bounded partitions, one per MESSAGE_BUCKET_SECONDS window
+    ("messages_by_bucket", """
+    CREATE TABLE IF NOT EXISTS messages_by_bucket (
+        conversation_id BIGINT,
+        bucket INT,
+        timestamp TIMESTAMP,
+        message_id BIGINT,
+        content TEXT,
+        sender_id INT,
+        receiver_id INT,
+        PRIMARY KEY ((conversation_id, bucket), timestamp, message_id)
+    ) WITH CLUSTERING ORDER BY (timestamp DESC, message_id ASC);
+    """),
+
+    # Buckets that hold messages for each conversation, newest first, so
+    # readers know which partitions to walk
+    ("conversation_buckets", """
+    CREATE TABLE IF NOT EXISTS conversation_buckets (
+        conversation_id BIGINT,
+        bucket INT,
+        PRIMARY KEY (conversation_id, bucket)
+    ) WITH CLUSTERING ORDER BY (bucket DESC);
+    """),
+
+    # Per-conversation message count, read instead of COUNT(*) over the partition
+    ("conversation_stats", """
+    CREATE TABLE IF NOT EXISTS conversation_stats (
+        conversation_id BIGINT,
+        message_count COUNTER,
+        PRIMARY KEY (conversation_id)
+    );
+    """),
+
+    # First/last message timestamps per conversation. Counter tables cannot hold
+    # regular columns, so these live alongside conversation_stats
+    ("conversation_time_bounds", """
+    CREATE TABLE IF NOT EXISTS conversation_time_bounds (
+        conversation_id BIGINT,
+        first_timestamp TIMESTAMP,
+        last_timestamp TIMESTAMP,
+        PRIMARY KEY (conversation_id)
+    );
+    """),
+
+    # Conversation participants table - tracks who is in each conversation
+    ("conversations", """
+    CREATE TABLE IF NOT EXISTS conversations (
+        conversation_id BIGINT,
+        sender_id INT,
+        receiver_id INT,
+        last_timestamp TIMESTAMP,
+        PRIMARY KEY (conversation_id, sender_id));
+    """),
+
+    # Conversation lookup by participant pair - keyed on (min user, max user) so
+    # either direction finds the same row with one single-partition read.
+    # Rows are created with INSERT ... IF NOT EXISTS.
+    ("conversation_by_pair", """
+    CREATE TABLE IF NOT EXISTS conversation_by_pair (
+        user_a INT,
+        user_b INT,
+        conversation_id BIGINT,
+        created_at TIMESTAMP,
+        last_timestamp TIMESTAMP,
+        last_message TEXT,
+        PRIMARY KEY ((user_a, user_b))
+    );
+    """),
+
+    # User inbox table - one partition per user, clustered by last_timestamp DESC,
+    # so a user's most recent conversations are a single-partition, pre-sorted read.
+    # Each send replaces the conversation's entry for both participants.
+    ("user_inbox", """
+    CREATE TABLE IF NOT EXISTS user_inbox (
+        user_id INT,
+        last_timestamp TIMESTAMP,
+        conversation_id BIGINT,
+        sender_id INT,
+        receiver_id INT,
+        last_message TEXT,
+        PRIMARY KEY (user_id, last_timestamp, conversation_id)
+    ) WITH CLUSTERING ORDER BY (last_timestamp DESC, conversation_id ASC);
+    """),
+
+    # Newest inbox entry of each conversation per user, written in the same
+    # single-partition batch as the entry. USING TIMESTAMP makes the latest
+    # message win, so readers can drop entries concurrent sends left behind.
+    ("user_inbox_latest", """
+    CREATE TABLE IF NOT EXISTS user_inbox_latest (
+        user_id INT,
+        conversation_id BIGINT,
+        last_timestamp TIMESTAMP,
+        PRIMARY KEY (user_id, conversation_id)
+    );
+    """),
+
+    # Per-user conversation count, read instead of COUNT(*) over user_inbox
+    ("user_inbox_stats", """
+    CREATE TABLE IF NOT EXISTS user_inbox_stats (
+        user_id INT,
+        conversation_count COUNTER,
+        PRIMARY KEY (user_id)
+    );
+    """),
+
+    # Counter table for generating sequential IDs
+    # This helps with creating sequential IDs for messages and conversations
+    ("counters", """
+    CREATE TABLE IF NOT EXISTS counters (
+        counter_name TEXT,
+        counter_value COUNTER,
+        PRIMARY KEY (counter_name)
+    );
+    """),
+
+    # ID allocation table - per-name high-water mark advanced with lightweight
+    # transactions; each API process leases a block of IDs at a time
+    ("id_allocations", """
+    CREATE TABLE IF NOT EXISTS id_allocations (
+        name TEXT,
+        high_water BIGINT,
+        PRIMARY KEY (name)
+    );
+    """),
+]
@@ -0,0 +1,118 @@
+"""
+Group commit for writes that share a partition.
+
+Writes submitted within WRITE_COALESCE_MS of each other (or until
+WRITE_COALESCE_MAX_ITEMS are waiting) are grouped by partition and flushed
+as one UNLOGGED batch per partition. Each submitter's awaitable resolves
+once the batch holding its write has been acknowledged, or raises the
+batch's error.
+
+Every statement in a batch gets the same write timestamp, so only coalesce
+writes that never overwrite each other's cells (e.g. inserts of distinct
+rows) or that carry their own USING TIMESTAMP.
+"""
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Tuple
+
+from app.metrics import Histogram, SIZE_BUCKETS
+
+logger = logging.getLogger(__name__)
+
+Statements = List[Tuple[str, tuple]]
+
+
+class WriteCoalescer:
+    """Collects writes for a short window and flushes them as single-partition batches."""
+
+    def __init__(
+        self,
+        execute_batch: Callable[[Statements], Awaitable[Any]],
+        max_delay: float = 0.002,
+        max_items: int = 100
+    ):
+        self.execute_batch = execute_batch
+        self.max_delay = max_delay
+        self.max_items = max_items
+        # partition -> [(statements, future, submitted at)]
+        self._pending: Dict[Hashable, List[Tuple[Statements, asyncio.Future, float]]] = {}
+        self._pending_count = 0
+        self._in_flight = 0
+        self._timer = None
+        self._flushes = set()
+        self.flush_sizes = Histogram(SIZE_BUCKETS)
+        self.write_latency = Histogram()
+        self.flush_latency = Histogram()
+        self.errors = 0
+
+    @classmethod
+    def from_env(cls, execute_batch: Callable[[Statements], Awaitable[Any]]) -> "WriteCoalescer":
+        return cls(
+            execute_batch,
+            max_delay=float(os.getenv("WRITE_COALESCE_MS", "2")) / 1000,
+            max_items=int(os.getenv("WRITE_COALESCE_MAX_ITEMS", "100")),
+        )
+
+    async def submit(self, partition: Hashable, statements: Statements) -> None:
+        """
+        Queue statements that all write `partition` and wait until they are durable.
+
+        Raises:
+            Exception: Whatever the batch holding the statements failed with
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.setdefault(partition, []).append((statements, future, time.perf_counter()))
+        self._pending_count += 1
+        if self._pending_count >= self.max_items:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self.flush)
+        await future
+
+    def flush(self) -> None:
+        """Send everything queued so far."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending, self._pending_count = self._pending, {}, 0
+        for items in pending.values():
+            task = asyncio.ensure_future(self._flush_partition(items))
+            # Keep a reference until the flush finishes so the task is not collected
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _flush_partition(self, items: List[Tuple[Statements, asyncio.Future, float]]) -> None:
+        statements = [statement for item_statements, _, _ in items for statement in item_statements]
+        self._in_flight += len(items)
+        started = time.perf_counter()
+        try:
+            await self.execute_batch(statements)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Coalesced batch of {len(items)} writes failed: {str(e)}")
+            for _, future, _ in items:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            finished = time.perf_counter()
+            for _, future, submitted in items:
+                self.write_latency.observe(finished - submitted)
+                if not future.done():
+                    future.set_result(None)
+        finally:
+            self._in_flight -= len(items)
+            self.flush_sizes.observe(len(items))
+            self.flush_latency.observe(time.perf_counter() - started)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self._pending_count,
+            "in_flight": self._in_flight,
+            "errors": self.errors,
+            "flush_sizes": self.flush_sizes.snapshot(),
+            "write_latency_seconds": self.write_latency.snapshot(),
+            "flush_latency_seconds": self.flush_latency.snapshot(),
+        }
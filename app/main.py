@@ -1,14 +1,21 @@
 import logging
 from fastapi import FastAPI, Depends
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 import sys
 import os
 
-from app.api.routes import message_router, conversation_router
+from app.api.routes import message_router, conversation_router, realtime_router
 from app.controllers.message_controller import MessageController
 from app.controllers.conversation_controller import ConversationController
+from app.controllers.realtime_controller import RealtimeController
+from app.models.cassandra_models import ConversationModel, write_coalescer_stats
+from app.cache import cache_stats, single_flight_stats
 from app.db.cassandra_client import cassandra_client
+from app.realtime import broker
 from app.middlewares.error_middleware import error_handling_middleware
+from app.middlewares.metrics_middleware import MetricsMiddleware
+from app.metrics import exposition
 
 # Configure logging
 logging.basicConfig(
@@ -33,6 +40,8 @@ app.add_middleware(
 )
 
 app.middleware("http")(error_handling_middleware)
+# Added last so it wraps the error handler and sees the 500s it returns
+app.add_middleware(MetricsMiddleware)
 
 
 # Dependency injection
@@ -44,18 +53,54 @@ def get_conversation_controller():
     """Dependency for conversation controller."""
     return ConversationController()
 
+def get_realtime_controller():
+    """Dependency for realtime controller."""
+    return RealtimeController()
+
 # Update the routes with the dependencies
 app.dependency_overrides[MessageController] = get_message_controller
 app.dependency_overrides[ConversationController] = get_conversation_controller
+app.dependency_overrides[RealtimeController] = get_realtime_controller
 
 # Include routers
 app.include_router(message_router)
 app.include_router(conversation_router)
+app.include_router(realtime_router)
 
 @app.get("/")
 async def root():
     return {"message": "FB Messenger API is running with Cassandra backend"}
 
+@app.get("/stats/cache")
+async def get_cache_stats():
+    """Hit, miss and eviction counters of the process-local caches."""
+    return cache_stats()
+
+@app.get("/stats/reads")
+async def get_read_stats():
+    """Calls, executions and deduplicated calls of the single-flight read groups."""
+    return single_flight_stats()
+
+@app.get("/stats/hedges")
+async def get_hedge_stats():
+    """Speculative executions sent and won per statement."""
+    return cassandra_client.hedge_stats()
+
+@app.get("/stats/writes")
+async def get_write_stats():
+    """Flush sizes, latency histograms and queue depth of the write coalescer."""
+    return write_coalescer_stats()
+
+@app.get("/stats/realtime")
+async def get_realtime_stats():
+    """Open subscriptions and event counts of the real-time broker."""
+    return broker.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Query and HTTP metrics in the Prometheus text format."""
+    return PlainTextResponse(exposition(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize services on startup."""
@@ -64,6 +109,12 @@ async def startup_event():
         # Ensure Cassandra connection is established
         cassandra_client.get_session()
         logger.info("Cassandra connection established")
+        # Prepare every statement the models use before serving traffic
+        await cassandra_client.prepare_all()
+        # Start with the caches the previous workers left in the L2 cache
+        await ConversationModel.warm_caches()
+        # Start receiving real-time events from the other workers
+        await broker.start()
     except Exception as e:
         logger.error(f"Failed to connect to Cassandra: {str(e)}")
         sys.exit(1)
@@ -72,6 +123,7 @@ async def startup_event():
 async def shutdown_event():
     """Clean up resources on shutdown."""
     logger.info("Shutting down application...")
+    await broker.stop()
     cassandra_client.close()
 
 if __name__ == "__main__":
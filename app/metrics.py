@@ -0,0 +1,165 @@
+"""
+In-process metrics primitives.
+
+Labeled metric families register themselves and are rendered together in
+the Prometheus text format by exposition() (served at /metrics).
+"""
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+# Latency buckets in seconds, from 100µs to 10s
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+# Buckets for counts of items (batch sizes, rows)
+SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000)
+
+
+class Histogram:
+    """Cumulative-bucket histogram with Prometheus-style upper bounds."""
+
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        # One slot per bucket plus +Inf
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (the largest bound for +Inf)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return self.buckets[min(index, len(self.buckets) - 1)]
+        return self.buckets[-1]
+
+    def snapshot(self) -> Dict[str, Any]:
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += count
+            buckets["+Inf" if bound == float("inf") else repr(bound)] = cumulative
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "buckets": buckets,
+        }
+
+
+class CounterValue:
+    """A monotonically increasing value; one label combination of a LabeledCounter."""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+
+# Metric families rendered by exposition(), in registration order
+_families: List["_Family"] = []
+
+
+class _Family(ABC):
+    """A named metric with one child per combination of label values."""
+
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        _families.append(self)
+
+    def labels(self, *values: str):
+        """
+        The child for a combination of label values, created on first use.
+
+        Hot paths should look the child up once and keep it, rather than
+        call this per observation.
+        """
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    @abstractmethod
+    def _new_child(self):
+        """A new child metric for one combination of label values."""
+
+    @abstractmethod
+    def _samples(self, labels: str, child) -> Iterator[str]:
+        """The exposition lines of one child, given its formatted labels."""
+
+    def expose(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for values, child in list(self._children.items()):
+            yield from self._samples(_format_labels(self.label_names, values), child)
+
+
+class LabeledHistogram(_Family):
+    """A Histogram per combination of label values."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str],
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(buckets)
+
+    def _new_child(self) -> Histogram:
+        return Histogram(self.buckets)
+
+    def _samples(self, labels: str, child: Histogram) -> Iterator[str]:
+        separator = "," if labels else ""
+        cumulative = 0
+        for bound, count in zip(child.buckets + (float("inf"),), child.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            yield f'{self.name}_bucket{{{labels}{separator}le="{le}"}} {cumulative}'
+        yield f"{self.name}_sum{{{labels}}} {child.sum}"
+        yield f"{self.name}_count{{{labels}}} {child.count}"
+
+
+class LabeledCounter(_Family):
+    """A CounterValue per combination of label values."""
+
+    kind = "counter"
+
+    def _new_child(self) -> CounterValue:
+        return CounterValue()
+
+    def _samples(self, labels: str, child: CounterValue) -> Iterator[str]:
+        yield f"{self.name}{{{labels}}} {child.value}"
+
+
+def exposition() -> str:
+    """Every registered metric family in the Prometheus text exposition format."""
+    lines = [line for family in _families for line in family.expose()]
+    return "\n".join(lines) + "\n"
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    return ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
@@ -0,0 +1,26 @@
+"""
+Time buckets for the bucketed message layout.
+
+With MESSAGE_LAYOUT=bucketed, messages are stored in messages_by_bucket,
+partitioned by (conversation_id, bucket) where bucket is the message
+timestamp divided into MESSAGE_BUCKET_SECONDS-wide windows (default one day).
+The bucket width must not change once data has been written with it.
+"""
+import os
+import calendar
+from datetime import datetime
+
+MESSAGE_LAYOUT = os.getenv("MESSAGE_LAYOUT", "flat")
+MESSAGE_BUCKET_SECONDS = int(os.getenv("MESSAGE_BUCKET_SECONDS", "86400"))
+
+if MESSAGE_LAYOUT not in ("flat", "bucketed"):
+    raise ValueError(f"Unknown MESSAGE_LAYOUT: {MESSAGE_LAYOUT}")
+
+
+def bucketed_layout() -> bool:
+    return MESSAGE_LAYOUT == "bucketed"
+
+
+def message_bucket(timestamp: datetime, width: int = MESSAGE_BUCKET_SECONDS) -> int:
+    """Return the bucket a timestamp falls in (naive datetimes are taken as UTC, like the driver does)."""
+    return calendar.timegm(timestamp.utctimetuple()) // width
@@ -1,10 +1,26 @@
 """
 Models for interacting with Cassandra tables in the Facebook Messenger backend project.
 """
-from datetime import datetime
-from typing import List, Dict, Any, Optional, Tuple
+import calendar
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
 
-from app.db.cassandra_client import cassandra_client
+import os
+import time
+import asyncio
+import functools
+from app.cache import DiskCache, LRUCache, RecentMessagesCache, SingleFlight, single_flight
+from app.db.cassandra_client import AsyncResultSet, cassandra_client
+from app.db.id_allocator import id_generator
+from app.db.profiles import EXPORT, READ_FAST, WRITE_DURABLE
+from app.db.rows import Row, row_class
+from app.db.write_coalescer import WriteCoalescer
+from app.models.buckets import bucketed_layout, message_bucket
+from app.models.cursors import (
+    encode_cursor, decode_cursor, encode_bucket_cursor, decode_bucket_cursor,
+    encode_position_cursor, decode_position_cursor,
+)
+from app.models.statements import COALESCIBLE_STATEMENTS, IDEMPOTENT_STATEMENTS, STATEMENTS
 import logging
 from cassandra.query import SimpleStatement
 from app.schemas.error import HTTPValidationError, ValidationErrorItem
@@ -12,13 +28,87 @@ from app.schemas.error import HTTPValidationError, ValidationErrorItem
 
 logger = logging.getLogger(__name__)
 
+# Statements are prepared at startup and executed by name
+cassandra_client.register_statements(STATEMENTS, idempotent=IDEMPOTENT_STATEMENTS)
+
+# Rows of the message selects, which alias the columns to the MessageResponse fields
+MessageRow = row_class(("id", "sender_id", "receiver_id", "content", "created_at", "conversation_id"))
+
+# first_timestamp is written with this minus the message time as its write time,
+# so the earliest message has the highest write time and wins
+FIRST_TIMESTAMP_WRITETIME_BASE = 2 ** 62
+
+# (user_a, user_b) -> conversation_id and last message, for create_or_get_conversation
+_conversation_pair_cache = LRUCache(
+    int(os.getenv("CONVERSATION_PAIR_CACHE_SIZE", "10000")), name="conversation_pair"
+)
+
+# conversation_id -> get_conversation result. Writes in this process update
+# entries in place; the TTL bounds how stale another worker's writes can leave them
+_conversation_cache = LRUCache(
+    int(os.getenv("CONVERSATION_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("CONVERSATION_CACHE_TTL_SECONDS", "30")),
+    name="conversation",
+)
+
+# Concurrent identical reads share one query. Writes forget the reads in
+# flight for what they changed, so requests arriving afterwards see them
+_message_reads = SingleFlight("messages")
+_conversation_reads = SingleFlight("conversation")
+_inbox_reads = SingleFlight("inbox")
+
+# Opt-in group commit of message-row inserts: set WRITE_COALESCE_MS to the
+# collection window (and optionally WRITE_COALESCE_MAX_ITEMS)
+_write_coalescer = (
+    WriteCoalescer.from_env(functools.partial(cassandra_client.execute_batch, profile=WRITE_DURABLE))
+    if float(os.getenv("WRITE_COALESCE_MS", "0")) > 0 else None
+)
+
+# Message inserts per single-partition batch when several messages are written at once
+MESSAGE_BATCH_CHUNK = 100
+
+# Rows per driver page when exporting a conversation, and the bounds of an open time range
+EXPORT_FETCH_SIZE = int(os.getenv("EXPORT_FETCH_SIZE", "1000"))
+EXPORT_MIN_TIMESTAMP = datetime(1970, 1, 1)
+EXPORT_MAX_TIMESTAMP = datetime(9999, 12, 31)
+
+# conversation_id -> newest messages, so first pages of hot conversations are
+# served from memory. Set RECENT_MESSAGES_PER_CONVERSATION=0 to disable
+_recent_messages = RecentMessagesCache(
+    per_conversation=int(os.getenv("RECENT_MESSAGES_PER_CONVERSATION", "50")),
+    max_bytes=int(float(os.getenv("RECENT_MESSAGES_CACHE_MB", "64")) * 1024 * 1024),
+    ttl=float(os.getenv("RECENT_MESSAGES_TTL_SECONDS", "10")),
+    name="recent_messages",
+)
+
+# (user_id, limit) -> (version, conversations, total, next_cursor) of the first
+# inbox page; served only while the inbox head still carries that version
+_inbox_cache = LRUCache(int(os.getenv("INBOX_CACHE_SIZE", "10000")), name="inbox")
+
+# Optional on-disk copy of the inbox pages and conversation summaries above,
+# shared by the workers of a host and used to warm them on startup
+_l2_cache = (
+    DiskCache(os.environ["L2_CACHE_PATH"], int(os.getenv("L2_CACHE_MAX_ENTRIES", "100000")))
+    if os.getenv("L2_CACHE_PATH") else None
+)
+_l2_writes = set()
+
+# Background deletes of stale user_inbox entries found by inbox reads
+_inbox_cleanups = set()
+
 class MessageModel:
     """
     Message model for interacting with the messages table.
     """
     
     @staticmethod
-    async def create_message(conversation_id: int, sender_id: int, receiver_id: int, content: str) -> Dict[str, Any]:
+    async def create_message(
+        conversation_id: int,
+        sender_id: int,
+        receiver_id: int,
+        content: str,
+        previous_timestamp: Optional[datetime] = None
+    ) -> Dict[str, Any]:
         """
         Create a new message.
         
@@ -26,124 +116,248 @@ class MessageModel:
             sender_id (int): ID of the sender
             receiver_id (int): ID of the receiver
             content (str): Content of the message
+            previous_timestamp (datetime): last_timestamp of the conversation before
+                this message, used to replace its user_inbox entries
         
         Returns:
             dict: Details of the created message matching MessageResponse schema
         """
-        # First, get or create a conversation between these users
-        
-        
-        # Get the next message ID
-        message_id_query = "SELECT counter_value FROM counters WHERE counter_name = 'message_id'"
-        result = await cassandra_client.execute(message_id_query)
-        message_id = result[0]["counter_value"] + 1 if result else 1
-        logger.info(f"Message ID: {message_id}")
-        # Update the counter
-        await cassandra_client.execute(
-            "UPDATE counters SET counter_value = counter_value + 1 WHERE counter_name = 'message_id'"
+        messages = await MessageModel.create_messages(
+            conversation_id, [(sender_id, receiver_id, content)], previous_timestamp
         )
+        return messages[0]
+
+    @staticmethod
+    async def create_messages(
+        conversation_id: int,
+        messages: List[Tuple[int, int, str]],
+        previous_timestamp: Optional[datetime] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Create several messages in one conversation, in order.
         
-        created_at = datetime.now()
+        IDs are allocated in one call and the messages get increasing
+        timestamps one millisecond apart, the last one now, so they keep
+        their order. The
+        conversation's summaries are written once, for the last message.
         
-        # Insert into messages table
-        query = """
-        INSERT INTO messages (message_id, conversation_id, sender_id, receiver_id, content, timestamp)
-        VALUES (%s, %s, %s, %s, %s, %s)
+        Args:
+            conversation_id (int): ID of the conversation
+            messages (list): (sender_id, receiver_id, content) of each message, oldest first
+            previous_timestamp (datetime): last_timestamp of the conversation before
+                these messages, used to replace its user_inbox entries
+        
+        Returns:
+            list: Details of each created message matching MessageResponse schema
         """
-        await cassandra_client.execute(query, (message_id, conversation_id, sender_id, receiver_id, content, created_at))
+        # Get the message IDs (usually from the locally leased block, no round-trip)
+        message_ids = await id_generator.next_ids("message_id", len(messages))
+        logger.info(f"Message IDs: {message_ids[0]}-{message_ids[-1]}")
         
-        check_conversation_query = """
-            select conversation_id from user_conversations where conversation_id = %s 
-            """
-        rows = await cassandra_client.execute(check_conversation_query, (conversation_id,))
+        # The spacing ends at now, so no message is stamped after a send that
+        # follows the batch
+        now = datetime.now()
+        created = [
+            (message_id, sender_id, receiver_id, content, now - timedelta(milliseconds=len(messages) - 1 - index))
+            for index, (message_id, (sender_id, receiver_id, content)) in enumerate(zip(message_ids, messages))
+        ]
 
-        if not rows.current_rows:
-            logger.info("No existing conversation found.")
-        else:
-            for row in rows:
-                logger.info(f"Checking if conversation already exists: {row}")
+        # Every write is an upsert, so nothing is read first and all of them
+        # are sent concurrently: one round-trip of latency
+        writes = MessageModel._conversation_writes(conversation_id, created, previous_timestamp)
+        await asyncio.gather(*(_execute_write(write) for write in writes))
+        _message_reads.forget(conversation_id)
+        _conversation_reads.forget(conversation_id)
+        for user_id in {user for _, sender_id, receiver_id, _, _ in created for user in (sender_id, receiver_id)}:
+            _inbox_reads.forget(user_id)
 
-        if not rows:
-            # If conversation doesn't exist, create it
-            insert_query = """
-            INSERT INTO user_conversations (conversation_id, sender_id, receiver_id, last_timestamp, last_message)
-            VALUES (%s, %s, %s, %s, %s)
-            """
-            await cassandra_client.execute(insert_query, (conversation_id, sender_id, receiver_id, created_at, content))
-        else:
-            # If conversation exists, update it with the new message
-            update_query = """
-            UPDATE user_conversations SET last_timestamp = %s, last_message = %s, sender_id = %s, receiver_id = %s WHERE conversation_id = %s
-            """
-            await cassandra_client.execute(update_query, (created_at, content, sender_id, receiver_id, conversation_id))
-        
+        # Keep the pair lookup's last message current in this process, with
+        # timestamps as Cassandra returns them
+        _, sender_id, receiver_id, content, created_at = created[-1]
+        last_message_at = _stored_timestamp(created_at)
+        _conversation_pair_cache.put(conversation_pair(sender_id, receiver_id), {
+            "conversation_id": conversation_id,
+            "last_message_at": last_message_at,
+            "last_message_content": content
+        })
+        if conversation_id in _conversation_cache:
+            # user_conversations now holds the last message's sender, receiver and content
+            _conversation_cache.put(conversation_id, {
+                "conversation_id": conversation_id,
+                "sender_id": sender_id,
+                "receiver_id": receiver_id,
+                "last_message_at": last_message_at,
+                "last_message_content": content
+            })
+        for message_id, sender_id, receiver_id, content, created_at in created:
+            _recent_messages.append(conversation_id, MessageRow(
+                message_id,
+                sender_id,
+                receiver_id,
+                content,
+                _stored_timestamp(created_at),
+                conversation_id
+            ))
         
         # Return message details in the format expected by MessageResponse
-        return {
-            "message_id": message_id,
-            "sender_id": sender_id,
-            "receiver_id": receiver_id,
-            "content": content,
-            "timestamp": created_at,
-            "conversation_id": conversation_id
-        }
+        return [
+            {
+                "message_id": message_id,
+                "sender_id": sender_id,
+                "receiver_id": receiver_id,
+                "content": content,
+                "timestamp": created_at,
+                "conversation_id": conversation_id
+            }
+            for message_id, sender_id, receiver_id, content, created_at in created
+        ]
     
     @staticmethod
-    async def get_conversation_messages(conversation_id: int, page: int = 1, limit: int = 20) -> Tuple[List[Dict[str, Any]], int]:
+    def _message_writes(
+        message_id: int,
+        conversation_id: int,
+        sender_id: int,
+        receiver_id: int,
+        content: str,
+        created_at: datetime,
+        previous_timestamp: Optional[datetime] = None
+    ) -> List[Tuple[str, Any]]:
         """
-        Get messages for a conversation with pagination.
-        
-        Args:
-            conversation_id (int): ID of the conversation
-            page (int): Page number for pagination (default: 1)
-            limit (int): Number of messages per page (default: 20)
+        Build every write needed to store a message and its denormalized summaries.
         
         Returns:
-            tuple: (List of messages, Total count) for PaginatedMessageResponse
+            list: ("statement", (key, params)) entries and ("batch", [(key, params), ...])
+            entries; each batch touches a single partition
         """
-        # Get total count of messages in the conversation
-        count_query = """
-        SELECT COUNT(*) as count FROM messages WHERE conversation_id = %s
+        return MessageModel._conversation_writes(
+            conversation_id, [(message_id, sender_id, receiver_id, content, created_at)], previous_timestamp
+        )
+
+    @staticmethod
+    def _conversation_writes(
+        conversation_id: int,
+        messages: List[Tuple[int, int, int, str, datetime]],
+        previous_timestamp: Optional[datetime] = None
+    ) -> List[Tuple[str, Any]]:
         """
-        count_result = await cassandra_client.execute(count_query, (conversation_id,))
-        total = count_result[0]["count"] if count_result else 0
+        Build every write needed to store messages of one conversation and its
+        denormalized summaries.
         
-        # Calculate offset for pagination
+        Args:
+            messages: (message_id, sender_id, receiver_id, content, created_at), oldest first
         
-        # Get messages with pagination
-        query = """
-        SELECT message_id, sender_id, receiver_id, content, timestamp
-        FROM messages
-        WHERE conversation_id = %s
-        ORDER BY timestamp DESC 
+        Returns:
+            list: ("statement", (key, params)) entries and ("batch", [(key, params), ...])
+            entries; each batch touches a single partition
         """
+        # Message rows, grouped by the partition they land in
+        partitions: Dict[Any, List[Tuple[str, tuple]]] = {}
+        for message_id, sender_id, receiver_id, content, created_at in messages:
+            if bucketed_layout():
+                # Insert into the message's time bucket and record the bucket for readers
+                bucket = message_bucket(created_at)
+                partitions.setdefault(bucket, []).append(("insert_bucket_message",
+                    (conversation_id, bucket, created_at, message_id, content, sender_id, receiver_id)))
+            else:
+                partitions.setdefault(None, []).append(("insert_message",
+                    (message_id, conversation_id, sender_id, receiver_id, content, created_at)))
 
-        rows = await cassandra_client.execute(query, (conversation_id,))
+        writes = []
+        for bucket, inserts in partitions.items():
+            if len(inserts) == 1:
+                writes.append(("statement", inserts[0]))
+            else:
+                for start in range(0, len(inserts), MESSAGE_BATCH_CHUNK):
+                    writes.append(("batch", inserts[start:start + MESSAGE_BATCH_CHUNK]))
+            if bucket is not None:
+                writes.append(("statement", ("insert_conversation_bucket", (conversation_id, bucket))))
 
-        messages = []
-        for row in rows:
-            messages.append({
-                "id": row["message_id"],
-                "sender_id": row["sender_id"],
-                "receiver_id": row["receiver_id"],
-                "content": row["content"],
-                "created_at": row["timestamp"],
-                "conversation_id": conversation_id
-            })
-        total = len(messages)
-        offset = (page - 1) * limit
-        paginated_messages = messages[offset:offset + limit]
+        # Summaries only need the first and last message
+        _, sender_id, receiver_id, content, created_at = messages[-1]
+        first_created_at = messages[0][4]
+
+        # Conversation summary (INSERT upserts, so no existence check is needed)
+        writes.append(("statement", ("insert_user_conversation",
+                       (conversation_id, sender_id, receiver_id, created_at, content))))
 
-        messages = paginated_messages if paginated_messages else []
-        return messages, total
+        # Message count and first/last timestamps. Write times make the earliest
+        # first_timestamp and the latest last_timestamp win.
+        created_micros = _timestamp_micros(created_at)
+        if len(messages) == 1:
+            writes.append(("statement", ("increment_conversation_message_count", (conversation_id,))))
+        else:
+            writes.append(("statement", ("add_conversation_message_count", (len(messages), conversation_id))))
+        writes.append(("statement", ("update_conversation_first_timestamp",
+                       (FIRST_TIMESTAMP_WRITETIME_BASE - _timestamp_micros(first_created_at), first_created_at,
+                        conversation_id))))
+        writes.append(("statement", ("update_conversation_last_timestamp",
+                       (created_micros, created_at, conversation_id))))
+
+        # Pair lookup's last message; it feeds the next send's previous_timestamp,
+        # so an older message must never overwrite a newer one
+        writes.append(("statement", ("update_conversation_by_pair",
+                       (created_micros, created_at, content, *conversation_pair(sender_id, receiver_id)))))
+
+        # Move the conversation to the top of both participants' inboxes; the
+        # delete, insert and latest-entry marker share the user's partition
+        # key, so they go in one batch and are applied together
+        replace_previous = previous_timestamp is not None and (
+            _timestamp_micros(previous_timestamp) // 1000 != created_micros // 1000
+        )
+        for user_id in {sender_id, receiver_id}:
+            inbox_writes = []
+            if replace_previous:
+                inbox_writes.append(("delete_inbox_entry", (user_id, previous_timestamp, conversation_id)))
+            inbox_writes.append(("insert_inbox_entry",
+                                 (user_id, created_at, conversation_id, sender_id, receiver_id, content)))
+            inbox_writes.append(("update_inbox_latest", (created_micros, created_at, user_id, conversation_id)))
+            writes.append(("batch", inbox_writes))
+
+        return writes
+
+    @staticmethod
+    @single_flight(_message_reads, "conversation_id")
+    async def get_conversation_messages(
+        conversation_id: int,
+        page: int = 1,
+        limit: int = 20,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Row], Optional[int], Optional[str]]:
+        """
+        Get messages for a conversation with pagination.
+        
+        Only one page of rows is read from the partition. Pass the returned
+        next_cursor to continue; without a cursor, `page` is honoured by
+        reading the first page * limit rows. The total comes from
+        conversation_stats. First pages are served from the recent-messages
+        buffer when it holds the conversation.
+        
+        Args:
+            conversation_id (int): ID of the conversation
+            page (int): Page number for pagination (default: 1)
+            limit (int): Number of messages per page (default: 20)
+            cursor (str): next_cursor of the previous page
+        
+        Returns:
+            tuple: (List of messages, Total count, Next cursor) for PaginatedMessageResponse
+        
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        if cursor is None and page == 1 and _recent_messages.enabled and limit <= _recent_messages.per_conversation:
+            return await MessageModel._read_recent_messages(conversation_id, limit)
+        return await MessageModel._read_messages(conversation_id, None, page, limit, cursor, exact_total=True)
     
     @staticmethod
+    @single_flight(_message_reads, "conversation_id")
     async def get_messages_before_timestamp(
         conversation_id: int, 
         before_timestamp: datetime, 
         page: int = 1, 
-        limit: int = 20
-    ) -> Tuple[List[Dict[str, Any]], int]:
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        exact_total: bool = True
+    ) -> Tuple[List[Row], Optional[int], Optional[str]]:
         """
         Get messages before a timestamp with pagination.
         
@@ -152,45 +366,421 @@ class MessageModel:
             before_timestamp (datetime): Timestamp to filter messages
             page (int): Page number for pagination (default: 1)
             limit (int): Number of messages per page (default: 20)
+            cursor (str): next_cursor of the previous page
+            exact_total (bool): Count the messages before the timestamp. If False,
+                no count is run and the total is None; callers use next_cursor
+                to tell whether there are more messages.
         
         Returns:
-            tuple: (List of messages, Total count) for PaginatedMessageResponse
-        """
-        # Get total count of messages before the timestamp
-        count_query = """
-        SELECT COUNT(*) as count FROM messages 
-        WHERE conversation_id = %s AND timestamp < %s
-        """
-        count_result = await cassandra_client.execute(count_query, (conversation_id, before_timestamp))
-        total = count_result[0]["count"] if count_result else 0
-                
-        # Get messages before timestamp with pagination
-        query = """
-        SELECT message_id, sender_id, receiver_id, content, timestamp
-        FROM messages
-        WHERE conversation_id = %s AND timestamp < %s
-        ORDER BY timestamp DESC
-        """
-        rows = await cassandra_client.execute(query, (conversation_id, before_timestamp))
-        
-        messages = []
-        for row in rows:
-            messages.append({
-                "id": row["message_id"],
-                "sender_id": row["sender_id"],
-                "receiver_id": row["receiver_id"],
-                "content": row["content"],
-                "created_at": row["timestamp"],
-                "conversation_id": conversation_id
-            })
+            tuple: (List of messages, Total count, Next cursor) for PaginatedMessageResponse
+        
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        return await MessageModel._read_messages(
+            conversation_id, _as_utc(before_timestamp), page, limit, cursor, exact_total
+        )
+
+    @staticmethod
+    async def get_messages_after(
+        conversation_id: int,
+        sync_token: Optional[str] = None,
+        limit: int = 100
+    ) -> Tuple[List[Row], Optional[str], bool]:
+        """
+        Get the messages newer than a sync token, oldest first.
+        
+        The token is the (timestamp, message_id) position of the last message
+        the client has; only the clustering range after it is read: the rest
+        of its timestamp, then newer timestamps in reversed clustering order.
+        
+        Args:
+            conversation_id (int): ID of the conversation
+            sync_token (str): Token of a previous sync or first page; None to start from the oldest message
+            limit (int): Maximum number of messages
+        
+        Returns:
+            tuple: (List of messages, Sync token to continue from, Whether more messages are waiting)
+        
+        Raises:
+            ValueError: If the sync token is malformed
+        """
+        position = decode_position_cursor(sync_token)
+        if sync_token and position is None:
+            raise ValueError(f"Invalid sync token: {sync_token}")
+        timestamp, message_id = position if position is not None else (EXPORT_MIN_TIMESTAMP, -1)
+
+        if bucketed_layout():
+            select_ties = "select_bucket_messages_at_timestamp_after"
+
+            def tie_params(at: datetime, after_id: int):
+                return (conversation_id, message_bucket(at), at, after_id)
+
+            async def read_newer():
+                bucket_rows = await cassandra_client.execute(
+                    "select_conversation_buckets_from", (conversation_id, message_bucket(timestamp)),
+                    profile=READ_FAST
+                )
+                rows, more = [], False
+                for row in bucket_rows:
+                    if len(rows) > limit:
+                        more = True
+                        break
+                    result = await cassandra_client.execute(
+                        "select_bucket_messages_after", (conversation_id, row["bucket"], timestamp),
+                        fetch_size=limit + 1 - len(rows),
+                        profile=READ_FAST
+                    )
+                    rows.extend(result)
+                    more = result.paging_state is not None
+                return rows, more
+        else:
+            select_ties = "select_messages_at_timestamp_after"
+
+            def tie_params(at: datetime, after_id: int):
+                return (conversation_id, at, after_id)
+
+            async def read_newer():
+                result = await cassandra_client.execute(
+                    "select_messages_after", (conversation_id, timestamp), fetch_size=limit + 1,
+                    profile=READ_FAST
+                )
+                return list(result), result.paging_state is not None
+
+        async def read_group(at: datetime):
+            return await cassandra_client.execute(
+                select_ties, tie_params(at, message_id if at == timestamp else -1),
+                profile=READ_FAST
+            )
+
+        tie_rows, (newer_rows, newer_more) = await asyncio.gather(
+            cassandra_client.execute(
+                select_ties, tie_params(timestamp, message_id), fetch_size=limit + 1,
+                profile=READ_FAST
+            ),
+            read_newer()
+        )
+        rows = list(tie_rows) + newer_rows
+        more = len(rows) > limit or tie_rows.paging_state is not None or newer_more
+        rows = await _page_after_position(
+            rows, more, limit, lambda row: (row.created_at, row.id), read_group
+        )
+
+        if rows:
+            sync_token = encode_position_cursor(rows[-1].created_at, rows[-1].id)
+        return rows, sync_token, more
+
+    @staticmethod
+    def export_messages(
+        conversation_id: int,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        cursor: Optional[str] = None
+    ) -> AsyncIterator[Tuple[Row, str]]:
+        """
+        Iterate over every message of a conversation in a time range, newest first.
+        
+        Rows are read one driver page (EXPORT_FETCH_SIZE rows) at a time, so
+        memory use does not grow with the conversation.
+        
+        Args:
+            conversation_id (int): ID of the conversation
+            since (datetime): Only messages at or after this time
+            until (datetime): Only messages before this time
+            cursor (str): Resume after the message this cursor was yielded with
+        
+        Returns:
+            Async iterator of (message, cursor) pairs; the cursor resumes after the message
+        
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        position = decode_position_cursor(cursor)
+        if cursor and position is None:
+            raise ValueError(f"Invalid cursor: {cursor}")
+        lower = _as_utc(since) if since is not None else EXPORT_MIN_TIMESTAMP
+        upper = _as_utc(until) if until is not None else EXPORT_MAX_TIMESTAMP
+        return MessageModel._export_rows(conversation_id, lower, upper, position)
 
-        total = len(messages)
-        offset = (page - 1) * limit
-        paginated_messages = messages[offset:offset + limit]
+    @staticmethod
+    async def _export_rows(
+        conversation_id: int,
+        lower: datetime,
+        upper: datetime,
+        position: Optional[Tuple[datetime, int]]
+    ) -> AsyncIterator[Tuple[Row, str]]:
+        bucketed = bucketed_layout()
+        reads = []
+        if position is not None:
+            # The rest of the cursor's timestamp, then everything older
+            timestamp, message_id = position
+            if lower <= timestamp < upper:
+                if bucketed:
+                    reads.append(("select_bucket_messages_at_timestamp_after",
+                                  (conversation_id, message_bucket(timestamp), timestamp, message_id)))
+                else:
+                    reads.append(("select_messages_at_timestamp_after", (conversation_id, timestamp, message_id)))
+            upper = min(upper, timestamp)
 
-        messages = paginated_messages if paginated_messages else []
+        if bucketed:
+            if upper == EXPORT_MAX_TIMESTAMP:
+                bucket_rows = await cassandra_client.execute(
+                    "select_conversation_buckets", (conversation_id,),
+                    profile=EXPORT
+                )
+            else:
+                bucket_rows = await cassandra_client.execute(
+                    "select_conversation_buckets_upto", (conversation_id, message_bucket(upper)),
+                    profile=EXPORT
+                )
+            lowest_bucket = message_bucket(lower)
+            reads.extend(
+                ("select_bucket_messages_range", (conversation_id, row["bucket"], lower, upper))
+                for row in bucket_rows if row["bucket"] >= lowest_bucket
+            )
+        else:
+            reads.append(("select_messages_range", (conversation_id, lower, upper)))
+
+        for select, params in reads:
+            paging_state = None
+            while True:
+                rows = await cassandra_client.execute(
+                    select, params, fetch_size=EXPORT_FETCH_SIZE, paging_state=paging_state,
+                    profile=EXPORT
+                )
+                for row in rows:
+                    yield row, encode_position_cursor(row.created_at, row.id)
+                paging_state = rows.paging_state
+                if paging_state is None:
+                    break
+
+    @staticmethod
+    async def get_conversation_stats(conversation_id: int) -> Dict[str, Any]:
+        """
+        Get the message count and first/last message timestamps of a conversation.
+        
+        Args:
+            conversation_id (int): ID of the conversation
         
-        return messages, total
+        Returns:
+            dict: message_count, first_timestamp and last_timestamp (None if there are no messages)
+        """
+        count_rows, bounds_rows = await asyncio.gather(
+            cassandra_client.execute("select_conversation_message_count", (conversation_id,), profile=READ_FAST),
+            cassandra_client.execute("select_conversation_time_bounds", (conversation_id,), profile=READ_FAST)
+        )
+        bounds = bounds_rows[0] if bounds_rows else {}
+        return {
+            "message_count": count_rows[0]["message_count"] if count_rows else 0,
+            "first_timestamp": bounds.get("first_timestamp"),
+            "last_timestamp": bounds.get("last_timestamp")
+        }
+
+    @staticmethod
+    async def _read_messages(
+        conversation_id: int,
+        before_timestamp: Optional[datetime],
+        page: int,
+        limit: int,
+        cursor: Optional[str],
+        exact_total: bool
+    ) -> Tuple[List[Row], Optional[int], Optional[str]]:
+        """Read one page of messages, newest first, resuming from the cursor if given."""
+        position = decode_position_cursor(cursor)
+        if position is not None:
+            read_page = MessageModel._read_after_position(conversation_id, before_timestamp, position, limit)
+        elif bucketed_layout():
+            read_page = MessageModel._read_bucketed_page(conversation_id, before_timestamp, page, limit, cursor)
+        else:
+            read_page = MessageModel._read_flat_page(conversation_id, before_timestamp, page, limit, cursor)
+
+        if not exact_total:
+            messages, next_cursor = await read_page
+            return messages, None, next_cursor
+
+        (messages, next_cursor), total = await asyncio.gather(
+            read_page,
+            MessageModel._count_messages(conversation_id, before_timestamp)
+        )
+        return messages, total, next_cursor
+
+    @staticmethod
+    async def _read_recent_messages(
+        conversation_id: int,
+        limit: int
+    ) -> Tuple[List[Row], Optional[int], Optional[str]]:
+        """
+        Serve the first page from the recent-messages buffer, filling the
+        buffer from Cassandra on a miss.
+        """
+        cached = _recent_messages.get_page(conversation_id, limit)
+        if cached is not None:
+            messages, total, has_more = cached
+            if total is None:
+                total = await MessageModel._count_messages(conversation_id, None)
+        else:
+            newest, total, next_cursor = await MessageModel._read_messages(
+                conversation_id, None, 1, _recent_messages.per_conversation, None, exact_total=True
+            )
+            _recent_messages.fill(conversation_id, newest, complete=next_cursor is None, total=total)
+            messages = newest[:limit]
+            has_more = len(newest) > limit or next_cursor is not None
+
+        # Deeper pages resume in Cassandra after the last message served here
+        last = messages[-1] if messages else None
+        next_cursor = encode_position_cursor(last["created_at"], last["id"]) if has_more and last else None
+        return messages, total, next_cursor
+
+    @staticmethod
+    async def _read_after_position(
+        conversation_id: int,
+        before_timestamp: Optional[datetime],
+        position: Tuple[datetime, int],
+        limit: int
+    ) -> Tuple[List[Row], Optional[str]]:
+        """
+        Read the page that follows a position cursor: the remaining messages
+        sharing its timestamp, then older ones, fetched concurrently.
+        """
+        timestamp, message_id = position
+        if bucketed_layout():
+            select_ties = "select_bucket_messages_at_timestamp_after"
+            tie_params = (conversation_id, message_bucket(timestamp), timestamp, message_id)
+            read_page = MessageModel._read_bucketed_page
+        else:
+            select_ties = "select_messages_at_timestamp_after"
+            tie_params = (conversation_id, timestamp, message_id)
+            read_page = MessageModel._read_flat_page
+
+        if before_timestamp is not None and timestamp >= before_timestamp:
+            # Nothing at the cursor's timestamp is before before_timestamp
+            tie_rows = AsyncResultSet()
+            older_messages, older_cursor = await read_page(conversation_id, before_timestamp, 1, limit, None)
+        else:
+            tie_rows, (older_messages, older_cursor) = await asyncio.gather(
+                cassandra_client.execute(select_ties, tie_params, fetch_size=limit, profile=READ_FAST),
+                read_page(conversation_id, timestamp, 1, limit, None)
+            )
+
+        messages = list(tie_rows) + older_messages
+        has_more = len(messages) > limit or tie_rows.paging_state is not None or older_cursor is not None
+        messages = messages[:limit]
+        last = messages[-1] if messages else None
+        return messages, encode_position_cursor(last["created_at"], last["id"]) if has_more and last else None
+
+    @staticmethod
+    async def _count_messages(conversation_id: int, before_timestamp: Optional[datetime]) -> int:
+        """
+        Count the messages of a conversation, optionally only those before a timestamp.
+        
+        The conversation total is a single conversation_stats read. A
+        before-timestamp count only scans the partition range when the
+        timestamp falls between the first and last message.
+        """
+        stats = await MessageModel.get_conversation_stats(conversation_id)
+        first, last = stats["first_timestamp"], stats["last_timestamp"]
+        if before_timestamp is None or (last is not None and before_timestamp > last):
+            return stats["message_count"]
+        if first is None or before_timestamp <= first:
+            return 0
+
+        if not bucketed_layout():
+            result = await cassandra_client.execute(
+                "count_messages_before", (conversation_id, before_timestamp),
+                profile=READ_FAST
+            )
+            return result[0]["count"] if result else 0
+
+        bucket_rows = await cassandra_client.execute(
+            "select_conversation_buckets_upto", (conversation_id, message_bucket(before_timestamp)),
+            profile=READ_FAST
+        )
+        results = await asyncio.gather(*(
+            cassandra_client.execute(
+                "count_bucket_messages_before", (conversation_id, row["bucket"], before_timestamp),
+                profile=READ_FAST
+            )
+            for row in bucket_rows
+        ))
+        return sum(result[0]["count"] for result in results if result)
+
+    @staticmethod
+    async def _read_flat_page(
+        conversation_id: int,
+        before_timestamp: Optional[datetime],
+        page: int,
+        limit: int,
+        cursor: Optional[str]
+    ) -> Tuple[List[Row], Optional[str]]:
+        """Read one page from the messages table."""
+        if before_timestamp is None:
+            select, params = "select_conversation_messages", (conversation_id,)
+        else:
+            select, params = "select_messages_before", (conversation_id, before_timestamp)
+
+        paging_state = decode_cursor(cursor)
+        offset = (page - 1) * limit if paging_state is None else 0
+        rows = await cassandra_client.execute(
+            select, params, fetch_size=offset + limit, paging_state=paging_state,
+            profile=READ_FAST
+        )
+        return rows[offset:], encode_cursor(rows.paging_state)
+
+    @staticmethod
+    async def _read_bucketed_page(
+        conversation_id: int,
+        before_timestamp: Optional[datetime],
+        page: int,
+        limit: int,
+        cursor: Optional[str]
+    ) -> Tuple[List[Row], Optional[str]]:
+        """
+        Read one page from the bucketed layout, walking buckets newest-first
+        until `limit` rows are filled.
+        """
+        start_bucket, paging_state = decode_bucket_cursor(cursor)
+        offset = (page - 1) * limit if cursor is None else 0
+
+        # Jump straight to the bucket holding before_timestamp, or the cursor's bucket
+        upper_bucket = message_bucket(before_timestamp) if before_timestamp is not None else None
+        if start_bucket is not None:
+            upper_bucket = start_bucket if upper_bucket is None else min(upper_bucket, start_bucket)
+        if upper_bucket is None:
+            bucket_rows = await cassandra_client.execute(
+                "select_conversation_buckets", (conversation_id,),
+                profile=READ_FAST
+            )
+        else:
+            bucket_rows = await cassandra_client.execute(
+                "select_conversation_buckets_upto", (conversation_id, upper_bucket),
+                profile=READ_FAST
+            )
+        buckets = [row["bucket"] for row in bucket_rows]
+
+        if before_timestamp is None:
+            select = "select_bucket_messages"
+        else:
+            select = "select_bucket_messages_before"
+
+        rows = []
+        for index, bucket in enumerate(buckets):
+            params = (conversation_id, bucket) if before_timestamp is None else (conversation_id, bucket, before_timestamp)
+            result = await cassandra_client.execute(
+                select, params, fetch_size=offset + limit - len(rows), paging_state=paging_state,
+                profile=READ_FAST
+            )
+            paging_state = None
+            rows.extend(result)
+            if result.paging_state:
+                next_cursor = encode_bucket_cursor(bucket, result.paging_state)
+                break
+            if len(rows) >= offset + limit:
+                next_cursor = encode_bucket_cursor(buckets[index + 1]) if index + 1 < len(buckets) else None
+                break
+        else:
+            next_cursor = None
+
+        return rows[offset:], next_cursor
 
 
 class ConversationModel:
@@ -199,77 +789,204 @@ class ConversationModel:
     """
 
     @staticmethod
-    async def get_user_conversations(user_id: int, page: int = 1, limit: int = 20) -> Tuple[List[Dict[str, Any]], int]:
-    
-        # Get conversations with pagination
-        query1 = """
-        SELECT conversation_id, sender_id, receiver_id, last_timestamp, last_message
-        FROM user_conversations 
-        WHERE sender_id = %s 
-        ALLOW FILTERING       
-        """
-
-        query2 = """
-        SELECT conversation_id, sender_id, receiver_id, last_timestamp, last_message
-        FROM user_conversations 
-        WHERE receiver_id = %s
-        ALLOW FILTERING
+    @single_flight(_inbox_reads, "user_id")
+    async def get_user_conversations(
+        user_id: int,
+        page: int = 1,
+        limit: int = 20,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], int, Optional[str]]:
         """
-        rows1 = await cassandra_client.execute(query2, (user_id,))
+        Get the conversations of a user, most recent first.
+        
+        Reads the user's user_inbox partition, which is already ordered by
+        last_timestamp DESC, one page at a time. Without a cursor, `page` is
+        honoured by reading the first page * limit rows. The total is the
+        user_inbox_stats counter. A cached first page is reused while the
+        newest inbox entry is unchanged.
         
-        rows = await cassandra_client.execute(query1, (user_id,))
-        rows_list = list(rows)
-        rows_list2 = list(rows1)
-        rows_list.extend(rows_list2)
-        sorted(rows_list, key=lambda x: x["last_timestamp"])
+        Args:
+            user_id (int): ID of the user
+            page (int): Page number for pagination (default: 1)
+            limit (int): Number of conversations per page (default: 20)
+            cursor (str): next_cursor of the previous page
+        
+        Returns:
+            tuple: (List of conversations, Total count, Next cursor) for PaginatedConversationResponse
+        
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        paging_state = decode_cursor(cursor)
+        offset = (page - 1) * limit if paging_state is None else 0
+        first_page = paging_state is None and page == 1
+        if first_page:
+            cached = await ConversationModel._cached_inbox_page(user_id, limit)
+            if cached is not None:
+                return cached
 
-        logger.info(f"Rows fetched: {rows_list}")
+        rows, count_result = await asyncio.gather(
+            cassandra_client.execute(
+                "select_inbox", (user_id,), fetch_size=offset + limit, paging_state=paging_state,
+                profile=READ_FAST
+            ),
+            cassandra_client.execute("select_inbox_conversation_count", (user_id,), profile=READ_FAST)
+        )
+        total = count_result[0]["conversation_count"] if count_result else 0
+        page_rows = rows[offset:]
 
-        total = len(rows_list)
-        offset = (page - 1) * limit
-        paginated_rows = rows_list[offset:offset + limit]
+        # Sends that raced (or replaced an entry another worker had already
+        # moved) leave older entries behind. Each row is checked against the
+        # conversation's latest entry, so they are dropped on whichever page
+        # they fall, not only next to the live entry.
+        latest = {}
+        if page_rows:
+            latest_rows = await cassandra_client.execute(
+                "select_inbox_latest", (user_id, list({row["conversation_id"] for row in page_rows})),
+                profile=READ_FAST
+            )
+            latest = {row["conversation_id"]: row["last_timestamp"] for row in latest_rows}
 
         conversations = []
+        seen = set()
+        stale = []
+        for row in page_rows:
+            conversation_id = row["conversation_id"]
+            latest_at = latest.get(conversation_id)
+            if conversation_id in seen or (latest_at is not None and row["last_timestamp"] < latest_at):
+                stale.append(row)
+                continue
+            seen.add(conversation_id)
+            conversations.append(_inbox_row_to_conversation(row))
+        if stale:
+            _remove_stale_inbox_entries(user_id, stale)
 
-        for row in paginated_rows:
-            logger.info(f"Checking if conversation already exists: {row}")
-            conversations.append({
-                "id": row["conversation_id"],
-                "user1_id": row["sender_id"],
-                "user2_id": row["receiver_id"],
-                "last_message_at": row["last_timestamp"],
-                "last_message_content": row["last_message"]
-            })
+        next_cursor = encode_cursor(rows.paging_state)
+        if first_page:
+            version = _timestamp_micros(rows[0]["last_timestamp"]) if rows else 0
+            _inbox_cache.put((user_id, limit), (version, conversations, total, next_cursor))
+            _persist("inbox", (user_id, limit), version, [conversations, total, next_cursor])
+        return conversations, total, next_cursor
 
+    @staticmethod
+    async def get_inbox_changes(
+        user_id: int,
+        sync_token: Optional[str] = None,
+        limit: int = 100
+    ) -> Tuple[List[Dict[str, Any]], Optional[str], bool]:
+        """
+        Get the conversations of a user updated since a sync token, least recently updated first.
         
-        # conversations = paginated_rows if paginated_rows else []
-
+        The token is the (last_timestamp, conversation_id) position of the
+        newest inbox entry the client has; only the part of the user_inbox
+        partition after it is read.
         
+        Args:
+            user_id (int): ID of the user
+            sync_token (str): Token of a previous sync or first page; None to start from the oldest entry
+            limit (int): Maximum number of conversations
+        
+        Returns:
+            tuple: (List of conversations, Sync token to continue from, Whether more changes are waiting)
+        
+        Raises:
+            ValueError: If the sync token is malformed
+        """
+        position = decode_position_cursor(sync_token)
+        if sync_token and position is None:
+            raise ValueError(f"Invalid sync token: {sync_token}")
+        timestamp, conversation_id = position if position is not None else (EXPORT_MIN_TIMESTAMP, -1)
+
+        async def read_group(at: datetime):
+            return await cassandra_client.execute(
+                "select_inbox_at_timestamp_after", (user_id, at, conversation_id if at == timestamp else -1),
+                profile=READ_FAST
+            )
+
+        tie_rows, newer_rows = await asyncio.gather(
+            cassandra_client.execute(
+                "select_inbox_at_timestamp_after", (user_id, timestamp, conversation_id), fetch_size=limit + 1,
+                profile=READ_FAST
+            ),
+            cassandra_client.execute(
+                "select_inbox_after", (user_id, timestamp), fetch_size=limit + 1,
+                profile=READ_FAST
+            )
+        )
+        rows = list(tie_rows) + list(newer_rows)
+        more = len(rows) > limit or tie_rows.paging_state is not None or newer_rows.paging_state is not None
+        rows = await _page_after_position(
+            rows, more, limit, lambda row: (row["last_timestamp"], row["conversation_id"]), read_group
+        )
+
+        if rows:
+            sync_token = encode_position_cursor(rows[-1]["last_timestamp"], rows[-1]["conversation_id"])
+        # A conversation updated twice since the token may still have its older entry; keep the newest
+        latest = {row["conversation_id"]: row for row in rows}
+        conversations = [_inbox_row_to_conversation(row) for row in rows if latest[row["conversation_id"]] is row]
+        return conversations, sync_token, more
+
+    @staticmethod
+    async def _cached_inbox_page(
+        user_id: int,
+        limit: int
+    ) -> Optional[Tuple[List[Dict[str, Any]], int, Optional[str]]]:
+        """
+        Return the cached first inbox page if it is still current: one
+        single-row read of the inbox head instead of the page reads.
+        """
+        key = (user_id, limit)
+        entry = _inbox_cache.get(key)
+        if entry is None and _l2_cache is not None:
+            stored = await asyncio.to_thread(_l2_cache.get, "inbox", key)
+            if stored is not None:
+                entry = (stored[0], *stored[1])
+        if entry is None:
+            return None
 
+        head = await cassandra_client.execute("select_inbox_head", (user_id,), profile=READ_FAST)
+        version = _timestamp_micros(head[0]["last_timestamp"]) if head else 0
+        if version != entry[0]:
+            return None
+        _inbox_cache.put(key, entry)
+        return list(entry[1]), entry[2], entry[3]
 
-        return conversations, total
+    @staticmethod
+    async def warm_caches() -> None:
+        """Load the most recently stored L2 entries into the in-process caches (called at startup)."""
+        if _l2_cache is None:
+            return
+        limit = int(os.getenv("L2_CACHE_WARM_ENTRIES", "10000"))
+        conversations = await asyncio.to_thread(_l2_cache.recent, "conversation", limit)
+        inbox_pages = await asyncio.to_thread(_l2_cache.recent, "inbox", limit)
+        now = time.time()
+        warmed = 0
+        # Oldest first, so the newest entries end up most recently used
+        for conversation_id, _, conversation, stored_at in reversed(conversations):
+            # Summaries are not versioned on use, so each one only gets what
+            # was left of its TTL since it was read from Cassandra
+            ttl = _conversation_cache.ttl - (now - stored_at) if _conversation_cache.ttl is not None else None
+            if ttl is not None and ttl <= 0:
+                continue
+            _conversation_cache.put(conversation_id, conversation, ttl=ttl)
+            warmed += 1
+        # Inbox pages are checked against the inbox head before they are served
+        for key, version, (conversations_page, total, next_cursor), _ in reversed(inbox_pages):
+            _inbox_cache.put(key, (version, conversations_page, total, next_cursor))
+        logger.info(f"Warmed {warmed} conversations and {len(inbox_pages)} inbox pages from the L2 cache")
             
     @staticmethod
     async def create_conversation(sender_id: int, receiver_id: int):
         try:
-           # getting the conversation id by running the counters
-            conv_id_query = "SELECT counter_value FROM counters WHERE counter_name = 'conversation_id'"
-            result = await cassandra_client.execute(conv_id_query)
-            conversation_id = result[0]["counter_value"] + 1 if result else 1
-            
-            # Update the counter
-            await cassandra_client.execute(
-                "UPDATE counters SET counter_value = counter_value + 1 WHERE counter_name = 'conversation_id'"
-            )
+            conversation_id = await id_generator.next_id("conversation_id")
             
             created_at = datetime.now()
 
-            insert_query = """
-                            INSERT INTO conversations (conversation_id, sender_id, receiver_id, last_timestamp)
-                            VALUES (%s, %s, %s, %s)
-            """
-
-            await cassandra_client.execute(insert_query, (conversation_id, sender_id, receiver_id, created_at))
+            await cassandra_client.execute(
+                "insert_conversation",
+                (conversation_id, sender_id, receiver_id, created_at),
+                profile=WRITE_DURABLE
+            )
 
             return {
                 "conversation_id": conversation_id,
@@ -286,9 +1003,13 @@ class ConversationModel:
 
     
     @staticmethod
+    @single_flight(_conversation_reads, "conversation_id")
     async def get_conversation(conversation_id: int) -> Dict[str, Any]:
         """
         Get a conversation by ID.
+
+        Read through the process-local conversation cache; misses are not
+        cached, so a conversation created elsewhere is visible immediately.
         
         Args:
             conversation_id (int): ID of the conversation
@@ -296,26 +1017,28 @@ class ConversationModel:
         Returns:
             dict: Details of the conversation matching ConversationResponse schema
         """
-        query = """
-                SELECT conversation_id, sender_id, receiver_id, last_timestamp, last_message
-                FROM user_conversations 
-                WHERE conversation_id = %s
-                """
-        rows = await cassandra_client.execute(query, (conversation_id,))
+        cached = _conversation_cache.get(conversation_id)
+        if cached is not None:
+            return dict(cached)
+
+        rows = await cassandra_client.execute("select_user_conversation", (conversation_id,), profile=READ_FAST)
         
         if not rows:
             return None
         
         row = rows[0]
         
-        
-        return {
+        conversation = {
             "conversation_id": row["conversation_id"],
             "sender_id": row["sender_id"],
             "receiver_id": row["receiver_id"],
             "last_message_at": row["last_timestamp"],
             "last_message_content": row["last_message"]
         }
+        _conversation_cache.put(conversation_id, conversation)
+        version = _timestamp_micros(row["last_timestamp"]) if row["last_timestamp"] else 0
+        _persist("conversation", conversation_id, version, conversation)
+        return dict(conversation)
     
     @staticmethod
     async def create_or_get_conversation(user1_id: int, user2_id: int) -> Dict[str, Any]:
@@ -329,56 +1052,181 @@ class ConversationModel:
         Returns:
             dict: Details of the conversation matching ConversationResponse schema
         """
-        
-        # Check if the conversation already exists
-        query1 = """
-                SELECT conversation_id FROM conversations 
-                WHERE sender_id = %s AND receiver_id = %s 
-                ALLOW FILTERING
-                """
-        rows1 = await cassandra_client.execute(query1, (user1_id, user2_id))
-        
-        query2 = """
-                SELECT conversation_id FROM conversations 
-                WHERE sender_id = %s AND receiver_id = %s 
-                ALLOW FILTERING
-                """
-        rows2 = await cassandra_client.execute(query2, (user2_id, user1_id))
-        
-        
-        if rows1:
-            # If conversation exists, get its details
-            return await ConversationModel.get_conversation(rows1[0]["conversation_id"])
-        if rows2:
-            # If conversation exists, get its details
-            return await ConversationModel.get_conversation(rows2[0]["conversation_id"])
+        pair = conversation_pair(user1_id, user2_id)
+
+        # Repeat senders are answered from the process-local cache
+        cached = _conversation_pair_cache.get(pair)
+        if cached:
+            return {**cached, "sender_id": user1_id, "receiver_id": user2_id}
+
+        # Otherwise a single-partition read of conversation_by_pair
+        rows = await cassandra_client.execute("select_conversation_by_pair", pair, profile=READ_FAST)
+        if rows:
+            conversation = _pair_row_to_conversation(rows[0])
+            _conversation_pair_cache.put(pair, conversation)
+            return {**conversation, "sender_id": user1_id, "receiver_id": user2_id}
         
         # If conversation doesn't exist, create a new one
         # Get the next conversation ID
-        conv_id_query = "SELECT counter_value FROM counters WHERE counter_name = 'conversation_id'"
-        result = await cassandra_client.execute(conv_id_query)
-        conversation_id = result[0]["counter_value"] + 1 if result else 1
-        
-        # Update the counter
-        await cassandra_client.execute(
-            "UPDATE counters SET counter_value = counter_value + 1 WHERE counter_name = 'conversation_id'"
-        )
+        conversation_id = await id_generator.next_id("conversation_id")
         
         created_at = datetime.now()
         
-        # Insert into conversations table
-        insert_query = """
-        INSERT INTO conversations (conversation_id, sender_id, receiver_id, last_timestamp)
-        VALUES (%s, %s, %s, %s)
-        """
-        await cassandra_client.execute(insert_query, (conversation_id, user1_id, user2_id, created_at))
-        
+        # IF NOT EXISTS makes concurrent first messages converge on one conversation
+        result = await cassandra_client.execute(
+            "insert_conversation_by_pair",
+            (*pair, conversation_id, created_at),
+            profile=WRITE_DURABLE
+        )
+        if not result[0]["[applied]"]:
+            # Another request created it first; the LWT result carries the winning row
+            conversation = _pair_row_to_conversation(result[0])
+            _conversation_pair_cache.put(pair, conversation)
+            return {**conversation, "sender_id": user1_id, "receiver_id": user2_id}
+
+        # Insert into conversations table and count the conversation in both
+        # inboxes; only the request whose LWT applied gets here, so each
+        # conversation is counted once
+        await asyncio.gather(
+            cassandra_client.execute(
+                "insert_conversation",
+                (conversation_id, user1_id, user2_id, created_at),
+                profile=WRITE_DURABLE
+            ),
+            *(
+                cassandra_client.execute("increment_inbox_conversation_count", (user_id,), profile=WRITE_DURABLE)
+                for user_id in {user1_id, user2_id}
+            )
+        )
         
-        # Return conversation details in the format expected by ConversationResponse
-        return {
+        conversation = {
             "conversation_id": conversation_id,
-            "sender_id": user1_id,
-            "receiver_id": user2_id,
             "last_message_at": created_at,
             "last_message_content": None
         }
+        _conversation_pair_cache.put(pair, conversation)
+        
+        # Return conversation details in the format expected by ConversationResponse
+        return {**conversation, "sender_id": user1_id, "receiver_id": user2_id}
+
+
+async def _execute_write(write: Tuple[str, Any]):
+    """Execute one entry built by MessageModel._message_writes."""
+    kind, payload = write
+    if kind == "statement" and _write_coalescer is not None and payload[0] in COALESCIBLE_STATEMENTS:
+        table, key_indexes = COALESCIBLE_STATEMENTS[payload[0]]
+        partition = (table, *(payload[1][index] for index in key_indexes))
+        return await _write_coalescer.submit(partition, [payload])
+    if kind == "batch":
+        return await cassandra_client.execute_batch(payload, profile=WRITE_DURABLE)
+    return await cassandra_client.execute(*payload, profile=WRITE_DURABLE)
+
+
+def write_coalescer_stats() -> Dict[str, Any]:
+    """Flush sizes, latencies and queue depth of the write coalescer, if enabled."""
+    if _write_coalescer is None:
+        return {"enabled": False}
+    return {"enabled": True, **_write_coalescer.stats()}
+
+
+def _persist(namespace: str, key: Any, version: int, value: Any) -> None:
+    """Write an entry to the L2 cache in the background, if one is configured."""
+    if _l2_cache is None:
+        return
+
+    async def write():
+        try:
+            await asyncio.to_thread(_l2_cache.put, namespace, key, version, value)
+        except Exception as e:
+            logger.warning(f"L2 cache write failed: {str(e)}")
+
+    # Keep a reference until the write finishes so the task is not collected
+    task = asyncio.create_task(write())
+    _l2_writes.add(task)
+    task.add_done_callback(_l2_writes.discard)
+
+
+def _remove_stale_inbox_entries(user_id: int, rows: List[Row]) -> None:
+    """Delete superseded user_inbox entries in the background, in one single-partition batch."""
+
+    async def delete():
+        try:
+            await cassandra_client.execute_batch(
+                [("delete_inbox_entry", (user_id, row["last_timestamp"], row["conversation_id"])) for row in rows],
+                profile=WRITE_DURABLE
+            )
+        except Exception as e:
+            logger.warning(f"Stale inbox entry cleanup for user {user_id} failed: {str(e)}")
+
+    # Keep a reference until the batch finishes so the task is not collected
+    task = asyncio.create_task(delete())
+    _inbox_cleanups.add(task)
+    task.add_done_callback(_inbox_cleanups.discard)
+
+
+def _as_utc(timestamp: datetime) -> datetime:
+    """Normalise to a naive UTC datetime, the form the driver returns timestamps in."""
+    if timestamp.tzinfo is None:
+        return timestamp
+    return timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _stored_timestamp(timestamp: datetime) -> datetime:
+    """A timestamp as read back: Cassandra timestamps have millisecond precision."""
+    return timestamp.replace(microsecond=timestamp.microsecond // 1000 * 1000)
+
+
+def _timestamp_micros(timestamp: datetime) -> int:
+    """Microseconds since the epoch, for USING TIMESTAMP."""
+    return calendar.timegm(timestamp.utctimetuple()) * 1_000_000 + timestamp.microsecond
+
+
+def _inbox_row_to_conversation(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a user_inbox row into the ConversationResponse shape."""
+    return {
+        "id": row["conversation_id"],
+        "user1_id": row["sender_id"],
+        "user2_id": row["receiver_id"],
+        "last_message_at": row["last_timestamp"],
+        "last_message_content": row["last_message"]
+    }
+
+
+async def _page_after_position(
+    rows: List[Row],
+    more: bool,
+    limit: int,
+    position_of: Callable[[Row], Tuple[datetime, int]],
+    read_group: Callable[[datetime], Awaitable[Iterable[Row]]]
+) -> List[Row]:
+    """
+    Order rows read after a sync position oldest first and cut them into a page.
+    
+    Reads in reversed clustering order return rows sharing a timestamp with
+    the highest tie-breaker first, so a page cut inside such a group would
+    skip part of it on the next sync. When more rows are waiting, the page
+    ends before the last timestamp it reached; if that leaves nothing, the
+    whole group at that timestamp is read instead (read_group).
+    """
+    rows.sort(key=position_of)
+    if not more or not rows:
+        return rows
+    boundary = position_of(rows[limit] if len(rows) > limit else rows[-1])[0]
+    page = [row for row in rows[:limit] if position_of(row)[0] < boundary]
+    if not page:
+        page = sorted(await read_group(boundary), key=position_of)
+    return page
+
+
+def conversation_pair(user1_id: int, user2_id: int) -> Tuple[int, int]:
+    """Order-independent (min, max) key of the conversation between two users."""
+    return (user1_id, user2_id) if user1_id <= user2_id else (user2_id, user1_id)
+
+
+def _pair_row_to_conversation(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "conversation_id": row["conversation_id"],
+        # A conversation without messages yet has no last_timestamp
+        "last_message_at": row["last_timestamp"] or row["created_at"],
+        "last_message_content": row.get("last_message")
+    }
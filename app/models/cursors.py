@@ -0,0 +1,89 @@
+"""
+Opaque pagination cursors.
+
+A cursor is the driver's paging state, base64url-encoded so it can travel
+through query strings. Cursors for the bucketed message layout are prefixed
+with the bucket they resume in. Position cursors ("~<micros>.<message_id>")
+mark the last message of a page served from memory rather than by the
+driver; sync tokens use the same encoding for the last message or inbox
+entry a client has. Clients must treat all of them as opaque.
+"""
+import base64
+import binascii
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from cassandra import InvalidRequest
+from cassandra.protocol import ProtocolException
+
+POSITION_CURSOR_PREFIX = "~"
+# What Cassandra answers a well-formed cursor whose paging state it cannot
+# use with (one forged, or issued for another query)
+PAGING_STATE_ERRORS = (InvalidRequest, ProtocolException)
+_EPOCH = datetime(1970, 1, 1)
+
+
+def encode_cursor(paging_state: Optional[bytes]) -> Optional[str]:
+    """Encode a paging state as a cursor; None means there are no more pages."""
+    if not paging_state:
+        return None
+    return base64.urlsafe_b64encode(paging_state).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[bytes]:
+    """
+    Decode a cursor back into a paging state.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    if not cursor:
+        return None
+    try:
+        # validate rejects characters outside the base64url alphabet instead of skipping them
+        return base64.b64decode(cursor + "=" * (-len(cursor) % 4), altchars=b"-_", validate=True)
+    except (binascii.Error, ValueError):
+        raise ValueError(f"Invalid cursor: {cursor}") from None
+
+
+def encode_bucket_cursor(bucket: int, paging_state: Optional[bytes] = None) -> str:
+    """Encode a position in the bucketed layout: a bucket and the paging state within it."""
+    return f"{bucket}.{encode_cursor(paging_state) or ''}"
+
+
+def decode_bucket_cursor(cursor: Optional[str]) -> Tuple[Optional[int], Optional[bytes]]:
+    """
+    Decode a bucket cursor into (bucket, paging state).
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    if not cursor:
+        return None, None
+    bucket, _, paging_cursor = cursor.partition(".")
+    try:
+        return int(bucket), decode_cursor(paging_cursor)
+    except ValueError:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def encode_position_cursor(timestamp: datetime, message_id: int) -> str:
+    """Encode the clustering position (naive UTC timestamp, message_id) of a message."""
+    micros = (timestamp - _EPOCH) // timedelta(microseconds=1)
+    return f"{POSITION_CURSOR_PREFIX}{micros}.{message_id}"
+
+
+def decode_position_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    """
+    Decode a position cursor into (timestamp, message_id); None if it is another kind of cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    if not cursor or not cursor.startswith(POSITION_CURSOR_PREFIX):
+        return None
+    micros, _, message_id = cursor[len(POSITION_CURSOR_PREFIX):].partition(".")
+    try:
+        return _EPOCH + timedelta(microseconds=int(micros)), int(message_id)
+    except (ValueError, OverflowError):
+        raise ValueError(f"Invalid cursor: {cursor}")
@@ -0,0 +1,229 @@
+"""
+CQL statements used by the Messenger models.
+
+Every statement is registered with the Cassandra client by name and prepared
+once at application startup; the models execute them by name.
+"""
+
+STATEMENTS = {
+    # messages. Selects alias the columns to the MessageResponse fields, so
+    # rows are returned to the API as they come from the driver
+    "insert_message": """
+        INSERT INTO messages (message_id, conversation_id, sender_id, receiver_id, content, timestamp)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """,
+    "select_conversation_messages": """
+        SELECT message_id AS id, sender_id, receiver_id, content, timestamp AS created_at, conversation_id
+        FROM messages
+        WHERE conversation_id = ?
+        ORDER BY timestamp DESC
+    """,
+    "count_messages_before": """
+        SELECT COUNT(*) as count FROM messages
+        WHERE conversation_id = ? AND timestamp < ?
+    """,
+    "select_messages_before": """
+        SELECT message_id AS id, sender_id, receiver_id, content, timestamp AS created_at, conversation_id
+        FROM messages
+        WHERE conversation_id = ? AND timestamp < ?
+        ORDER BY timestamp DESC
+    """,
+    "select_messages_range": """
+        SELECT message_id AS id, sender_id, receiver_id, content, timestamp AS created_at, conversation_id
+        FROM messages
+        WHERE conversation_id = ? AND timestamp >= ? AND timestamp < ?
+    """,
+    # Rows sharing a timestamp cluster by message_id ASC, so these follow (timestamp, message_id)
+    "select_messages_at_timestamp_after": """
+        SELECT message_id AS id, sender_id, receiver_id, content, timestamp AS created_at, conversation_id
+        FROM messages
+        WHERE conversation_id = ? AND timestamp = ? AND message_id > ?
+    """,
+    # Reversed clustering order: oldest first, ties by message_id DESC
+    "select_messages_after": """
+        SELECT message_id AS id, sender_id, receiver_id, content, timestamp AS created_at, conversation_id
+        FROM messages
+        WHERE conversation_id = ? AND timestamp > ?
+        ORDER BY timestamp ASC, message_id DESC
+    """,
+
+    # messages_by_bucket / conversation_buckets (MESSAGE_LAYOUT=bucketed)
+    "insert_bucket_message": """
+        INSERT INTO messages_by_bucket (conversation_id, bucket, timestamp, message_id, content, sender_id, receiver_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """,
+    "select_bucket_messages": """
+        SELECT message_id AS id, sender_id, receiver_id, content, timestamp AS created_at, conversation_id
+        FROM messages_by_bucket
+        WHERE conversation_id = ? AND bucket = ?
+    """,
+    "select_bucket_messages_before": """
+        SELECT message_id AS id, sender_id, receiver_id, content, timestamp AS created_at, conversation_id
+        FROM messages_by_bucket
+        WHERE conversation_id = ? AND bucket = ? AND timestamp < ?
+    """,
+    "select_bucket_messages_range": """
+        SELECT message_id AS id, sender_id, receiver_id, content, timestamp AS created_at, conversation_id
+        FROM messages_by_bucket
+        WHERE conversation_id = ? AND bucket = ? AND timestamp >= ? AND timestamp < ?
+    """,
+    "select_bucket_messages_at_timestamp_after": """
+        SELECT message_id AS id, sender_id, receiver_id, content, timestamp AS created_at, conversation_id
+        FROM messages_by_bucket
+        WHERE conversation_id = ? AND bucket = ? AND timestamp = ? AND message_id > ?
+    """,
+    "select_bucket_messages_after": """
+        SELECT message_id AS id, sender_id, receiver_id, content, timestamp AS created_at, conversation_id
+        FROM messages_by_bucket
+        WHERE conversation_id = ? AND bucket = ? AND timestamp > ?
+        ORDER BY timestamp ASC, message_id DESC
+    """,
+    "count_bucket_messages_before": """
+        SELECT COUNT(*) as count FROM messages_by_bucket
+        WHERE conversation_id = ? AND bucket = ? AND timestamp < ?
+    """,
+    "insert_conversation_bucket": "INSERT INTO conversation_buckets (conversation_id, bucket) VALUES (?, ?)",
+    "select_conversation_buckets": "SELECT bucket FROM conversation_buckets WHERE conversation_id = ?",
+    "select_conversation_buckets_upto": """
+        SELECT bucket FROM conversation_buckets
+        WHERE conversation_id = ? AND bucket <= ?
+    """,
+    "select_conversation_buckets_from": """
+        SELECT bucket FROM conversation_buckets
+        WHERE conversation_id = ? AND bucket >= ?
+        ORDER BY bucket ASC
+    """,
+
+    # conversation_stats / conversation_time_bounds
+    "increment_conversation_message_count": """
+        UPDATE conversation_stats SET message_count = message_count + 1
+        WHERE conversation_id = ?
+    """,
+    "add_conversation_message_count": """
+        UPDATE conversation_stats SET message_count = message_count + ?
+        WHERE conversation_id = ?
+    """,
+    "select_conversation_message_count": "SELECT message_count FROM conversation_stats WHERE conversation_id = ?",
+    "update_conversation_first_timestamp": """
+        UPDATE conversation_time_bounds USING TIMESTAMP ? SET first_timestamp = ?
+        WHERE conversation_id = ?
+    """,
+    "update_conversation_last_timestamp": """
+        UPDATE conversation_time_bounds USING TIMESTAMP ? SET last_timestamp = ?
+        WHERE conversation_id = ?
+    """,
+    "select_conversation_time_bounds": """
+        SELECT first_timestamp, last_timestamp FROM conversation_time_bounds
+        WHERE conversation_id = ?
+    """,
+
+    # user_conversations
+    "select_user_conversation": """
+        SELECT conversation_id, sender_id, receiver_id, last_timestamp, last_message
+        FROM user_conversations
+        WHERE conversation_id = ?
+    """,
+    "insert_user_conversation": """
+        INSERT INTO user_conversations (conversation_id, sender_id, receiver_id, last_timestamp, last_message)
+        VALUES (?, ?, ?, ?, ?)
+    """,
+
+    # user_inbox
+    "insert_inbox_entry": """
+        INSERT INTO user_inbox (user_id, last_timestamp, conversation_id, sender_id, receiver_id, last_message)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """,
+    "delete_inbox_entry": """
+        DELETE FROM user_inbox
+        WHERE user_id = ? AND last_timestamp = ? AND conversation_id = ?
+    """,
+    "select_inbox": """
+        SELECT conversation_id, sender_id, receiver_id, last_timestamp, last_message
+        FROM user_inbox
+        WHERE user_id = ?
+    """,
+    # Entries newer than a sync position, oldest first (ties by conversation_id DESC)
+    "select_inbox_after": """
+        SELECT conversation_id, sender_id, receiver_id, last_timestamp, last_message
+        FROM user_inbox
+        WHERE user_id = ? AND last_timestamp > ?
+        ORDER BY last_timestamp ASC, conversation_id DESC
+    """,
+    "select_inbox_at_timestamp_after": """
+        SELECT conversation_id, sender_id, receiver_id, last_timestamp, last_message
+        FROM user_inbox
+        WHERE user_id = ? AND last_timestamp = ? AND conversation_id > ?
+    """,
+    # Every send writes a new newest entry, so the head's timestamp versions the whole inbox
+    "select_inbox_head": "SELECT last_timestamp FROM user_inbox WHERE user_id = ? LIMIT 1",
+
+    # user_inbox_latest / user_inbox_stats
+    "update_inbox_latest": """
+        UPDATE user_inbox_latest USING TIMESTAMP ? SET last_timestamp = ?
+        WHERE user_id = ? AND conversation_id = ?
+    """,
+    "select_inbox_latest": """
+        SELECT conversation_id, last_timestamp FROM user_inbox_latest
+        WHERE user_id = ? AND conversation_id IN ?
+    """,
+    "increment_inbox_conversation_count": """
+        UPDATE user_inbox_stats SET conversation_count = conversation_count + 1
+        WHERE user_id = ?
+    """,
+    "select_inbox_conversation_count": "SELECT conversation_count FROM user_inbox_stats WHERE user_id = ?",
+
+    # conversations
+    "insert_conversation": """
+        INSERT INTO conversations (conversation_id, sender_id, receiver_id, last_timestamp)
+        VALUES (?, ?, ?, ?)
+    """,
+
+    # conversation_by_pair
+    "select_conversation_by_pair": """
+        SELECT conversation_id, created_at, last_timestamp, last_message
+        FROM conversation_by_pair
+        WHERE user_a = ? AND user_b = ?
+    """,
+    # last_timestamp and last_message are left to update_conversation_by_pair:
+    # a conditional insert cannot take a write time of its own
+    "insert_conversation_by_pair": """
+        INSERT INTO conversation_by_pair (user_a, user_b, conversation_id, created_at)
+        VALUES (?, ?, ?, ?)
+        IF NOT EXISTS
+    """,
+    # Written with the message's timestamp as write time, so the newest message wins a race
+    "update_conversation_by_pair": """
+        UPDATE conversation_by_pair USING TIMESTAMP ? SET last_timestamp = ?, last_message = ?
+        WHERE user_a = ? AND user_b = ?
+    """,
+}
+
+# Statements the write coalescer may group into single-partition batches:
+# name -> (table, indexes of the partition key among the params). Each writes
+# a row no other write overwrites, so a shared batch timestamp is harmless.
+COALESCIBLE_STATEMENTS = {
+    "insert_message": ("messages", (1,)),
+    "insert_bucket_message": ("messages_by_bucket", (0, 1)),
+    "insert_conversation_bucket": ("conversation_buckets", (0,)),
+}
+
+# Statements that have the same effect however many times they run: reads,
+# and writes that set values the statement fully determines (the driver
+# assigns one client-side timestamp per request, kept across retries). Only
+# these are hedged or retried. Counter updates add again when repeated and
+# IF NOT EXISTS reports a repeat as not applied, so they are left out.
+IDEMPOTENT_STATEMENTS = frozenset(
+    name for name in STATEMENTS if name.startswith(("select_", "count_"))
+) | {
+    "insert_message",
+    "insert_bucket_message",
+    "insert_conversation_bucket",
+    "update_conversation_first_timestamp",
+    "update_conversation_last_timestamp",
+    "insert_user_conversation",
+    "insert_inbox_entry",
+    "delete_inbox_entry",
+    "update_inbox_latest",
+    "insert_conversation",
+    "update_conversation_by_pair",
+}
@@ -0,0 +1,2 @@
+from app.realtime.broker import broker, Broker, Subscription, conversation_channel, inbox_channel
+from app.realtime.bus import Bus, LocalBus
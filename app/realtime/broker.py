@@ -0,0 +1,141 @@
+"""
+In-process pub/sub for pushing new messages to connected clients.
+
+Channels are "conversation:<id>" (every message in a conversation) and
+"inbox:<user_id>" (inbox updates of a user). Each subscription has a
+bounded queue; a subscriber that falls REALTIME_QUEUE_SIZE events behind is
+sent a "resync" event and closed, and should catch up with a read.
+
+An event published to several channels (a message goes to its
+conversation and to both participants' inboxes) carries the same
+"event_id" on each; a subscription to more than one of them receives it
+once.
+"""
+import os
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Set
+
+from app.realtime.bus import Bus, bus_from_env
+
+logger = logging.getLogger(__name__)
+
+RESYNC_EVENT = {"type": "resync"}
+
+
+def conversation_channel(conversation_id: int) -> str:
+    return f"conversation:{conversation_id}"
+
+
+def inbox_channel(user_id: int) -> str:
+    return f"inbox:{user_id}"
+
+
+class Subscription:
+    """Events of a set of channels, consumed by one client connection."""
+
+    def __init__(self, broker: "Broker", channels: Iterable[str], queue_size: int):
+        self.broker = broker
+        self.channels = set(channels)
+        self.closed = False
+        self._queue: asyncio.Queue = asyncio.Queue(queue_size)
+        # event_ids of the latest events put, to drop the copies that arrive
+        # through the subscription's other channels
+        self._seen: "OrderedDict[Hashable, None]" = OrderedDict()
+        self._seen_size = queue_size
+
+    def put(self, event: Dict[str, Any]) -> bool:
+        """Queue an event; False if it was dropped as closed or already seen."""
+        if self.closed:
+            return False
+        event_id = event.get("event_id")
+        if event_id is not None and len(self.channels) > 1:
+            if event_id in self._seen:
+                return False
+            self._seen[event_id] = None
+            if len(self._seen) > self._seen_size:
+                self._seen.popitem(last=False)
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Too far behind: drop the backlog and tell the client to catch up by reading
+            logger.warning(f"Subscription to {sorted(self.channels)} overflowed; sending resync")
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(RESYNC_EVENT)
+            self.close()
+        return True
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Next event, or None on timeout or once a closed subscription is drained.
+        """
+        if self.closed and self._queue.empty():
+            return None
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self.broker.unsubscribe(self)
+            # Wake a consumer blocked in get()
+            try:
+                self._queue.put_nowait(None)
+            except asyncio.QueueFull:
+                pass
+
+
+class Broker:
+    """Routes published events to the subscriptions of this process, through the bus."""
+
+    def __init__(self, bus: Bus, queue_size: int = 1000):
+        self.bus = bus
+        self.queue_size = queue_size
+        self._subscriptions: Dict[str, Set[Subscription]] = {}
+        self.published = 0
+        self.delivered = 0
+
+    async def start(self) -> None:
+        await self.bus.start(self._deliver)
+
+    async def stop(self) -> None:
+        await self.bus.stop()
+
+    def subscribe(self, channels: Iterable[str]) -> Subscription:
+        subscription = Subscription(self, channels, self.queue_size)
+        for channel in subscription.channels:
+            self._subscriptions.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        for channel in subscription.channels:
+            subscribers = self._subscriptions.get(channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscriptions[channel]
+
+    async def publish(self, channel: str, event: Dict[str, Any]) -> None:
+        self.published += 1
+        await self.bus.publish(channel, event)
+
+    async def _deliver(self, channel: str, event: Dict[str, Any]) -> None:
+        for subscription in list(self._subscriptions.get(channel, ())):
+            if subscription.put(event):
+                self.delivered += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "channels": len(self._subscriptions),
+            "subscriptions": sum(len(s) for s in self._subscriptions.values()),
+            "published": self.published,
+            "delivered": self.delivered,
+        }
+
+
+# Create a global instance
+broker = Broker(bus_from_env(), int(os.getenv("REALTIME_QUEUE_SIZE", "1000")))
@@ -0,0 +1,57 @@
+"""
+Cross-worker transport for real-time events.
+
+The broker publishes every event to a Bus, and each worker's broker receives
+every event back from it and delivers it to its local subscribers. LocalBus
+only reaches the current process; set REALTIME_BUS_CLASS to the dotted path
+("package.module:ClassName") of a Bus subclass backed by a shared system
+(Redis pub/sub, NATS, ...) to fan out across workers.
+"""
+import os
+import logging
+import importlib
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+Deliver = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+
+class Bus(ABC):
+    """Interface of a cross-worker event bus."""
+
+    @abstractmethod
+    async def start(self, deliver: Deliver) -> None:
+        """Begin receiving events; call deliver(channel, event) for each one."""
+
+    @abstractmethod
+    async def publish(self, channel: str, event: Dict[str, Any]) -> None:
+        """Send an event to every worker, including this one."""
+
+    async def stop(self) -> None:
+        pass
+
+
+class LocalBus(Bus):
+    """Single-process stand-in: published events are delivered straight back."""
+
+    def __init__(self):
+        self._deliver = None
+
+    async def start(self, deliver: Deliver) -> None:
+        self._deliver = deliver
+
+    async def publish(self, channel: str, event: Dict[str, Any]) -> None:
+        if self._deliver is not None:
+            await self._deliver(channel, event)
+
+
+def bus_from_env() -> Bus:
+    path = os.getenv("REALTIME_BUS_CLASS")
+    if not path:
+        return LocalBus()
+    module_name, _, class_name = path.partition(":")
+    bus_class = getattr(importlib.import_module(module_name), class_name)
+    logger.info(f"Using real-time bus {path}")
+    return bus_class()
@@ -21,4 +21,11 @@ class PaginatedConversationResponse(BaseModel):
     total: int = Field(..., description="Total number of conversations")
     page: int = Field(..., description="Current page number")
     limit: int = Field(..., description="Number of items per page")
-    data: List[ConversationResponse] = Field(..., description="List of conversations") 
\ No newline at end of file
+    data: List[ConversationResponse] = Field(..., description="List of conversations")
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page, or null on the last page")
+    sync_token: Optional[str] = Field(None, description="Token for /sync to receive inbox changes after this page; set on first pages")
+
+class ConversationSyncResponse(BaseModel):
+    data: List[ConversationResponse] = Field(..., description="Conversations updated since the sync token, least recently updated first")
+    sync_token: Optional[str] = Field(None, description="Token to pass to the next sync")
+    has_more: bool = Field(False, description="Whether more changes are waiting; sync again without waiting") 
\ No newline at end of file
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List
 from datetime import datetime
 
@@ -10,19 +10,44 @@ class MessageCreate(MessageBase):
     receiver_id: int = Field(..., description="ID of the receiver")
 
 class MessageResponse(MessageBase):
+    # Built from the model layer's row objects as well as dicts
+    model_config = ConfigDict(from_attributes=True)
+
     id: int = Field(..., description="Unique ID of the message")
     sender_id: int = Field(..., description="ID of the sender")
     receiver_id: int = Field(..., description="ID of the receiver")
     created_at: datetime = Field(..., description="Timestamp when message was created")
     conversation_id: int = Field(..., description="ID of the conversation")
 
+class MessageBatchCreate(BaseModel):
+    messages: List[MessageCreate] = Field(..., min_length=1, max_length=1000, description="Messages to send, in order")
+
+class MessageBatchItemResult(BaseModel):
+    index: int = Field(..., description="Position of the item in the request")
+    message: Optional[MessageResponse] = Field(None, description="The created message, if it was sent")
+    error: Optional[str] = Field(None, description="Why the item failed, if it did")
+
+class MessageBatchResponse(BaseModel):
+    succeeded: int = Field(..., description="Number of messages sent")
+    failed: int = Field(..., description="Number of messages that failed")
+    results: List[MessageBatchItemResult] = Field(..., description="One result per item, in request order")
+
 class PaginatedMessageRequest(BaseModel):
     page: int = Field(1, description="Page number for pagination")
     limit: int = Field(20, description="Number of items per page")
     before_timestamp: Optional[datetime] = Field(None, description="Get messages before this timestamp")
+    cursor: Optional[str] = Field(None, description="next_cursor from the previous page")
 
 class PaginatedMessageResponse(BaseModel):
-    total: int = Field(..., description="Total number of messages")
+    total: Optional[int] = Field(..., description="Total number of messages, or null if not counted")
     page: int = Field(..., description="Current page number")
     limit: int = Field(..., description="Number of items per page")
-    data: List[MessageResponse] = Field(..., description="List of messages") 
\ No newline at end of file
+    data: List[MessageResponse] = Field(..., description="List of messages")
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page, or null on the last page")
+    has_more: bool = Field(False, description="Whether there may be more messages after this page")
+    sync_token: Optional[str] = Field(None, description="Token for /sync to receive messages newer than this page; set on first pages")
+
+class MessageSyncResponse(BaseModel):
+    data: List[MessageResponse] = Field(..., description="Messages newer than the sync token, oldest first")
+    sync_token: Optional[str] = Field(None, description="Token to pass to the next sync")
+    has_more: bool = Field(False, description="Whether more messages are waiting; sync again without waiting") 
\ No newline at end of file
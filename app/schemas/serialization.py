@@ -0,0 +1,57 @@
+"""
+Response building for the message and conversation endpoints.
+
+With RESPONSE_SERIALIZATION=pydantic (the default) responses are built as
+their schema models from the model layer's rows, and FastAPI validates them
+again against the route's response_model before encoding. With
+RESPONSE_SERIALIZATION=fast the rows, which the models already return in the
+schemas' shape, are trusted: responses stay plain dicts and are written
+straight to JSON with orjson, skipping both validation passes.
+"""
+import os
+import functools
+from typing import Any, Dict
+
+import orjson
+from fastapi.responses import Response
+
+RESPONSE_SERIALIZATION = os.getenv("RESPONSE_SERIALIZATION", "pydantic")
+
+if RESPONSE_SERIALIZATION not in ("pydantic", "fast"):
+    raise ValueError(f"Unknown RESPONSE_SERIALIZATION: {RESPONSE_SERIALIZATION}")
+
+
+class FastJSONResponse(Response):
+    """JSON response encoded with orjson; datetimes as ISO 8601, like Pydantic."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def fast_serialization() -> bool:
+    return RESPONSE_SERIALIZATION == "fast"
+
+
+def build_response(schema, **fields):
+    """
+    A response (or part of one) from trusted fields: an instance of `schema`,
+    or in fast mode the fields themselves, unvalidated.
+    """
+    if fast_serialization():
+        return {**_defaults(schema), **fields}
+    return schema(**fields)
+
+
+@functools.lru_cache(maxsize=None)
+def _defaults(schema) -> Dict[str, Any]:
+    """Values of the schema's optional fields, so fast responses carry the same keys."""
+    return {name: field.default for name, field in schema.model_fields.items() if not field.is_required()}
+
+
+def render_response(content):
+    """What a route returns: the content for FastAPI to validate and encode, or in fast mode its JSON."""
+    if fast_serialization():
+        return FastJSONResponse(content)
+    return content
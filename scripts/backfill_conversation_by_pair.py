@@ -0,0 +1,83 @@
+"""
+Backfill the conversation_by_pair table from user_conversations.
+
+Rows are written with INSERT ... IF NOT EXISTS, so re-running is safe and,
+if the old non-atomic create path left several conversations for the same
+pair, the first one seen wins. The last message is then set with the
+message's timestamp as write time, as the API does, so a newer send is
+never overwritten.
+"""
+import os
+import logging
+from datetime import datetime, timedelta
+from cassandra.cluster import Cluster
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Cassandra connection settings
+CASSANDRA_HOST = os.getenv("CASSANDRA_HOST", "localhost")
+CASSANDRA_PORT = int(os.getenv("CASSANDRA_PORT", "9042"))
+CASSANDRA_KEYSPACE = os.getenv("CASSANDRA_KEYSPACE", "messenger")
+
+PAGE_SIZE = 500
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def backfill_conversation_by_pair(session):
+    """Create a conversation_by_pair row for every conversation in user_conversations."""
+    insert = session.prepare("""
+        INSERT INTO conversation_by_pair (user_a, user_b, conversation_id, created_at)
+        VALUES (?, ?, ?, ?)
+        IF NOT EXISTS
+    """)
+    update_last_message = session.prepare("""
+        UPDATE conversation_by_pair USING TIMESTAMP ? SET last_timestamp = ?, last_message = ?
+        WHERE user_a = ? AND user_b = ?
+    """)
+    select = session.prepare("""
+        SELECT conversation_id, sender_id, receiver_id, last_timestamp, last_message
+        FROM user_conversations
+    """)
+    select.fetch_size = PAGE_SIZE
+
+    created = 0
+    duplicates = 0
+    for row in session.execute(select):
+        user_a, user_b = sorted((row.sender_id, row.receiver_id))
+        result = session.execute(insert, (user_a, user_b, row.conversation_id, row.last_timestamp))
+        # A re-run finds the row it linked before; its last message is still set
+        if result.was_applied or result.one().conversation_id == row.conversation_id:
+            if row.last_timestamp is not None:
+                micros = (row.last_timestamp - _EPOCH) // timedelta(microseconds=1)
+                session.execute(update_last_message, (
+                    micros, row.last_timestamp, row.last_message, user_a, user_b
+                ))
+            if result.was_applied:
+                created += 1
+        else:
+            duplicates += 1
+            logger.warning(
+                f"Users {user_a} and {user_b} already have a conversation; "
+                f"conversation {row.conversation_id} was not linked"
+            )
+
+    logger.info(f"Backfilled {created} conversation pairs ({duplicates} duplicates skipped)")
+
+
+def main():
+    """Run the backfill."""
+    cluster = Cluster([CASSANDRA_HOST], port=CASSANDRA_PORT)
+    try:
+        session = cluster.connect(CASSANDRA_KEYSPACE)
+        backfill_conversation_by_pair(session)
+    except Exception as e:
+        logger.error(f"Error during backfill: {str(e)}")
+        raise
+    finally:
+        cluster.shutdown()
+
+
+if __name__ == "__main__":
+    main()
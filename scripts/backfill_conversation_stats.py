@@ -0,0 +1,92 @@
+"""
+Backfill conversation_stats and conversation_time_bounds from stored messages.
+
+Counts each conversation's messages (from messages, or messages_by_bucket
+with MESSAGE_LAYOUT=bucketed) and adjusts the counter by the difference to
+the current value, so the script can be re-run. Run it while send traffic
+is low: messages sent during the scan may be counted twice or missed.
+"""
+import os
+import sys
+import calendar
+import logging
+from collections import defaultdict
+from cassandra.cluster import Cluster
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.buckets import bucketed_layout
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Cassandra connection settings
+CASSANDRA_HOST = os.getenv("CASSANDRA_HOST", "localhost")
+CASSANDRA_PORT = int(os.getenv("CASSANDRA_PORT", "9042"))
+CASSANDRA_KEYSPACE = os.getenv("CASSANDRA_KEYSPACE", "messenger")
+
+PAGE_SIZE = 1000
+# Must match FIRST_TIMESTAMP_WRITETIME_BASE in app/models/cassandra_models.py
+FIRST_TIMESTAMP_WRITETIME_BASE = 2 ** 62
+
+
+def _micros(timestamp):
+    return calendar.timegm(timestamp.utctimetuple()) * 1_000_000 + timestamp.microsecond
+
+
+def backfill_conversation_stats(session):
+    """Recompute message counts and time bounds for every conversation."""
+    table = "messages_by_bucket" if bucketed_layout() else "messages"
+    select = session.prepare(f"SELECT conversation_id, timestamp FROM {table}")
+    select.fetch_size = PAGE_SIZE
+
+    counts = defaultdict(int)
+    first = {}
+    last = {}
+    for row in session.execute(select):
+        conversation_id = row.conversation_id
+        counts[conversation_id] += 1
+        if conversation_id not in first or row.timestamp < first[conversation_id]:
+            first[conversation_id] = row.timestamp
+        if conversation_id not in last or row.timestamp > last[conversation_id]:
+            last[conversation_id] = row.timestamp
+
+    select_count = session.prepare("SELECT message_count FROM conversation_stats WHERE conversation_id = ?")
+    add_count = session.prepare(
+        "UPDATE conversation_stats SET message_count = message_count + ? WHERE conversation_id = ?"
+    )
+    set_first = session.prepare(
+        "UPDATE conversation_time_bounds USING TIMESTAMP ? SET first_timestamp = ? WHERE conversation_id = ?"
+    )
+    set_last = session.prepare(
+        "UPDATE conversation_time_bounds USING TIMESTAMP ? SET last_timestamp = ? WHERE conversation_id = ?"
+    )
+
+    for conversation_id, count in counts.items():
+        current = session.execute(select_count, (conversation_id,)).one()
+        delta = count - (current.message_count if current else 0)
+        if delta:
+            session.execute(add_count, (delta, conversation_id))
+        session.execute(set_first, (
+            FIRST_TIMESTAMP_WRITETIME_BASE - _micros(first[conversation_id]), first[conversation_id], conversation_id
+        ))
+        session.execute(set_last, (_micros(last[conversation_id]), last[conversation_id], conversation_id))
+
+    logger.info(f"Backfilled stats for {len(counts)} conversations from {table}")
+
+
+def main():
+    """Run the backfill."""
+    cluster = Cluster([CASSANDRA_HOST], port=CASSANDRA_PORT)
+    try:
+        session = cluster.connect(CASSANDRA_KEYSPACE)
+        backfill_conversation_stats(session)
+    except Exception as e:
+        logger.error(f"Error during backfill: {str(e)}")
+        raise
+    finally:
+        cluster.shutdown()
+
+
+if __name__ == "__main__":
+    main()
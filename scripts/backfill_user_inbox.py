@@ -0,0 +1,114 @@
+"""
+Backfill the user_inbox table from user_conversations.
+
+Writes one inbox entry and latest-entry marker per participant for every
+existing conversation, then brings each user's user_inbox_stats count up to
+the number of conversations found. Safe to re-run: entries are keyed by
+(user_id, last_timestamp, conversation_id), markers are written with the
+message's own timestamp, and counts are only incremented by what is missing.
+"""
+import os
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from cassandra.cluster import Cluster
+from cassandra.concurrent import execute_concurrent_with_args
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Cassandra connection settings
+CASSANDRA_HOST = os.getenv("CASSANDRA_HOST", "localhost")
+CASSANDRA_PORT = int(os.getenv("CASSANDRA_PORT", "9042"))
+CASSANDRA_KEYSPACE = os.getenv("CASSANDRA_KEYSPACE", "messenger")
+
+PAGE_SIZE = 500
+CONCURRENCY = 50
+
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def backfill_user_inbox(session):
+    """Copy every user_conversations row into both participants' inbox partitions."""
+    insert = session.prepare("""
+        INSERT INTO user_inbox (user_id, last_timestamp, conversation_id, sender_id, receiver_id, last_message)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """)
+    update_latest = session.prepare("""
+        UPDATE user_inbox_latest USING TIMESTAMP ? SET last_timestamp = ?
+        WHERE user_id = ? AND conversation_id = ?
+    """)
+    select = session.prepare("""
+        SELECT conversation_id, sender_id, receiver_id, last_timestamp, last_message
+        FROM user_conversations
+    """)
+    select.fetch_size = PAGE_SIZE
+
+    conversations = 0
+    counts = Counter()
+    batch = []
+    latest_batch = []
+    # The driver pages through the table PAGE_SIZE rows at a time
+    for row in session.execute(select):
+        if row.last_timestamp is None:
+            continue
+        # The write time the API uses for the marker: the message's timestamp in microseconds
+        micros = (row.last_timestamp - _EPOCH) // timedelta(microseconds=1)
+        for user_id in {row.sender_id, row.receiver_id}:
+            batch.append((user_id, row.last_timestamp, row.conversation_id,
+                          row.sender_id, row.receiver_id, row.last_message))
+            latest_batch.append((micros, row.last_timestamp, user_id, row.conversation_id))
+            counts[user_id] += 1
+        conversations += 1
+        if len(batch) >= PAGE_SIZE:
+            execute_concurrent_with_args(session, insert, batch, concurrency=CONCURRENCY)
+            execute_concurrent_with_args(session, update_latest, latest_batch, concurrency=CONCURRENCY)
+            batch = []
+            latest_batch = []
+    if batch:
+        execute_concurrent_with_args(session, insert, batch, concurrency=CONCURRENCY)
+        execute_concurrent_with_args(session, update_latest, latest_batch, concurrency=CONCURRENCY)
+
+    backfill_inbox_counts(session, counts)
+    logger.info(f"Backfilled inbox entries for {conversations} conversations")
+
+
+def backfill_inbox_counts(session, counts):
+    """Increment each user's conversation count up to the number of conversations found."""
+    select = session.prepare("SELECT conversation_count FROM user_inbox_stats WHERE user_id = ?")
+    increment = session.prepare("""
+        UPDATE user_inbox_stats SET conversation_count = conversation_count + ?
+        WHERE user_id = ?
+    """)
+    users = list(counts)
+    for start in range(0, len(users), PAGE_SIZE):
+        chunk = users[start:start + PAGE_SIZE]
+        results = execute_concurrent_with_args(session, select, [(user_id,) for user_id in chunk],
+                                               concurrency=CONCURRENCY)
+        increments = []
+        for user_id, (success, rows) in zip(chunk, results):
+            if not success:
+                raise rows
+            current = rows.one()
+            missing = counts[user_id] - (current.conversation_count if current else 0)
+            if missing > 0:
+                increments.append((missing, user_id))
+        execute_concurrent_with_args(session, increment, increments, concurrency=CONCURRENCY)
+
+
+def main():
+    """Run the backfill."""
+    cluster = Cluster([CASSANDRA_HOST], port=CASSANDRA_PORT)
+    try:
+        session = cluster.connect(CASSANDRA_KEYSPACE)
+        backfill_user_inbox(session)
+    except Exception as e:
+        logger.error(f"Error during backfill: {str(e)}")
+        raise
+    finally:
+        cluster.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark for CassandraClient.execute.
+
+Compares the old blocking execute (session.execute called on the event loop)
+with the asyncio-bridged execute, by running the same number of concurrent
+queries per worker at increasing concurrency levels.
+
+Runs offline against the in-memory backend with CASSANDRA_BACKEND=memory
+(add CASSANDRA_MEMORY_LATENCY_MS="*=1" to simulate a network round-trip).
+
+Usage:
+    python scripts/bench_execute.py [--requests 2000] [--concurrency 1 8 32 128]
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.cassandra_client import cassandra_client
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+QUERY = "SELECT counter_value FROM counters WHERE counter_name = 'message_id'"
+
+
+async def blocking_execute(query, params=None):
+    """The previous execute implementation: blocks the loop until the query returns."""
+    return cassandra_client.get_session().execute(query, params or ())
+
+
+async def run_workload(execute, total_requests: int, concurrency: int) -> float:
+    """Run total_requests queries with at most `concurrency` in flight; return requests/second."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one_request():
+        async with semaphore:
+            await execute(QUERY)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_request() for _ in range(total_requests)))
+    return total_requests / (time.perf_counter() - start)
+
+
+async def main(total_requests: int, concurrency_levels):
+    # Warm up the connection pool
+    await run_workload(cassandra_client.execute, 50, 10)
+
+    print(f"{'concurrency':>12} {'blocking req/s':>16} {'async req/s':>14} {'speedup':>9}")
+    for concurrency in concurrency_levels:
+        blocking = await run_workload(blocking_execute, total_requests, concurrency)
+        bridged = await run_workload(cassandra_client.execute, total_requests, concurrency)
+        print(f"{concurrency:>12} {blocking:>16.0f} {bridged:>14.0f} {bridged / blocking:>8.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128])
+    args = parser.parse_args()
+    try:
+        asyncio.run(main(args.requests, args.concurrency))
+    finally:
+        cassandra_client.close()
@@ -0,0 +1,90 @@
+"""
+Memory and allocation benchmark for result rows.
+
+Builds a result set of message rows the way the driver hands them to the
+row factory, and measures allocated bytes (tracemalloc) and time for:
+
+- dict: dict_factory rows, then each copied into a MessageResponse-shaped
+  dict (the previous model layer)
+- row: app.db.rows.row_factory rows, used by the model layer as they are
+
+Needs no database.
+
+Usage:
+    python scripts/bench_rows.py [--rows 10000] [--repeat 20]
+"""
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cassandra.query import dict_factory
+from app.db.rows import row_factory
+
+COLUMNS = ["id", "sender_id", "receiver_id", "content", "created_at", "conversation_id"]
+DRIVER_COLUMNS = ["message_id", "sender_id", "receiver_id", "content", "timestamp"]
+
+
+def driver_rows(count: int, with_conversation_id: bool):
+    """Decoded column values, as the driver passes them to the row factory."""
+    start = datetime(2024, 1, 1)
+    return [
+        (1000 + index, 1 + index % 2, 2 - index % 2, f"benchmark message number {index}",
+         start - timedelta(milliseconds=index)) + ((42,) if with_conversation_id else ())
+        for index in range(count)
+    ]
+
+
+def dict_path(raw):
+    rows = dict_factory(DRIVER_COLUMNS, raw)
+    return [
+        {
+            "id": row["message_id"],
+            "sender_id": row["sender_id"],
+            "receiver_id": row["receiver_id"],
+            "content": row["content"],
+            "created_at": row["timestamp"],
+            "conversation_id": 42
+        }
+        for row in rows
+    ]
+
+
+def row_path(raw):
+    return row_factory(COLUMNS, raw)
+
+
+def measure(build, raw, repeat: int):
+    """(retained bytes, peak bytes, seconds per result set) of building one result set."""
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    result = build(raw)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        build(raw)
+    return retained - base, peak - base, (time.perf_counter() - start) / repeat
+
+
+def main(count: int, repeat: int):
+    print(f"{count} rows per result set")
+    print(f"{'path':>5} {'retained KiB':>13} {'peak KiB':>9} {'bytes/row':>10} {'ms/result':>10}")
+    for name, build, with_conversation_id in (("dict", dict_path, False), ("row", row_path, True)):
+        raw = driver_rows(count, with_conversation_id)
+        retained, peak, seconds = measure(build, raw, repeat)
+        print(f"{name:>5} {retained / 1024:>13.0f} {peak / 1024:>9.0f} {retained / count:>10.0f} {seconds * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    main(args.rows, args.repeat)
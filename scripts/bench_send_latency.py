@@ -0,0 +1,95 @@
+"""
+Benchmark for the message write path.
+
+Compares send latency of the previous write path (a read of
+user_conversations, then each write awaited one after another) with the
+current one (no reads, all writes sent concurrently), and prints p50/p99.
+
+Usage:
+    python scripts/bench_send_latency.py [--messages 1000] [--concurrency 1]
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import logging
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.cassandra_client import cassandra_client
+from app.db.id_allocator import id_generator
+from app.models.cassandra_models import ConversationModel, MessageModel, _execute_write
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+SENDER_ID = 900001
+RECEIVER_ID = 900002
+
+
+async def send_sequential(conversation_id: int, previous_timestamp: datetime) -> datetime:
+    """The previous write path: read-before-write, then one round-trip per statement."""
+    message_id = await id_generator.next_id("message_id")
+    created_at = datetime.now()
+    await cassandra_client.execute("select_user_conversation", (conversation_id,))
+    for write in MessageModel._message_writes(
+        message_id, conversation_id, SENDER_ID, RECEIVER_ID, "benchmark", created_at, previous_timestamp
+    ):
+        await _execute_write(write)
+    return created_at
+
+
+async def send_fanout(conversation_id: int, previous_timestamp: datetime) -> datetime:
+    message = await MessageModel.create_message(
+        conversation_id, SENDER_ID, RECEIVER_ID, "benchmark", previous_timestamp
+    )
+    return message["timestamp"]
+
+
+def percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def measure(send, conversation_id: int, messages: int, concurrency: int):
+    """Send `messages` messages with `concurrency` senders; return per-send latencies in ms."""
+    latencies = []
+    previous = {"timestamp": None}
+    remaining = iter(range(messages))
+
+    async def sender():
+        for _ in remaining:
+            start = time.perf_counter()
+            previous["timestamp"] = await send(conversation_id, previous["timestamp"])
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(sender() for _ in range(concurrency)))
+    return latencies
+
+
+async def main(messages: int, concurrency: int):
+    await cassandra_client.prepare_all()
+    conversation = await ConversationModel.create_or_get_conversation(SENDER_ID, RECEIVER_ID)
+    conversation_id = conversation["conversation_id"]
+
+    # Warm up connections and the ID allocator
+    await measure(send_fanout, conversation_id, 50, concurrency)
+
+    print(f"{'write path':>12} {'p50 ms':>8} {'p99 ms':>8} {'mean ms':>8}")
+    for name, send in (("sequential", send_sequential), ("fan-out", send_fanout)):
+        latencies = await measure(send, conversation_id, messages, concurrency)
+        mean = sum(latencies) / len(latencies)
+        print(f"{name:>12} {percentile(latencies, 0.5):>8.2f} {percentile(latencies, 0.99):>8.2f} {mean:>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=1)
+    args = parser.parse_args()
+    try:
+        asyncio.run(main(args.messages, args.concurrency))
+    finally:
+        cassandra_client.close()
@@ -0,0 +1,104 @@
+"""
+Microbenchmark for message page serialization.
+
+Times both response paths for a PaginatedMessageResponse of model-layer
+rows: "pydantic" builds the schema models and runs FastAPI's response_model
+serialization (of a route declared like the messages route), as with
+RESPONSE_SERIALIZATION=pydantic;
+"fast" writes the rows straight to JSON, as with RESPONSE_SERIALIZATION=fast.
+Prints the cost per page and per row at each page size. Needs no database.
+
+Usage:
+    python scripts/bench_serialization.py [--sizes 20,100,250,500,1000] [--seconds 1]
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import inspect
+import logging
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import APIRouter
+from fastapi.routing import serialize_response
+from app.schemas.message import PaginatedMessageResponse
+from app.schemas.serialization import FastJSONResponse, _defaults
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+
+
+def make_rows(count: int):
+    """Rows in the shape MessageModel returns them."""
+    start = datetime(2024, 1, 1)
+    return [
+        {
+            "id": 1000 + index,
+            "sender_id": 1 + index % 2,
+            "receiver_id": 2 - index % 2,
+            "content": f"benchmark message number {index} with some typical chat text",
+            "created_at": start - timedelta(milliseconds=index),
+            "conversation_id": 42
+        }
+        for index in range(count)
+    ]
+
+
+def page_fields(rows):
+    return dict(total=10 * len(rows), page=1, limit=len(rows), data=rows,
+                next_cursor="eyJjIjogMX0", has_more=True, sync_token="~1704067200000000.1000")
+
+
+async def pydantic_path(field, dump_json, rows) -> bytes:
+    content = await serialize_response(
+        field=field, response_content=PaginatedMessageResponse(**page_fields(rows)), **dump_json
+    )
+    # Older FastAPI versions return jsonable content for JSONResponse to encode
+    return content if isinstance(content, bytes) else FastJSONResponse(content).body
+
+
+async def fast_path(rows) -> bytes:
+    return FastJSONResponse({**_defaults(PaginatedMessageResponse), **page_fields(rows)}).body
+
+
+async def measure(run, seconds: float) -> float:
+    """Mean seconds per call over at least `seconds` of calls."""
+    await run()
+    calls, start = 0, time.perf_counter()
+    while True:
+        await run()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            return elapsed / calls
+
+
+async def main(sizes, seconds: float):
+    router = APIRouter()
+
+    @router.get("/conversation/{conversation_id}", response_model=PaginatedMessageResponse)
+    async def get_conversation_messages(conversation_id: int) -> PaginatedMessageResponse:
+        pass
+
+    field = router.routes[0].response_field
+    dump_json = {"dump_json": True} if "dump_json" in inspect.signature(serialize_response).parameters else {}
+
+    print(f"{'rows':>6} {'pydantic ms':>12} {'fast ms':>9} {'pydantic us/row':>16} {'fast us/row':>12} {'speedup':>8}")
+    for size in sizes:
+        rows = make_rows(size)
+        slow = await measure(lambda: pydantic_path(field, dump_json, rows), seconds)
+        fast = await measure(lambda: fast_path(rows), seconds)
+        print(f"{size:>6} {slow * 1000:>12.3f} {fast * 1000:>9.3f} "
+              f"{slow / size * 1e6:>16.2f} {fast / size * 1e6:>12.2f} {slow / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="20,100,250,500,1000")
+    parser.add_argument("--seconds", type=float, default=1.0)
+    args = parser.parse_args()
+    asyncio.run(main([int(size) for size in args.sizes.split(",")], args.seconds))
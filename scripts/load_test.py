@@ -0,0 +1,97 @@
+"""
+In-process load test for the Messenger API.
+
+Drives the FastAPI app through httpx's ASGI transport (no server, no
+network) with a mix of sends, inbox reads and message-page reads, and
+prints request rate and p50/p99 latency per operation. Set
+CASSANDRA_BACKEND=memory to run it fully offline, optionally with
+CASSANDRA_MEMORY_LATENCY_MS (e.g. "*=0.5,SELECT messages=2") to model
+per-statement latency.
+
+Usage:
+    CASSANDRA_BACKEND=memory python scripts/load_test.py [--requests 5000] [--concurrency 64] [--users 100]
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import logging
+from collections import defaultdict
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.main import app
+from app.db.cassandra_client import cassandra_client
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+# Share of requests per operation
+MIX = [("send", 0.5), ("inbox", 0.25), ("messages", 0.25)]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def main(total_requests: int, concurrency: int, users: int, seed: int):
+    # app.main configures INFO logging; per-request log lines would dominate the timings
+    logging.getLogger().setLevel(logging.WARNING)
+    await cassandra_client.prepare_all()
+    rng = random.Random(seed)
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    conversation_ids = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load-test") as client:
+
+        async def one_request():
+            async with semaphore:
+                operation = rng.choices([op for op, _ in MIX], weights=[w for _, w in MIX])[0]
+                if operation == "messages" and not conversation_ids:
+                    operation = "send"
+                sender, receiver = rng.sample(range(1, users + 1), 2)
+                start = time.perf_counter()
+                if operation == "send":
+                    response = await client.post("/api/messages/", json={
+                        "sender_id": sender, "receiver_id": receiver, "content": "load test message",
+                    })
+                elif operation == "inbox":
+                    response = await client.get(f"/api/conversations/user/{sender}", params={"limit": 20})
+                else:
+                    conversation_id = rng.choice(conversation_ids)
+                    response = await client.get(f"/api/messages/conversation/{conversation_id}", params={"limit": 20})
+                latencies[operation].append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors[operation] += 1
+            elif operation == "send":
+                conversation_ids.append(response.json()["conversation_id"])
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one_request() for _ in range(total_requests)))
+        elapsed = time.perf_counter() - start
+
+    print(f"{total_requests} requests in {elapsed:.2f}s ({total_requests / elapsed:.0f} req/s), concurrency {concurrency}")
+    print(f"{'operation':>10} {'count':>7} {'errors':>7} {'p50 ms':>8} {'p99 ms':>8}")
+    for operation, _ in MIX:
+        samples = latencies[operation]
+        if samples:
+            print(f"{operation:>10} {len(samples):>7} {errors[operation]:>7} "
+                  f"{percentile(samples, 50) * 1000:>8.2f} {percentile(samples, 99) * 1000:>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.users, args.seed))
@@ -0,0 +1,87 @@
+"""
+Re-bucket existing messages into the bucketed layout.
+
+Copies every row of the flat messages table into messages_by_bucket and
+records its bucket in conversation_buckets, using the configured
+MESSAGE_BUCKET_SECONDS. Rewrites are idempotent, so the script can be
+re-run after an interruption.
+
+Switch the API to MESSAGE_LAYOUT=bucketed first, then run this script:
+new messages then go to the bucketed tables while history is copied over.
+"""
+import os
+import sys
+import logging
+from cassandra.cluster import Cluster
+from cassandra.concurrent import execute_concurrent_with_args
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.buckets import MESSAGE_BUCKET_SECONDS, message_bucket
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Cassandra connection settings
+CASSANDRA_HOST = os.getenv("CASSANDRA_HOST", "localhost")
+CASSANDRA_PORT = int(os.getenv("CASSANDRA_PORT", "9042"))
+CASSANDRA_KEYSPACE = os.getenv("CASSANDRA_KEYSPACE", "messenger")
+
+PAGE_SIZE = 1000
+CONCURRENCY = 50
+
+
+def migrate_messages(session):
+    """Copy the messages table into messages_by_bucket / conversation_buckets."""
+    insert_message = session.prepare("""
+        INSERT INTO messages_by_bucket (conversation_id, bucket, timestamp, message_id, content, sender_id, receiver_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """)
+    insert_bucket = session.prepare(
+        "INSERT INTO conversation_buckets (conversation_id, bucket) VALUES (?, ?)"
+    )
+    select = session.prepare("""
+        SELECT conversation_id, timestamp, message_id, content, sender_id, receiver_id
+        FROM messages
+    """)
+    select.fetch_size = PAGE_SIZE
+
+    seen_buckets = set()
+    messages = []
+    copied = 0
+    for row in session.execute(select):
+        bucket = message_bucket(row.timestamp)
+        messages.append((row.conversation_id, bucket, row.timestamp, row.message_id,
+                         row.content, row.sender_id, row.receiver_id))
+        seen_buckets.add((row.conversation_id, bucket))
+        if len(messages) >= PAGE_SIZE:
+            execute_concurrent_with_args(session, insert_message, messages, concurrency=CONCURRENCY)
+            copied += len(messages)
+            messages = []
+            logger.info(f"Copied {copied} messages")
+    if messages:
+        execute_concurrent_with_args(session, insert_message, messages, concurrency=CONCURRENCY)
+        copied += len(messages)
+
+    execute_concurrent_with_args(session, insert_bucket, list(seen_buckets), concurrency=CONCURRENCY)
+    logger.info(
+        f"Migrated {copied} messages into {len(seen_buckets)} buckets "
+        f"({MESSAGE_BUCKET_SECONDS}s wide)"
+    )
+
+
+def main():
+    """Run the migration."""
+    cluster = Cluster([CASSANDRA_HOST], port=CASSANDRA_PORT)
+    try:
+        session = cluster.connect(CASSANDRA_KEYSPACE)
+        migrate_messages(session)
+    except Exception as e:
+        logger.error(f"Error during migration: {str(e)}")
+        raise
+    finally:
+        cluster.shutdown()
+
+
+if __name__ == "__main__":
+    main()
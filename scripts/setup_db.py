@@ -2,11 +2,16 @@
 Script to initialize Cassandra keyspace and tables for the Messenger application.
 """
 import os
+import sys
 import time
 import logging
 from cassandra.cluster import Cluster
 from cassandra.auth import PlainTextAuthProvider
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.schema import RESET_TABLES, TABLES
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -53,7 +58,7 @@ def create_tables(session):
     """
     Create the tables for the application.
     
-    This function creates the necessary tables to implement:
+    Table definitions live in app/db/schema.py. They support:
     - Sending messages between users
     - Fetching user conversations ordered by recent activity
     - Fetching all messages in a conversation
@@ -61,63 +66,12 @@ def create_tables(session):
     """
     logger.info("Creating tables...")
     
-    # Messages table - stores all messages with conversation_id as partition key
-    # This allows efficient retrieval of all messages in a conversation
-    # Clustering by timestamp DESC allows fetching recent messages first and pagination
-    session.execute("""DROP TABLE IF EXISTS messenger.user_conversations;""")
-    session.execute("""
-    CREATE TABLE IF NOT EXISTS user_conversations (
-        sender_id INT,
-        receiver_id INT,
-        conversation_id INT,
-        last_timestamp TIMESTAMP,
-        last_message TEXT,
-        PRIMARY KEY (conversation_id)
-    );
-    """)
-    logger.info("Created user_conversations table")
-    
-    # Conversation participants table - tracks who is in each conversation
-    # This allows checking if a user is part of a conversation
-    session.execute("""DROP TABLE IF EXISTS messenger.messages;""")
-    session.execute("""
-    CREATE TABLE IF NOT EXISTS messages (
-        conversation_id INT,
-        timestamp TIMESTAMP,
-        message_id INT,
-        content TEXT,
-        sender_id INT,
-        receiver_id INT,
-        PRIMARY KEY (conversation_id, timestamp, message_id)
-    ) WITH CLUSTERING ORDER BY (timestamp DESC, message_id ASC);
-    """)
-    logger.info("Created messages table")
-    
-    # User conversations table - allows quick lookup of a user's conversations
-    # Ordered by last_message_at DESC to get most recent conversations first
-    session.execute("""DROP TABLE IF EXISTS messenger.conversations;""")
-    session.execute("""
-    CREATE TABLE IF NOT EXISTS conversations (
-        conversation_id INT,
-        sender_id INT,
-        receiver_id INT,
-        last_timestamp TIMESTAMP,
-        PRIMARY KEY (conversation_id, sender_id));
-    """)
-    logger.info("Created conversations table")
+    for table in RESET_TABLES:
+        session.execute(f"DROP TABLE IF EXISTS {CASSANDRA_KEYSPACE}.{table};")
     
-   
-    # Counter table for generating sequential IDs
-    # This helps with creating sequential IDs for messages and conversations
-    session.execute("""DROP TABLE IF EXISTS messenger.counters;""")
-    session.execute("""
-    CREATE TABLE IF NOT EXISTS counters (
-        counter_name TEXT,
-        counter_value COUNTER,
-        PRIMARY KEY (counter_name)
-    );
-    """)
-    logger.info("Created counters table")
+    for table, ddl in TABLES:
+        session.execute(ddl)
+        logger.info(f"Created {table} table")
     
     logger.info("Tables created successfully.")
 
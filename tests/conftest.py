@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Tests run against the in-process backend; the client connects on import
+os.environ.setdefault("CASSANDRA_BACKEND", "memory")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,94 @@
+import asyncio
+
+from cassandra import InvalidRequest
+
+from app.db.cassandra_client import cassandra_client
+from app.db.memory_backend import MemoryResultSet
+from app.db.profiles import HedgingPolicy
+# Registers the statements the models execute
+import app.models.cassandra_models  # noqa: F401
+
+
+def run_with_send_errors(errors):
+    """Execute a registered statement whose sends fail with `errors` in turn; return (outcome, prepares)."""
+    prepares = []
+    original_get_prepared = cassandra_client._get_prepared
+    original_send = cassandra_client._send_prepared
+
+    async def get_prepared(key, refresh=False):
+        prepares.append(refresh)
+        return await original_get_prepared(key, refresh)
+
+    async def send_prepared(*args, **kwargs):
+        if errors:
+            raise errors.pop(0)
+        return await original_send(*args, **kwargs)
+
+    cassandra_client._get_prepared = get_prepared
+    cassandra_client._send_prepared = send_prepared
+    try:
+        outcome = asyncio.run(cassandra_client.execute("select_inbox_head", (1,)))
+    except InvalidRequest as e:
+        outcome = e
+    finally:
+        del cassandra_client._get_prepared
+        del cassandra_client._send_prepared
+    return outcome, prepares
+
+
+def test_invalid_request_is_not_retried():
+    error = InvalidRequest("Invalid value for the paging state")
+    outcome, prepares = run_with_send_errors([error])
+    assert outcome is error
+    assert prepares == [False]
+
+
+def test_schema_change_re_prepares_once():
+    outcome, prepares = run_with_send_errors([InvalidRequest("Undefined column name last_message")])
+    assert list(outcome) == []
+    assert prepares == [False, True]
+
+
+class SentFuture:
+    """A response future already answered by `coordinator` after trying `attempted`."""
+
+    def __init__(self, attempted, coordinator):
+        self.attempted_hosts = attempted
+        self.coordinator_host = coordinator
+        self.has_more_pages = False
+
+    def add_callbacks(self, callback, errback):
+        callback([])
+
+    def result(self):
+        return MemoryResultSet([], None)
+
+
+def record_hedges(key, hosts_at_each_call, attempted, coordinator):
+    """Run a plan asked for a delay with each of `hosts_at_each_call`, as the driver does, and record it."""
+    statement = type("Statement", (), {})()
+    plan = HedgingPolicy(0.05, 2).new_plan(None, statement)
+    for host in hosts_at_each_call:
+        plan.next_execution(host)
+
+    async def wrap():
+        return await cassandra_client._wrap_response_future(
+            SentFuture(attempted, coordinator), fetch_all=False, key=key, hedge_plan=statement.hedge_plan
+        )
+
+    asyncio.run(wrap())
+    return cassandra_client.hedge_stats()[key]
+
+
+def test_hedge_stats_count_only_speculative_executions():
+    # A retry moved the request to the second replica; no hedge fired
+    retried = record_hedges("test_retried", [None], ["a", "b"], "b")
+    assert (retried["hedged"], retried["hedges"], retried["hedge_wins"]) == (0, 0, 0)
+
+    # A hedge went to the second replica, which answered first
+    won = record_hedges("test_hedge_won", [None, "b"], ["a", "b"], "b")
+    assert (won["hedged"], won["hedges"], won["hedge_wins"]) == (1, 1, 1)
+
+    # A hedge fired but found no replica left, and the first one answered
+    no_host = record_hedges("test_hedge_no_host", [None, "a"], ["a"], "a")
+    assert (no_host["hedged"], no_host["hedges"], no_host["hedge_wins"]) == (0, 0, 0)
@@ -0,0 +1,39 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.models.cursors import decode_bucket_cursor, decode_cursor, encode_cursor
+
+
+@pytest.mark.parametrize("cursor", ["!!bad", "ab$d", "a", "abc=def"])
+def test_decode_cursor_rejects_garbage(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_cursor_round_trip():
+    paging_state = bytes(range(256))
+    assert decode_cursor(encode_cursor(paging_state)) == paging_state
+    assert decode_bucket_cursor(f"12.{encode_cursor(paging_state)}") == (12, paging_state)
+
+
+def test_unusable_cursors_are_bad_requests():
+    from app.db.cassandra_client import cassandra_client
+    from app.main import app
+
+    async def scenario():
+        await cassandra_client.prepare_all()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            sent = await client.post("/api/messages/", json={"sender_id": 1, "receiver_id": 2, "content": "hi"})
+            conversation_id = sent.json()["conversation_id"]
+            # Valid base64url that is not a paging state the backend issued
+            forged = encode_cursor(b"not a paging state")
+            return [
+                (await client.get(f"/api/messages/conversation/{conversation_id}", params={"cursor": "!!bad"})).status_code,
+                (await client.get(f"/api/messages/conversation/{conversation_id}", params={"cursor": forged})).status_code,
+                (await client.get("/api/conversations/user/1", params={"cursor": forged})).status_code,
+            ]
+
+    assert asyncio.run(scenario()) == [400, 400, 400]
@@ -0,0 +1,56 @@
+import asyncio
+
+import httpx
+
+
+def test_stale_inbox_entries_are_dropped_on_any_page():
+    from app.db.cassandra_client import cassandra_client
+    from app.main import app
+    from app.models import cassandra_models
+    from app.models.cassandra_models import ConversationModel, MessageModel
+
+    executed = []
+    execute = cassandra_client.execute
+
+    async def recording_execute(key, *args, **kwargs):
+        executed.append(key)
+        return await execute(key, *args, **kwargs)
+
+    async def scenario():
+        await cassandra_client.prepare_all()
+        first = await ConversationModel.create_or_get_conversation(101, 102)
+        await MessageModel.create_message(first["conversation_id"], 101, 102, "old", first["last_message_at"])
+        for receiver_id in (103, 104):
+            await asyncio.sleep(0.002)
+            conversation = await ConversationModel.create_or_get_conversation(101, receiver_id)
+            await MessageModel.create_message(
+                conversation["conversation_id"], 101, receiver_id, "hi", conversation["last_message_at"]
+            )
+        await asyncio.sleep(0.002)
+        # A send that did not know the previous entry (another worker moved it)
+        # leaves the "old" entry behind, at the bottom of the inbox
+        await MessageModel.create_message(first["conversation_id"], 102, 101, "new", None)
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first_page = (await client.get("/api/conversations/user/101", params={"limit": 2})).json()
+            second_page = (await client.get(
+                "/api/conversations/user/101", params={"limit": 2, "cursor": first_page["next_cursor"]}
+            )).json()
+        await asyncio.gather(*cassandra_models._inbox_cleanups)
+        remaining = await execute("select_inbox", (101,))
+        return first_page, second_page, remaining
+
+    cassandra_client.execute = recording_execute
+    try:
+        first_page, second_page, remaining = asyncio.run(scenario())
+    finally:
+        cassandra_client.execute = execute
+
+    ids = [c["id"] for page in (first_page, second_page) for c in page["data"]]
+    assert len(ids) == len(set(ids)) == 3
+    assert first_page["data"][0]["last_message_content"] == "new"
+    assert first_page["total"] == second_page["total"] == 3
+    # The stale entry was cleaned up in the background, not by the GET
+    assert sorted(row["conversation_id"] for row in remaining) == sorted(ids)
+    assert "delete_inbox_entry" not in executed
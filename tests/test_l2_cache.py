@@ -0,0 +1,32 @@
+import asyncio
+import time
+
+from app.cache import DiskCache
+
+
+def test_warm_skips_expired_summaries_and_keeps_remaining_ttl(tmp_path, monkeypatch):
+    from app.models import cassandra_models
+    from app.models.cassandra_models import ConversationModel
+
+    l2_cache = DiskCache(str(tmp_path / "l2.sqlite"))
+    cache = cassandra_models._conversation_cache
+    monkeypatch.setattr(cassandra_models, "_l2_cache", l2_cache)
+    monkeypatch.setattr(cache, "ttl", 30.0)
+    for conversation_id in (9001, 9002):
+        l2_cache.put("conversation", conversation_id, 1, {"conversation_id": conversation_id})
+    # 9001 was read from Cassandra a minute ago, 9002 twenty seconds ago
+    for conversation_id, age in ((9001, 60), (9002, 20)):
+        l2_cache._conn.execute(
+            "UPDATE entries SET updated_at = ? WHERE namespace = 'conversation' AND key = ?",
+            (time.time() - age, str(conversation_id))
+        )
+
+    try:
+        asyncio.run(ConversationModel.warm_caches())
+        assert 9001 not in cache
+        expires_at, _ = cache._data[9002]
+        assert expires_at - time.monotonic() <= 10
+    finally:
+        cache.pop(9001)
+        cache.pop(9002)
+        l2_cache.close()
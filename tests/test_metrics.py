@@ -0,0 +1,18 @@
+import pytest
+
+from app.metrics import LabeledCounter, _Family, exposition
+
+
+def test_family_without_samples_fails_when_instantiated():
+    class ChildOnlyFamily(_Family):
+        def _new_child(self):
+            return None
+
+    with pytest.raises(TypeError):
+        ChildOnlyFamily("test_incomplete", "Incomplete family", ("label",))
+
+
+def test_counter_is_exposed_with_labels():
+    counter = LabeledCounter("test_events_total", "Events seen by the test", ("kind",))
+    counter.labels("a").inc(2)
+    assert 'test_events_total{kind="a"} 2' in exposition()
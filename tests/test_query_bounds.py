@@ -0,0 +1,31 @@
+import asyncio
+
+import httpx
+import pytest
+
+OUT_OF_BOUNDS = [
+    ("/api/messages/conversation/1", {"page": -1}),
+    ("/api/messages/conversation/1", {"page": 0}),
+    ("/api/messages/conversation/1", {"limit": -5}),
+    ("/api/messages/conversation/1", {"limit": 101}),
+    ("/api/messages/conversation/1/before", {"before_timestamp": "2030-01-01T00:00:00", "page": 0}),
+    ("/api/messages/conversation/1/sync", {"limit": 0}),
+    ("/api/messages/conversation/1/sync", {"wait": -1}),
+    ("/api/messages/conversations", {"ids": list(range(101))}),
+    ("/api/conversations/user/1", {"page": -1}),
+    ("/api/conversations/user/1", {"limit": 0}),
+    ("/api/conversations/user/1/sync", {"limit": 100000}),
+    ("/api/conversations/user/1/sync", {"wait": 3600}),
+]
+
+
+@pytest.mark.parametrize("path, params", OUT_OF_BOUNDS)
+def test_out_of_bounds_paging_is_rejected(path, params):
+    from app.main import app
+
+    async def get():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(path, params=params)
+
+    assert asyncio.run(get()).status_code == 422
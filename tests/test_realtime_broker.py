@@ -0,0 +1,48 @@
+import asyncio
+from datetime import datetime
+
+from app.controllers.realtime_controller import publish_messages
+from app.realtime import broker, conversation_channel, inbox_channel
+from app.schemas.message import MessageResponse
+
+
+def message(message_id: int) -> MessageResponse:
+    return MessageResponse(
+        id=message_id, sender_id=1, receiver_id=2, content="hi",
+        created_at=datetime(2024, 1, 1), conversation_id=7,
+    )
+
+
+def test_client_subscribed_to_two_channels_gets_each_message_once():
+    async def scenario():
+        await broker.start()
+        subscription = broker.subscribe([conversation_channel(7), inbox_channel(1)])
+        delivered = broker.delivered
+        try:
+            await publish_messages([message(1), message(2)])
+            events = []
+            while (event := await subscription.get(timeout=0.01)) is not None:
+                events.append(event)
+        finally:
+            subscription.close()
+            await broker.stop()
+        return events, broker.delivered - delivered
+
+    events, delivered = asyncio.run(scenario())
+    assert [event["message"]["id"] for event in events] == [1, 2]
+    assert delivered == 2
+
+
+def test_single_channel_subscription_gets_every_event():
+    async def scenario():
+        await broker.start()
+        subscription = broker.subscribe([inbox_channel(2)])
+        try:
+            await publish_messages([message(3)])
+            return await subscription.get(timeout=0.01)
+        finally:
+            subscription.close()
+            await broker.stop()
+
+    event = asyncio.run(scenario())
+    assert event["event_id"] == "message:3"
@@ -0,0 +1,13 @@
+import pytest
+
+from app.realtime.bus import Bus, LocalBus
+
+
+def test_incomplete_bus_fails_when_instantiated():
+    class PublishOnlyBus(Bus):
+        async def publish(self, channel, event):
+            pass
+
+    with pytest.raises(TypeError):
+        PublishOnlyBus()
+    assert isinstance(LocalBus(), Bus)
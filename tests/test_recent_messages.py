@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta
+
+from app.cache import RecentMessagesCache
+
+START = datetime(2024, 1, 1)
+
+
+def message(message_id: int, content: str) -> dict:
+    return {
+        "id": message_id,
+        "sender_id": 1,
+        "receiver_id": 2,
+        "content": content,
+        "created_at": START + timedelta(seconds=message_id),
+        "conversation_id": 7,
+    }
+
+
+def test_append_after_refill_that_already_holds_the_message():
+    cache = RecentMessagesCache(per_conversation=10)
+    cache.fill(7, [message(2, "m2"), message(1, "m1"), message(0, "m0")], complete=True, total=3)
+
+    # A read refills the buffer while a send is in flight; the read already sees the new message
+    racing = message(3, "racing")
+    cache.fill(7, [racing, message(2, "m2"), message(1, "m1"), message(0, "m0")], complete=True, total=4)
+    cache.append(7, racing)
+
+    messages, total, has_more = cache.get_page(7, 20)
+    assert [m["content"] for m in messages] == ["racing", "m2", "m1", "m0"]
+    assert total == 4
+    assert not has_more
+
+
+def test_append_adds_new_message():
+    cache = RecentMessagesCache(per_conversation=10)
+    cache.fill(7, [message(1, "m1"), message(0, "m0")], complete=True, total=2)
+    cache.append(7, message(2, "m2"))
+
+    messages, total, _ = cache.get_page(7, 20)
+    assert [m["content"] for m in messages] == ["m2", "m1", "m0"]
+    assert total == 3
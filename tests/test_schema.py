@@ -0,0 +1,6 @@
+from app.db.schema import RESET_TABLES, TABLES
+
+
+def test_setup_resets_every_table_derived_from_messages():
+    # Only ID allocations survive a re-run, so new IDs never reuse old ones
+    assert set(RESET_TABLES) == {table for table, _ in TABLES} - {"id_allocations"}
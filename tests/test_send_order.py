@@ -0,0 +1,78 @@
+import asyncio
+
+import httpx
+
+
+def test_send_after_batch_stays_newest():
+    from app.db.cassandra_client import cassandra_client
+    from app.main import app
+
+    async def scenario():
+        await cassandra_client.prepare_all()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            batch = [{"sender_id": 201, "receiver_id": 202, "content": f"batch {index}"} for index in range(800)]
+            sent = await client.post("/api/messages/batch", json={"messages": batch})
+            assert sent.status_code == 200
+            single = (await client.post(
+                "/api/messages/", json={"sender_id": 202, "receiver_id": 201, "content": "after"}
+            )).json()
+            inbox = (await client.get("/api/conversations/user/201")).json()
+            messages = (await client.get(
+                f"/api/messages/conversation/{single['conversation_id']}", params={"limit": 3}
+            )).json()
+        return single, inbox, messages
+
+    single, inbox, messages = asyncio.run(scenario())
+    assert inbox["total"] == 1
+    assert [(c["id"], c["last_message_content"]) for c in inbox["data"]] == [(single["conversation_id"], "after")]
+    assert [m["content"] for m in messages["data"]] == ["after", "batch 799", "batch 798"]
+
+
+def test_cached_conversation_matches_inbox_timestamp():
+    from app.db.cassandra_client import cassandra_client
+    from app.main import app
+
+    async def scenario():
+        await cassandra_client.prepare_all()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            message = {"sender_id": 211, "receiver_id": 212, "content": "first"}
+            conversation_id = (await client.post("/api/messages/", json=message)).json()["conversation_id"]
+            # Caches the conversation, which the next send then updates in place
+            await client.get(f"/api/conversations/{conversation_id}")
+            await client.post("/api/messages/", json={**message, "content": "second"})
+            conversation = (await client.get(f"/api/conversations/{conversation_id}")).json()
+            inbox = (await client.get("/api/conversations/user/211")).json()
+        return conversation, inbox
+
+    conversation, inbox = asyncio.run(scenario())
+    assert conversation["last_message_content"] == "second"
+    assert conversation["last_message_at"] == inbox["data"][0]["last_message_at"]
+
+
+def test_pair_lookup_keeps_newest_message_when_sends_race():
+    from datetime import datetime, timedelta
+
+    from app.db.cassandra_client import cassandra_client
+    from app.models.cassandra_models import ConversationModel, MessageModel, _execute_write
+
+    async def scenario():
+        await cassandra_client.prepare_all()
+        conversation = await ConversationModel.create_or_get_conversation(221, 222)
+        newer_at = datetime.now()
+        newer, older = (
+            MessageModel._message_writes(
+                message_id, conversation["conversation_id"], 221, 222, content, created_at
+            )
+            for message_id, content, created_at in (
+                (9_000_001, "newer", newer_at), (9_000_002, "older", newer_at - timedelta(seconds=1))
+            )
+        )
+        # The newer send's writes land first
+        for writes in (newer, older):
+            await asyncio.gather(*(_execute_write(write) for write in writes))
+        return await cassandra_client.execute("select_conversation_by_pair", (221, 222))
+
+    row = asyncio.run(scenario())[0]
+    assert row["last_message"] == "newer"